@@ -0,0 +1,77 @@
+"""
+ASS (Advanced SubStation Alpha) scripts for burning subtitles in with ffmpeg's `ass` filter.
+
+Each subtitle becomes a black rounded box drawn as an ASS vector shape (layer 0)
+plus one event per text line (layer 1), all placed in pixels with \\pos, so the
+geometry is the same as the sprites VideoRenderer draws in Python. libass then
+renders them inside the encoding ffmpeg process: no Python frame loop at all.
+"""
+
+# Cubic Bezier handle length for a quarter circle
+_KAPPA = 0.5523
+
+
+def ass_time(seconds):
+    """H:MM:SS.cc"""
+    cs = max(0, int(round(seconds * 100)))
+    return f"{cs // 360000}:{cs // 6000 % 60:02d}:{cs // 100 % 60:02d}.{cs % 100:02d}"
+
+
+def escape_text(text):
+    # Braces would open an override block; a zero-width space keeps "\n", "\N" and "\h" literal
+    text = text.replace("{", "(").replace("}", ")").replace("\\", "\\\u200b")
+    return text.replace("\r", "").replace("\n", " ")
+
+
+def rounded_box_path(w, h, r):
+    """ASS drawing commands for a w x h rectangle with corner radius r, origin at its top-left."""
+    r = max(0, min(r, w / 2, h / 2))
+    k = r * _KAPPA
+
+    def n(v):
+        return f"{v:.2f}".rstrip("0").rstrip(".")
+
+    return " ".join([
+        f"m {n(r)} 0", f"l {n(w - r)} 0",
+        f"b {n(w - r + k)} 0 {n(w)} {n(r - k)} {n(w)} {n(r)}", f"l {n(w)} {n(h - r)}",
+        f"b {n(w)} {n(h - r + k)} {n(w - r + k)} {n(h)} {n(w - r)} {n(h)}", f"l {n(r)} {n(h)}",
+        f"b {n(r - k)} {n(h)} 0 {n(h - r + k)} 0 {n(h - r)}", f"l 0 {n(r)}",
+        f"b 0 {n(r - k)} {n(r - k)} 0 {n(r)} 0",
+    ])
+
+
+def build_ass_script(events, width, height, font_name, font_size, radius=15, outline=1):
+    """
+    events: [{'start', 'end' (seconds), 'x', 'y', 'w', 'h' (box in pixels),
+              'lines': [(text, x, y), ...] (relative to the box)}, ...]
+    font_size is the ASS size (libass scales the font by its line height, not the em size).
+    """
+    header = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 2",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Sub,{font_name},{font_size},&H00FFFFFF,&H00FFFFFF,&H00000000,&H00000000,"
+        f"0,0,0,0,100,100,0,0,1,{outline},0,7,0,0,0,1",
+        f"Style: Box,{font_name},{font_size},&H00000000,&H00000000,&H00000000,&H00000000,"
+        "0,0,0,0,100,100,0,0,1,0,0,7,0,0,0,1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    lines = []
+    for ev in events:
+        start, end = ass_time(ev['start']), ass_time(ev['end'])
+        lines.append(f"Dialogue: 0,{start},{end},Box,,0,0,0,,"
+                     f"{{\\pos({ev['x']},{ev['y']})\\p1}}{rounded_box_path(ev['w'] - 1, ev['h'] - 1, radius)}")
+        for text, lx, ly in ev['lines']:
+            lines.append(f"Dialogue: 1,{start},{end},Sub,,0,0,0,,"
+                         f"{{\\pos({ev['x'] + lx:g},{ev['y'] + ly:g})}}{escape_text(text)}")
+    return "\n".join(header + lines) + "\n"
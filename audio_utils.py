@@ -0,0 +1,86 @@
+"""
+PCM helpers for the voiceover pipeline.
+
+Clips are decoded once into int16 mono NumPy arrays at a fixed sample rate and
+stay in memory between synthesis, fitting and mixing. Intermediate files are
+written as WAV, so the only lossy encode is the AAC pass at final mux time.
+"""
+import io
+import wave
+import numpy as np
+from pydub import AudioSegment
+
+SAMPLE_RATE = 24000  # edge-tts, gTTS and VieNeu all produce 24 kHz speech
+
+
+def normalize_segment(segment, sample_rate=SAMPLE_RATE):
+    """Mono, 16-bit, fixed rate: the one format every later stage works in."""
+    if segment.channels != 1:
+        segment = segment.set_channels(1)
+    if segment.sample_width != 2:
+        segment = segment.set_sample_width(2)
+    if segment.frame_rate != sample_rate:
+        segment = segment.set_frame_rate(sample_rate)
+    return segment
+
+
+def segment_to_pcm(segment, sample_rate=SAMPLE_RATE):
+    segment = normalize_segment(segment, sample_rate)
+    return np.frombuffer(segment.raw_data, dtype=np.int16).copy()
+
+
+def pcm_to_segment(pcm, sample_rate=SAMPLE_RATE):
+    return AudioSegment(data=np.ascontiguousarray(pcm, dtype=np.int16).tobytes(),
+                        sample_width=2, frame_rate=sample_rate, channels=1)
+
+
+def load_pcm(path, sample_rate=SAMPLE_RATE):
+    return segment_to_pcm(AudioSegment.from_file(path), sample_rate)
+
+
+def pcm_duration_ms(pcm, sample_rate=SAMPLE_RATE):
+    return int(len(pcm) * 1000 / sample_rate)
+
+
+def write_wav(path, pcm, sample_rate=SAMPLE_RATE):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(np.ascontiguousarray(pcm, dtype=np.int16).tobytes())
+
+
+def wav_bytes(pcm, sample_rate=SAMPLE_RATE):
+    """pcm as an in-memory WAV file, for players and downloads that take bytes."""
+    buffer = io.BytesIO()
+    write_wav(buffer, pcm, sample_rate)
+    return buffer.getvalue()
+
+
+def mix_clips(clips, duration_ms, sample_rate=SAMPLE_RATE, fade_ms=50):
+    """
+    Mixes [(start_ms, pcm), ...] into one int16 track of duration_ms.
+    The track is preallocated once and every clip is added in place at its offset
+    (O(total clip length) instead of one full-track copy per clip). Overlaps are
+    summed and hard-clipped to the int16 range. A clip running past the end of the
+    video is faded out and cut.
+    """
+    total = int(duration_ms * sample_rate / 1000)
+    track = np.zeros(total, dtype=np.int32)
+    fade_len = int(fade_ms * sample_rate / 1000)
+
+    for start_ms, pcm in clips:
+        start = int(start_ms * sample_rate / 1000)
+        if start >= total or len(pcm) == 0:
+            continue
+        end = min(total, start + len(pcm))
+        part = pcm[:end - start]
+        if end - start < len(pcm):
+            # Cut at the end of the video: short fade to avoid a click
+            n = min(fade_len, len(part))
+            part = part.astype(np.int32)
+            part[len(part) - n:] = (part[len(part) - n:] * np.linspace(1.0, 0.0, n)).astype(np.int32)
+        track[start:end] += part
+
+    np.clip(track, -32768, 32767, out=track)
+    return track.astype(np.int16)
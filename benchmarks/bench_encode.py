@@ -0,0 +1,86 @@
+"""
+Benchmark the encoding profiles of the final transcode.
+
+Encodes the first --duration seconds of a video (video track only) with every
+profile in encoding_profiles.ENCODING_PROFILES, with the same libx264 arguments
+the renderer uses, and reports encode speed, file size, bitrate and PSNR against
+the source. --two-pass adds the two-pass variant of every profile.
+
+Finds ffmpeg like the renderer (ffmpeg_runner: env var, bundled, PATH).
+
+    python benchmarks/bench_encode.py episode.mp4 --duration 60 --two-pass
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+from encoding_profiles import ENCODING_PROFILES, x264_args, two_pass_bitrate
+import ffmpeg_runner
+
+
+def encode(ffmpeg_exe, video, duration, out_path, profile, two_pass, size, fps, work_dir):
+    base = [ffmpeg_exe, "-y", "-loglevel", "error", "-t", str(duration), "-i", video, "-map", "0:v:0", "-an"]
+    if not two_pass:
+        ffmpeg_runner.run(base + x264_args(profile) + [out_path])
+        return
+    args = x264_args(profile, bitrate=two_pass_bitrate(profile, size[0], size[1], fps))
+    log = os.path.join(work_dir, "x264_2pass")
+    ffmpeg_runner.run(base + args + ["-pass", "1", "-passlogfile", log, "-f", "null", os.devnull])
+    ffmpeg_runner.run(base + args + ["-pass", "2", "-passlogfile", log, out_path])
+
+
+def psnr(ffmpeg_exe, encoded, video, duration):
+    cmd = [ffmpeg_exe, "-hide_banner", "-i", encoded, "-t", str(duration), "-i", video,
+           "-lavfi", "[0:v][1:v]psnr", "-f", "null", "-"]
+    result = ffmpeg_runner.run(cmd, check=False)
+    match = re.search(r"average:([\d.]+|inf)", result.stderr)
+    return float(match.group(1)) if match else float("nan")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Speed and size of the encoding profiles")
+    parser.add_argument("video")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of the video to encode")
+    parser.add_argument("--two-pass", action="store_true", help="Also measure two-pass encodes")
+    args = parser.parse_args(argv)
+
+    ffmpeg_exe = ffmpeg_runner.find_ffmpeg()
+    if not ffmpeg_exe:
+        print("ffmpeg not found (PATH, AUTOVISUB_FFMPEG or ffmpeg.exe in the working directory)")
+        return 1
+    cap = cv2.VideoCapture(args.video)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    duration = min(args.duration, cap.get(cv2.CAP_PROP_FRAME_COUNT) / fps)
+    cap.release()
+    frames = int(round(duration * fps))
+    print(f"{args.video}: {size[0]}x{size[1]} @ {fps:.2f} fps, {duration:.1f} s ({frames} frames), "
+          f"{os.cpu_count()} CPU cores")
+
+    work_dir = tempfile.mkdtemp(prefix="bench_encode_")
+    print(f"{'profile':18} {'time':>8} {'fps':>7} {'size':>9} {'kbit/s':>8} {'PSNR':>8}")
+    for profile in ENCODING_PROFILES:
+        for two_pass in ((False, True) if args.two_pass else (False,)):
+            out_path = os.path.join(work_dir, f"{profile}.mp4")
+            start = time.perf_counter()
+            encode(ffmpeg_exe, args.video, duration, out_path, profile, two_pass, size, fps, work_dir)
+            elapsed = time.perf_counter() - start
+            mb = os.path.getsize(out_path) / 1e6
+            name = profile + (" (2-pass)" if two_pass else "")
+            print(f"{name:18} {elapsed:7.2f}s {frames / elapsed:7.1f} {mb:7.2f}MB "
+                  f"{mb * 8000 / duration:8.0f} {psnr(ffmpeg_exe, out_path, args.video, duration):6.2f}dB")
+            os.remove(out_path)
+    for f in os.listdir(work_dir):
+        os.remove(os.path.join(work_dir, f))
+    os.rmdir(work_dir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Benchmark the NumPy voiceover mixer against the old AudioSegment.overlay loop.
+
+Builds a synthetic timeline (default: 1 hour, 1,500 clips of 1.5-4 s noise) and
+mixes it both ways. The overlay loop copies the whole track once per clip, so it
+is timed on the first --legacy-clips clips only and extrapolated linearly.
+
+    python benchmarks/bench_mixer.py --minutes 60 --clips 1500 --legacy-clips 100
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from pydub import AudioSegment
+from audio_utils import SAMPLE_RATE, mix_clips, pcm_to_segment
+
+
+def make_timeline(minutes, n_clips, seed=0):
+    rng = np.random.default_rng(seed)
+    duration_ms = int(minutes * 60 * 1000)
+    starts = np.sort(rng.integers(0, duration_ms - 1000, n_clips))
+    clips = []
+    for start in starts:
+        length = int(rng.uniform(1.5, 4.0) * SAMPLE_RATE)
+        clips.append((int(start), (rng.standard_normal(length) * 4000).astype(np.int16)))
+    return duration_ms, clips
+
+
+def mix_overlay(clips, duration_ms):
+    """The pre-NumPy implementation of create_full_audio_track."""
+    track = AudioSegment.silent(duration=duration_ms, frame_rate=SAMPLE_RATE)
+    for start_ms, pcm in clips:
+        track = track.overlay(pcm_to_segment(pcm), position=start_ms)
+    return track
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Voiceover mixer benchmark")
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--clips", type=int, default=1500)
+    parser.add_argument("--legacy-clips", type=int, default=100,
+                        help="Clips mixed with the overlay loop (0 = all, can take many minutes)")
+    args = parser.parse_args(argv)
+
+    duration_ms, clips = make_timeline(args.minutes, args.clips)
+    print(f"Timeline: {args.minutes:g} min, {len(clips)} clips")
+
+    t0 = time.perf_counter()
+    track = mix_clips(clips, duration_ms)
+    numpy_time = time.perf_counter() - t0
+    print(f"NumPy mixer:   {numpy_time:8.3f}s  ({len(track) / SAMPLE_RATE:.0f}s of audio)")
+
+    subset = clips[:args.legacy_clips] if args.legacy_clips else clips
+    t0 = time.perf_counter()
+    mix_overlay(subset, duration_ms)
+    overlay_time = time.perf_counter() - t0
+    estimated = overlay_time * len(clips) / len(subset)
+    label = "" if len(subset) == len(clips) else f"  (measured {overlay_time:.2f}s on {len(subset)} clips)"
+    print(f"Overlay loop:  {estimated:8.3f}s{label}")
+    print(f"Speed-up:      {estimated / numpy_time:8.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+Benchmark timeline.plan_timeline on synthetic subtitle timelines.
+
+"random": lines of 1-4 s every 1.5-4.5 s, with clips up to 40% longer than
+their line, so shifts, speed-ups and the odd overlap all happen.
+"dense": every clip (2,150 ms) is longer than its 2,000 ms slot, so the whole
+timeline is one congested run (the worst case for the speed-up search).
+
+Every plan is checked: no clip starts before the previous one ends unless it is
+marked as overlapping, and no clip is sped up beyond its max_speed.
+
+    python benchmarks/bench_timeline.py --sizes 500 1000 2000 10000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timeline import plan_timeline, summarize_plan
+
+
+def random_items(n, seed=0):
+    rng = random.Random(seed)
+    items, t = [], 0.0
+    for _ in range(n):
+        length = rng.uniform(1000, 4000)
+        items.append({'start_ms': t, 'duration_ms': length * rng.uniform(0.6, 1.4),
+                      'max_speed': rng.uniform(1.0, 1.3)})
+        t += length + rng.uniform(500, 1500)
+    return items, t + 5000
+
+
+def dense_items(n, slot_ms=2000, clip_ms=2150, max_speed=1.25):
+    items = [{'start_ms': i * slot_ms, 'duration_ms': clip_ms, 'max_speed': max_speed} for i in range(n)]
+    return items, n * slot_ms + 5000
+
+
+def check(items, plan, gap_ms=50):
+    for it, p in zip(items, plan):
+        assert p['speed'] <= max(1.0, it['max_speed']) + 1e-9, "speed above max_speed"
+    for prev, cur in zip(plan, plan[1:]):
+        # Plans are rounded to whole milliseconds
+        if not cur['overlap']:
+            assert cur['start_ms'] >= prev['start_ms'] + prev['duration_ms'] + gap_ms - 2, "unmarked overlap"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Timeline planner benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    for name, make in (("random", random_items), ("dense", dense_items)):
+        for n in args.sizes:
+            items, video_ms = make(n)
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                plan = plan_timeline(items, video_ms)
+                best = min(best, time.perf_counter() - start)
+            check(items, plan)
+            print(f"{name:6} {n:6} lines: {best * 1000:8.1f} ms   {summarize_plan(plan)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
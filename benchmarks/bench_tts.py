@@ -0,0 +1,70 @@
+"""
+Benchmark VoiceOverGenerator concurrency against a stub TTS backend.
+
+The stub replaces the edge-tts network call with a fixed latency and writes a
+silent clip whose length grows with the text, so speed-fit second passes still
+happen. No network access is needed.
+
+    python benchmarks/bench_tts.py --lines 200 --latency 0.3 --concurrency 1 8 16
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydub import AudioSegment
+from voice_generator import VoiceOverGenerator
+
+
+class StubVoiceOverGenerator(VoiceOverGenerator):
+    def __init__(self, latency, ms_per_char=70, **kwargs):
+        # Keep stub clips out of the real duration model and clip cache
+        super().__init__(duration_model_path=None, clip_cache_dir=None, **kwargs)
+        self.latency = latency
+        self.ms_per_char = ms_per_char
+        self.calls = 0
+
+    async def _generate_single_audio(self, text, output_path, custom_rate=None):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        duration = len(text) * self.ms_per_char
+        if custom_rate:
+            duration = int(duration / (1 + int(custom_rate.rstrip('%')) / 100))
+        await asyncio.to_thread(AudioSegment.silent(duration=duration).export, output_path, format="mp3")
+
+
+def make_subtitles(n):
+    subs = []
+    t = 0.0
+    for i in range(n):
+        # Every third line is too long for its slot and needs a second pass
+        text = "xin chào các bạn " * (3 if i % 3 == 0 else 1)
+        subs.append({'start': t, 'end': t + 1.5, 'text': text})
+        t += 2.0
+    return subs, int(t * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.3, help="Simulated TTS round-trip in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 16])
+    args = parser.parse_args()
+
+    subs, duration_ms = make_subtitles(args.lines)
+    for concurrency in args.concurrency:
+        vg = StubVoiceOverGenerator(args.latency)
+        with tempfile.TemporaryDirectory() as out_dir:
+            start = time.perf_counter()
+            clips = vg.generate_voiceovers(subs, out_dir, duration_ms, concurrency=concurrency)
+            elapsed = time.perf_counter() - start
+        print(f"concurrency={concurrency:3d}  {elapsed:7.2f}s  {len(clips)} clips  {vg.calls} synth calls  "
+              f"{args.lines / elapsed:6.1f} lines/s  {vg.last_stats['resynthesized']} re-synthesized")
+
+
+if __name__ == '__main__':
+    main()
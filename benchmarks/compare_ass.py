@@ -0,0 +1,117 @@
+"""
+Visual diff of the ASS subtitle backend against the Python compositor.
+
+Renders the same video and subtitles with backend="python" and backend="ass",
+then decodes both outputs and compares them frame by frame: render time of each
+backend, PSNR of the whole frame and mean absolute difference inside the
+subtitle region. The worst frame is saved side by side (python | ass | diff x4).
+Exits with status 1 if the mean PSNR is below --min-psnr, so it can gate a change
+to either backend.
+
+Needs ffmpeg built with libass, found like the renderer finds it (ffmpeg_runner).
+
+    python benchmarks/compare_ass.py video.mp4 --subs projects/video/translated_subs.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+from video_renderer import VideoRenderer
+
+LINES = [
+    "Sư huynh, đệ đã đột phá Trúc Cơ kỳ rồi!",
+    "Ngươi dám động vào người của Thanh Vân Tông sao?",
+    "Thiên địa linh khí đang hội tụ về phía ngọn núi kia, chắc chắn có bảo vật xuất thế.",
+    "Đi thôi.",
+]
+
+
+def synthetic_subs(duration, every=3.0, hold=2.2):
+    subs, t, k = [], 0.5, 0
+    while t + hold < duration:
+        subs.append({'start': t, 'end': t + hold, 'text': LINES[k % len(LINES)], 'bbox': None})
+        t += every
+        k += 1
+    return subs
+
+
+def psnr(a, b):
+    mse = np.mean((a.astype(np.float64) - b) ** 2)
+    return 99.0 if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ASS backend vs Python compositor")
+    parser.add_argument("video")
+    parser.add_argument("--subs", help="translated_subs.json (default: a line every 3 s)")
+    parser.add_argument("--region", type=float, nargs=4, default=(0.75, 1.0, 0.0, 1.0),
+                        metavar=("YMIN", "YMAX", "XMIN", "XMAX"), help="Subtitle region as fractions")
+    parser.add_argument("--font-size", type=int, default=36)
+    parser.add_argument("--font", help="TrueType font to use instead of the renderer's choice")
+    parser.add_argument("--min-psnr", type=float, default=25.0)
+    parser.add_argument("--save-worst", default="ass_diff_worst.png")
+    args = parser.parse_args(argv)
+
+    cap = cv2.VideoCapture(args.video)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+    if args.subs:
+        with open(args.subs, "r", encoding="utf-8") as f:
+            subs = json.load(f)
+    else:
+        subs = synthetic_subs(total / fps)
+
+    renderer = VideoRenderer(args.font)
+    print(f"Font: {renderer.font_path or 'PIL default'}, {len(subs)} subtitles, {total} frames")
+    out_dir = tempfile.mkdtemp(prefix="compare_ass_")
+    outputs = {}
+    for backend in ("python", "ass"):
+        out_path = os.path.join(out_dir, f"{backend}.mp4")
+        start = time.perf_counter()
+        renderer.render_video_with_subtitles(args.video, subs, out_path, subtitle_region=tuple(args.region),
+                                             font_size=args.font_size, backend=backend)
+        print(f"{backend:6} {time.perf_counter() - start:7.2f} s")
+        outputs[backend] = out_path
+
+    caps = [cv2.VideoCapture(outputs[b]) for b in ("python", "ass")]
+    y1, y2 = int(height * args.region[0]), int(height * args.region[1])
+    scores, region_diffs = [], []
+    worst = (99.0, None)
+    while True:
+        (ok_a, a), (ok_b, b) = caps[0].read(), caps[1].read()
+        if not (ok_a and ok_b):
+            break
+        score = psnr(a, b)
+        scores.append(score)
+        region_diffs.append(np.abs(a[y1:y2].astype(np.int16) - b[y1:y2]).mean())
+        if score < worst[0]:
+            worst = (score, np.hstack([a, b, np.clip(np.abs(a.astype(np.int16) - b) * 4, 0, 255).astype(np.uint8)]))
+    for c in caps:
+        c.release()
+
+    if not scores:
+        print("No frames decoded")
+        return 1
+    print(f"Frames compared: {len(scores)}")
+    print(f"PSNR mean {np.mean(scores):.2f} dB, min {min(scores):.2f} dB")
+    print(f"Subtitle region mean abs diff: mean {np.mean(region_diffs):.2f}, max {max(region_diffs):.2f}")
+    if worst[1] is not None and args.save_worst:
+        cv2.imwrite(args.save_worst, worst[1])
+        print(f"Worst frame ({worst[0]:.2f} dB) saved to {args.save_worst}")
+    for path in outputs.values():
+        os.remove(path)
+    os.rmdir(out_dir)
+    return 0 if np.mean(scores) >= args.min_psnr else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Content-addressed cache of synthesized voiceover clips, shared across runs and projects.
+
+A clip is keyed by the text and every setting that changes the audio (method, voice,
+pitch, rate, VieNeu params). Each entry is the audio file plus a small JSON sidecar
+with its duration and how it was fitted to its slot. The file mtime is the LRU clock:
+hits touch it and trim() deletes the oldest entries once the cache exceeds its size
+limit. No shared index file, so several workers can use the cache at once.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import uuid
+
+
+class ClipCache:
+    def __init__(self, cache_dir="tts_cache", max_mb=2048):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(text, params):
+        payload = json.dumps([text, params], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + ".audio", base + ".json"
+
+    def get(self, key):
+        """Returns (audio_path, meta) or None."""
+        audio_path, meta_path = self._paths(key)
+        if not (os.path.exists(audio_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except Exception:
+            return None
+        now = time.time()
+        try:
+            os.utime(audio_path, (now, now))
+        except OSError:
+            pass
+        return audio_path, meta
+
+    def put(self, key, source_path, meta):
+        audio_path, meta_path = self._paths(key)
+        os.makedirs(os.path.dirname(audio_path), exist_ok=True)
+        # Temp + rename so a concurrent reader never sees a half-written clip
+        tmp_audio = f"{audio_path}.{uuid.uuid4().hex}.tmp"
+        shutil.copyfile(source_path, tmp_audio)
+        os.replace(tmp_audio, audio_path)
+        tmp_meta = f"{meta_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, meta_path)
+
+    def trim(self):
+        """Evicts least recently used clips until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".audio"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for p in (path, path[:-len(".audio")] + ".json"):
+                try: os.remove(p)
+                except OSError: pass
+            total -= size
+            removed += 1
+        return removed
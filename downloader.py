@@ -1,6 +1,7 @@
 import subprocess
 import os
 import sys
+from ffmpeg_runner import find_ffmpeg, find_tool
 
 def download_bilibili_video(url: str, output_path: str = "downloads", progress_callback=None):
     """
@@ -15,13 +16,11 @@ def download_bilibili_video(url: str, output_path: str = "downloads", progress_c
     print(f"Bắt đầu tải video từ: {url}")
     os.makedirs(output_path, exist_ok=True)
     
-    # Define fallback executable path just in case
-    yt_dlp_executable = './yt-dlp'
-    if sys.platform == "win32":
-        yt_dlp_executable += '.exe'
+    # Define fallback executable path just in case (bundled ./yt-dlp(.exe) first, then PATH)
+    yt_dlp_executable = find_tool("yt-dlp") or ('./yt-dlp.exe' if sys.platform == "win32" else './yt-dlp')
         
-    # Determine absolute path to ffmpeg for yt-dlp
-    ffmpeg_path = os.path.abspath("ffmpeg.exe") if os.path.exists("ffmpeg.exe") else None
+    # Determine absolute path to ffmpeg for yt-dlp (PATH, AUTOVISUB_FFMPEG or bundled ffmpeg.exe)
+    ffmpeg_path = find_ffmpeg()
 
     try:
         import yt_dlp
@@ -31,7 +30,7 @@ def download_bilibili_video(url: str, output_path: str = "downloads", progress_c
             'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best', # Prioritize MP4
             'merge_output_format': 'mp4',
             # Explicitly tell yt-dlp where ffmpeg is
-            'ffmpeg_location': os.path.dirname(ffmpeg_path) if ffmpeg_path else None
+            'ffmpeg_location': ffmpeg_path
         }
 
         if progress_callback:
@@ -68,6 +67,8 @@ def download_bilibili_video(url: str, output_path: str = "downloads", progress_c
             '-o',
             os.path.join(output_path, '%(title)s.%(ext)s')
         ]
+        if ffmpeg_path:
+            command += ['--ffmpeg-location', ffmpeg_path]
         
         try:
             subprocess.run(command, check=True, capture_output=True, text=True, encoding='utf-8')
@@ -0,0 +1,65 @@
+"""
+Named libx264 settings for the final encode.
+
+A profile fixes preset, CRF, tune and thread count. Two-pass is optional: it
+encodes to an average bitrate (bits per pixel per frame, so it scales with the
+resolution and frame rate) instead of a constant quality, which gives a
+predictable file size for upload limits.
+
+Measured with benchmarks/bench_encode.py (synthetic 720p30 clip, 30 s, 1 CPU core;
+the old hardcoded "ultrafast, default CRF" encode wrote 26.3 MB at ~125 fps):
+
+    profile            fps     size    PSNR
+    draft              123   21.7 MB  48.0 dB
+    draft (2-pass)      68    6.2 MB  37.6 dB
+    balanced            56    9.5 MB  42.8 dB
+    balanced (2-pass)   34    8.3 MB  41.4 dB
+    archive             15   15.9 MB  50.0 dB
+    archive (2-pass)    13   15.6 MB  48.9 dB
+
+Re-run it on a real episode before changing the settings: the sizes depend
+heavily on the content, the speed ratios much less.
+"""
+
+DEFAULT_PROFILE = "balanced"
+
+ENCODING_PROFILES = {
+    # Fast previews and checks; larger files
+    "draft": {'preset': "ultrafast", 'crf': 26, 'tune': None, 'threads': 0, 'bpp': 0.06},
+    # Upload default: less than half the size of draft for about twice the encode time
+    "balanced": {'preset': "veryfast", 'crf': 23, 'tune': None, 'threads': 0, 'bpp': 0.08},
+    # Keep-forever master; slow
+    "archive": {'preset': "slow", 'crf': 18, 'tune': "film", 'threads': 0, 'bpp': 0.15},
+}
+
+# Intermediate of a two-pass encode: fast and without generation loss
+LOSSLESS = {'preset': "ultrafast", 'crf': 0, 'tune': None, 'threads': 0, 'bpp': None}
+
+
+def get_profile(profile=None):
+    """Profile dict from a name (unknown names and None give the default) or a dict as is."""
+    if isinstance(profile, dict):
+        return profile
+    return ENCODING_PROFILES.get(profile or DEFAULT_PROFILE, ENCODING_PROFILES[DEFAULT_PROFILE])
+
+
+def x264_args(profile=None, pix_fmt="yuv420p", threads=None, bitrate=None):
+    """
+    ffmpeg video codec arguments. threads overrides the profile (e.g. split between
+    worker processes); bitrate (kbit/s) replaces the CRF, for two-pass encodes.
+    """
+    p = get_profile(profile)
+    args = ["-c:v", "libx264", "-pix_fmt", pix_fmt, "-preset", p['preset']]
+    args += ["-b:v", f"{bitrate}k"] if bitrate else ["-crf", str(p['crf'])]
+    if p.get('tune'):
+        args += ["-tune", p['tune']]
+    threads = p.get('threads', 0) if threads is None else threads
+    if threads:
+        args += ["-threads", str(threads)]
+    return args
+
+
+def two_pass_bitrate(profile, width, height, fps):
+    """Target video bitrate in kbit/s for a two-pass encode."""
+    p = get_profile(profile)
+    return max(100, int(round(p['bpp'] * width * height * fps / 1000)))
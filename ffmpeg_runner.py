@@ -0,0 +1,237 @@
+"""
+Finding the ffmpeg/ffprobe binaries and running them.
+
+A tool is looked up in this order:
+1. env var: AUTOVISUB_FFMPEG / AUTOVISUB_FFPROBE (path to the binary or to its folder);
+   ffprobe is also looked for next to the ffmpeg that AUTOVISUB_FFMPEG points to
+2. bundled binary in the working directory or next to this file (ffmpeg.exe as
+   setup.py downloads it on Windows, plain ffmpeg elsewhere)
+3. PATH
+
+Commands run with `-progress pipe:2`. Their stderr is drained on a thread, the
+progress lines are parsed and the rest is kept as the error log, so a chatty
+ffmpeg never blocks and long calls can drive a progress bar (called from the
+waiting thread, not the reader). Every run leaves a stats dict (wall time, time
+to first progress, frames, fps, speed) in HISTORY, which keeps only the latest
+runs; use collect() to get all the runs of one piece of work.
+"""
+import os
+import re
+import sys
+import time
+import shutil
+import threading
+import subprocess
+from contextlib import contextmanager
+from collections import deque, namedtuple
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ENV_VARS = {"ffmpeg": "AUTOVISUB_FFMPEG", "ffprobe": "AUTOVISUB_FFPROBE"}
+
+# Stats of the latest runs in this process, oldest first
+HISTORY = deque(maxlen=256)
+
+# Per thread: the lists of the collect() blocks that are open
+_local = threading.local()
+
+FFmpegResult = namedtuple("FFmpegResult", "returncode stdout stderr stats")
+
+_PROGRESS_LINE = re.compile(r"^([a-z_0-9]+)=(.*)$")
+_POLL_S = 0.25
+
+
+def _executable_names(name):
+    return [name + ".exe", name] if sys.platform == "win32" else [name, name + ".exe"]
+
+
+def _in_dir(folder, name):
+    for exe in _executable_names(name):
+        path = os.path.join(folder, exe)
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+    return None
+
+
+def find_tool(name="ffmpeg"):
+    """Absolute path of ffmpeg, ffprobe (or any bundled tool such as yt-dlp) in the lookup order above, or None."""
+    configured = os.environ.get(ENV_VARS.get(name, ""))
+    if name == "ffprobe" and not configured and os.environ.get(ENV_VARS["ffmpeg"]):
+        # ffprobe next to the configured ffmpeg
+        configured = os.path.dirname(os.environ[ENV_VARS["ffmpeg"]])
+    if configured:
+        if os.path.isdir(configured):
+            path = _in_dir(configured, name)
+        else:
+            path = configured if os.path.isfile(configured) else None
+        if path:
+            return os.path.abspath(path)
+        print(f"{ENV_VARS.get(name, name)}={configured} does not point to {name}, searching elsewhere")
+    for folder in (os.getcwd(), MODULE_DIR):
+        path = _in_dir(folder, name)
+        if path:
+            return os.path.abspath(path)
+    return shutil.which(name)
+
+
+def find_ffmpeg():
+    return find_tool("ffmpeg")
+
+
+def find_ffprobe():
+    return find_tool("ffprobe")
+
+
+def _is_ffmpeg(exe):
+    return os.path.splitext(os.path.basename(exe))[0].lower() == "ffmpeg"
+
+
+def _seconds(value):
+    try:
+        return int(value) / 1e6
+    except (TypeError, ValueError):
+        return None
+
+
+class FFmpegProcess:
+    """
+    A running ffmpeg. Write raw input with write() (stdin=True), then wait().
+    duration: seconds of output expected, to turn out_time into a 0-1 fraction for progress_callback.
+    """
+
+    def __init__(self, cmd, stdin=False, capture_stdout=False, duration=None, progress_callback=None, label=None):
+        self.cmd = list(cmd)
+        if _is_ffmpeg(self.cmd[0]):
+            self.cmd[1:1] = ["-nostats", "-progress", "pipe:2"]
+        self.duration = duration
+        self.progress_callback = progress_callback
+        self.label = label or os.path.basename(self.cmd[0])
+        self.progress = {}
+        self._log, self._stdout = [], []
+        self._first_progress = None
+        self._start = time.perf_counter()
+        self.proc = subprocess.Popen(self.cmd, stdin=subprocess.PIPE if stdin else subprocess.DEVNULL,
+                                     stdout=subprocess.PIPE if capture_stdout else subprocess.DEVNULL,
+                                     stderr=subprocess.PIPE)
+        self._threads = [threading.Thread(target=self._read_stderr, daemon=True)]
+        if capture_stdout:
+            self._threads.append(threading.Thread(target=lambda: self._stdout.append(self.proc.stdout.read()),
+                                                  daemon=True))
+        for t in self._threads:
+            t.start()
+
+    def _read_stderr(self):
+        for raw in self.proc.stderr:
+            line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+            match = _PROGRESS_LINE.match(line)
+            if match:
+                if self._first_progress is None:
+                    self._first_progress = time.perf_counter() - self._start
+                self.progress[match.group(1)] = match.group(2).strip()
+            else:
+                self._log.append(line)
+
+    def fraction(self):
+        """Share of the expected output written so far (None without a duration)."""
+        out_s = _seconds(self.progress.get('out_time_us', self.progress.get('out_time_ms')))
+        if not self.duration or out_s is None:
+            return None
+        return max(0.0, min(1.0, out_s / self.duration))
+
+    def write(self, data):
+        """Feeds stdin. Returns False once ffmpeg has stopped reading (its error shows up in wait())."""
+        try:
+            self.proc.stdin.write(data)
+            return True
+        except (BrokenPipeError, OSError):
+            return False
+
+    def wait(self, input=None, check=True):
+        if input is not None:
+            self.write(input)
+        if self.proc.stdin:
+            try: self.proc.stdin.close()
+            except OSError: pass
+        while True:
+            try:
+                self.proc.wait(timeout=_POLL_S)
+                break
+            except subprocess.TimeoutExpired:
+                fraction = self.fraction()
+                if self.progress_callback and fraction is not None:
+                    self.progress_callback(fraction)
+        for t in self._threads:
+            t.join()
+
+        stats = self.stats()
+        HISTORY.append(stats)
+        for runs in getattr(_local, 'collectors', ()):
+            runs.append(stats)
+        stderr = "\n".join(self._log)
+        if check and self.proc.returncode != 0:
+            raise RuntimeError(f"FFMPEG Error: {stderr.strip()}")
+        return FFmpegResult(self.proc.returncode, b"".join(self._stdout), stderr, stats)
+
+    def stats(self):
+        p = self.progress
+
+        def number(key, cast=float):
+            try:
+                return cast(p.get(key, "").rstrip("x"))
+            except ValueError:
+                return None
+
+        return {
+            'label': self.label,
+            'wall_s': round(time.perf_counter() - self._start, 3),
+            'startup_s': round(self._first_progress, 3) if self._first_progress is not None else None,
+            'frames': number('frame', int),
+            'fps': number('fps'),
+            'speed': number('speed'),
+            'out_time_s': _seconds(p.get('out_time_us', p.get('out_time_ms'))),
+            'returncode': self.proc.returncode,
+        }
+
+
+def run(cmd, input=None, capture_stdout=False, duration=None, progress_callback=None, label=None, check=True):
+    """
+    Runs cmd (cmd[0] = the binary) to completion. Returns FFmpegResult(returncode, stdout
+    bytes, stderr text without progress lines, stats); raises RuntimeError on failure if check.
+    """
+    process = FFmpegProcess(cmd, stdin=input is not None, capture_stdout=capture_stdout, duration=duration,
+                            progress_callback=progress_callback, label=label)
+    return process.wait(input, check)
+
+
+@contextmanager
+def collect():
+    """
+    Gathers the stats of every run this thread waits for inside the block, however many
+    (blocks can be nested):
+
+        with ffmpeg_runner.collect() as runs:
+            renderer.render_video_with_subtitles(...)
+    """
+    runs = []
+    if not hasattr(_local, 'collectors'):
+        _local.collectors = []
+    _local.collectors.append(runs)
+    try:
+        yield runs
+    finally:
+        _local.collectors.pop()
+
+
+def summarize(stats):
+    """One line per label: runs, total wall time and encode speed."""
+    totals = {}
+    for s in stats:
+        t = totals.setdefault(s['label'], {'runs': 0, 'wall_s': 0.0, 'frames': 0})
+        t['runs'] += 1
+        t['wall_s'] += s['wall_s']
+        t['frames'] += s['frames'] or 0
+    lines = []
+    for label, t in totals.items():
+        fps = f", {t['frames'] / t['wall_s']:.0f} fps" if t['frames'] and t['wall_s'] else ""
+        lines.append(f"ffmpeg {label}: {t['runs']} run(s), {t['wall_s']:.1f} s{fps}")
+    return "\n".join(lines)
@@ -0,0 +1,131 @@
+"""
+Font resolution and caching for subtitle rendering.
+
+The font is looked up in this order:
+1. configured paths (project setting 'font_path', then the AUTOVISUB_FONT env var)
+2. bundled fonts: any .ttf/.otf dropped into the fonts/ folder next to this file
+3. fontconfig (`fc-match`) for a sans-serif face that covers Vietnamese
+4. well-known system fonts on Windows, macOS and Linux
+5. PIL's built-in bitmap font
+
+Loaded FreeTypeFont objects are cached by (path, size), and the wrapped lines and
+their measured sizes are cached per (text, size), so laying out a line that was
+seen before costs nothing.
+"""
+import os
+import textwrap
+import shutil
+import subprocess
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+BUNDLED_FONTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts")
+
+SYSTEM_FONTS = [
+    # Windows
+    "C:/Windows/Fonts/arial.ttf",
+    "C:/Windows/Fonts/arialbd.ttf",
+    "C:/Windows/Fonts/times.ttf",
+    "C:/Windows/Fonts/calibri.ttf",
+    "C:/Windows/Fonts/seguisb.ttf",  # Segoe UI Semibold - good for Vietnamese
+    # macOS
+    "/System/Library/Fonts/Supplemental/Arial.ttf",
+    "/Library/Fonts/Arial.ttf",
+    # Linux
+    "/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf",
+    "/usr/share/fonts/noto/NotoSans-Regular.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+]
+
+
+def _bundled_fonts():
+    if not os.path.isdir(BUNDLED_FONTS_DIR):
+        return []
+    return [os.path.join(BUNDLED_FONTS_DIR, f) for f in sorted(os.listdir(BUNDLED_FONTS_DIR))
+            if f.lower().endswith((".ttf", ".otf"))]
+
+
+@lru_cache(maxsize=None)
+def _fontconfig_match(pattern="sans-serif:lang=vi"):
+    fc_match = shutil.which("fc-match")
+    if not fc_match:
+        return None
+    try:
+        result = subprocess.run([fc_match, "-f", "%{file}", pattern], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    path = result.stdout.strip()
+    return path if path and os.path.exists(path) else None
+
+
+def resolve_font(configured=None):
+    """First existing font file in the lookup order above, or None for PIL's default font."""
+    candidates = [p for p in (configured or []) if p]
+    candidates.append(os.environ.get("AUTOVISUB_FONT"))
+    candidates.extend(_bundled_fonts())
+    for path in candidates:
+        if path and os.path.exists(path):
+            return path
+    path = _fontconfig_match()
+    if path:
+        return path
+    for path in SYSTEM_FONTS:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+@lru_cache(maxsize=64)
+def load_font(path, size):
+    try:
+        if path:
+            return ImageFont.truetype(path, size)
+    except OSError as e:
+        print(f"Cannot load font {path}: {e}")
+    return ImageFont.load_default()
+
+
+# Only used to measure text
+_MEASURE = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+
+
+@lru_cache(maxsize=4096)
+def _layout(font_path, size, text, chars_per_line):
+    """FontManager.layout, cached by font path rather than by FontManager instance."""
+    font = load_font(font_path, size)
+    lines = textwrap.wrap(text, width=chars_per_line)
+    widths, heights = [], []
+    for line in lines:
+        try:
+            bbox = _MEASURE.textbbox((0, 0), line, font=font)
+            widths.append(bbox[2] - bbox[0])
+            heights.append(bbox[3] - bbox[1])
+        except AttributeError:
+            # Pillow < 8 has no textbbox
+            w, h = _MEASURE.textsize(line, font=font)
+            widths.append(w)
+            heights.append(h)
+    return tuple(lines), tuple(widths), tuple(heights)
+
+
+class FontManager:
+    def __init__(self, font_paths=None):
+        self.font_path = resolve_font(font_paths)
+
+    def get(self, size):
+        return load_font(self.font_path, size)
+
+    def line_height_ratio(self):
+        """(ascent + descent) / em size, measured at a large size so pixel rounding does not matter."""
+        font = self.get(1000)
+        if not hasattr(font, "getmetrics"):
+            return 1.0
+        ascent, descent = font.getmetrics()
+        return (ascent + descent) / 1000
+
+    def layout(self, text, size, chars_per_line=60):
+        """Wrapped lines of text with their widths and heights: (lines, widths, heights)."""
+        return _layout(self.font_path, size, text, chars_per_line)
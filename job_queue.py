@@ -0,0 +1,267 @@
+"""
+Multi-video job queue with one worker pool per pipeline stage.
+
+OCR and rendering are CPU heavy and run in process pools; translation and
+voiceover are network bound and run in thread pools with higher concurrency.
+Each job moves through the stages in order, but different jobs overlap, e.g.
+episode N renders while episode N+1 is in OCR.
+
+The queue is stored in projects/job_queue.json and survives restarts: stages
+that were running when the scheduler stopped go back to pending and resume
+from their own checkpoints. A failed stage is retried up to --max-retries
+times; after that it stays failed until `retry` puts it back in the queue.
+
+Pipeline options belong to `add` and are stored per job (e.g. --render-workers:
+processes for one video's render). `run` only sizes the stage pools (e.g.
+--render-jobs: videos rendered at the same time).
+
+Usage:
+    python job_queue.py add ep01.mp4 ep02.mp4 https://www.bilibili.com/video/BV... [pipeline options]
+    python job_queue.py run [--ocr-workers 2 --render-jobs 2 --io-workers 8 --max-retries 1]
+    python job_queue.py retry [job id ...]
+    python job_queue.py status
+"""
+import os
+import sys
+import time
+import uuid
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import project_state
+from project_state import PROJECTS_DIR
+from pipeline import STAGES, ProjectPipeline, add_pipeline_options, build_options, resolve_input
+
+QUEUE_FILE = "job_queue.json"
+
+# Stage -> pool kind. Translation and TTS share the IO pool settings but get separate pools
+STAGE_POOLS = {
+    'ocr': 'process',
+    'translate': 'thread',
+    'voiceover': 'thread',
+    'render': 'process'
+}
+
+
+def _run_stage(video_path, options, stage, projects_dir):
+    """Worker entry point (must be top-level so process pools can pickle it)."""
+    pipeline = ProjectPipeline(video_path, options, projects_dir=projects_dir,
+                               log=lambda msg: print(f"[{os.path.basename(video_path)}] {msg}"))
+    return pipeline.run_stage(stage)
+
+
+class JobQueue:
+    def __init__(self, projects_dir=PROJECTS_DIR):
+        self.projects_dir = projects_dir
+        os.makedirs(projects_dir, exist_ok=True)
+        self.jobs = project_state.load_json(projects_dir, QUEUE_FILE, default=[])
+
+    def save(self):
+        # Pick up jobs appended by `job_queue.py add` while a scheduler is running
+        on_disk = project_state.load_json(self.projects_dir, QUEUE_FILE, default=[])
+        known = {job['id'] for job in self.jobs}
+        self.jobs.extend(job for job in on_disk if job['id'] not in known)
+        project_state.save_json(self.projects_dir, QUEUE_FILE, self.jobs, indent=2)
+
+    def add(self, video_path, options=None, stages=STAGES):
+        job = {
+            'id': uuid.uuid4().hex[:8],
+            'video_path': os.path.abspath(video_path),
+            'options': options or {},
+            'stages': {stage: ('pending' if stage in stages else 'skipped') for stage in STAGES},
+            'timings': {},
+            'attempts': {},
+            'error': None,
+            'added_at': time.time()
+        }
+        self.jobs.append(job)
+        self.save()
+        return job
+
+    def recover(self):
+        """Stages left 'running' by a dead scheduler are retried (they resume from checkpoints)."""
+        for job in self.jobs:
+            for stage, status in job['stages'].items():
+                if status == 'running':
+                    job['stages'][stage] = 'pending'
+        self.save()
+
+    def retry(self, job_ids=None):
+        """
+        Puts the failed stages of the given jobs (all jobs if None) back to pending with a fresh
+        retry count. Returns the number of stages reset. Run it while no scheduler is running
+        (a running scheduler saves its own copy of the queue over it).
+        """
+        count = 0
+        for job in self.jobs:
+            if job_ids and job['id'] not in job_ids:
+                continue
+            failed = [stage for stage, status in job['stages'].items() if status == 'failed']
+            for stage in failed:
+                job['stages'][stage] = 'pending'
+                job.setdefault('attempts', {})[stage] = 0
+            if failed:
+                job['error'] = None
+            count += len(failed)
+        self.save()
+        return count
+
+    def next_stage(self, job):
+        """First pending stage of a job, or None if it is finished, failed or waiting on a running stage."""
+        for stage in STAGES:
+            status = job['stages'][stage]
+            if status in ('done', 'skipped'):
+                continue
+            if status == 'pending':
+                return stage
+            return None
+        return None
+
+
+class JobScheduler:
+    """Feeds pending job stages into per-stage pools, respecting each pool's concurrency limit."""
+
+    def __init__(self, queue, workers=None, poll=5.0, max_retries=1):
+        """max_retries: times a failed stage goes back to pending before it stays failed."""
+        cores = os.cpu_count() or 2
+        self.queue = queue
+        self.poll = poll
+        self.max_retries = max_retries
+        self.workers = {
+            'ocr': max(1, cores // 2),
+            'translate': 8,
+            'voiceover': 8,
+            'render': max(1, cores // 2)
+        }
+        if workers:
+            self.workers.update({k: v for k, v in workers.items() if v})
+        self.pools = {}
+        for stage, kind in STAGE_POOLS.items():
+            executor_cls = ProcessPoolExecutor if kind == 'process' else ThreadPoolExecutor
+            self.pools[stage] = executor_cls(max_workers=self.workers[stage])
+        self.in_flight = {}  # future -> (job, stage)
+
+    def _running_count(self, stage):
+        return sum(1 for _, s in self.in_flight.values() if s == stage)
+
+    def _submit_ready(self):
+        # Jobs are scanned in queue order so earlier episodes keep priority in every pool
+        for job in self.queue.jobs:
+            stage = self.queue.next_stage(job)
+            if stage is None or self._running_count(stage) >= self.workers[stage]:
+                continue
+            job['stages'][stage] = 'running'
+            future = self.pools[stage].submit(_run_stage, job['video_path'], job['options'], stage, self.queue.projects_dir)
+            self.in_flight[future] = (job, stage)
+            print(f"[{os.path.basename(job['video_path'])}] {stage} queued on {STAGE_POOLS[stage]} pool")
+        self.queue.save()
+
+    def _collect(self, done_futures):
+        for future in done_futures:
+            job, stage = self.in_flight.pop(future)
+            name = os.path.basename(job['video_path'])
+            try:
+                elapsed = future.result()
+                job['stages'][stage] = 'done'
+                job['timings'][stage] = round(elapsed, 2)
+                # A retried stage succeeded: drop the error from its earlier attempt
+                job['error'] = None
+                print(f"[{name}] {stage} finished in {elapsed:.1f}s")
+            except Exception as e:
+                attempts = job.setdefault('attempts', {})
+                attempts[stage] = attempts.get(stage, 0) + 1
+                job['error'] = f"{stage}: {e}"
+                if attempts[stage] <= self.max_retries:
+                    # Resumes from the stage's own checkpoints
+                    job['stages'][stage] = 'pending'
+                    print(f"[{name}] {stage} failed: {e} (retry {attempts[stage]}/{self.max_retries})")
+                else:
+                    job['stages'][stage] = 'failed'
+                    print(f"[{name}] {stage} failed: {e}")
+        self.queue.save()
+
+    def run(self, keep_running=False):
+        """Runs until every job is finished (or forever with keep_running, picking up newly added jobs)."""
+        self.queue.recover()
+        try:
+            while True:
+                self._submit_ready()
+                if not self.in_flight:
+                    if not keep_running:
+                        break
+                    time.sleep(self.poll)
+                    continue
+                done_futures, _ = wait(list(self.in_flight), timeout=self.poll, return_when=FIRST_COMPLETED)
+                self._collect(done_futures)
+        finally:
+            for pool in self.pools.values():
+                pool.shutdown(wait=True)
+
+
+def print_status(queue):
+    print(f"{'ID':8} {'Video':30} " + " ".join(f"{s:>10}" for s in STAGES))
+    for job in queue.jobs:
+        cells = []
+        for stage in STAGES:
+            status = job['stages'][stage]
+            if status == 'done' and stage in job['timings']:
+                status = f"{job['timings'][stage]:.0f}s"
+            cells.append(f"{status:>10}")
+        print(f"{job['id']:8} {os.path.basename(job['video_path'])[:30]:30} " + " ".join(cells))
+        if job.get('error'):
+            print(f"{'':8} error: {job['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AutoViSub multi-video job queue")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_add = sub.add_parser("add", help="Add videos/URLs to the queue")
+    p_add.add_argument("inputs", nargs="+")
+    p_add.add_argument("--stages", default=",".join(STAGES))
+    add_pipeline_options(p_add)
+
+    p_run = sub.add_parser("run", help="Process the queue")
+    p_run.add_argument("--ocr-workers", type=int, help="Videos in OCR at the same time")
+    p_run.add_argument("--render-jobs", type=int,
+                       help="Videos rendered at the same time (processes per render: add --render-workers)")
+    p_run.add_argument("--io-workers", type=int, help="Concurrency of the translation and voiceover pools")
+    p_run.add_argument("--max-retries", type=int, default=1, help="Retries of a failed stage before it stays failed")
+    p_run.add_argument("--poll", type=float, default=5.0)
+    p_run.add_argument("--keep-running", action="store_true", help="Keep waiting for newly added jobs")
+
+    p_retry = sub.add_parser("retry", help="Put failed stages back in the queue")
+    p_retry.add_argument("ids", nargs="*", help="Job IDs (default: every job with a failed stage)")
+
+    sub.add_parser("status", help="Show the queue")
+    args = parser.parse_args(argv)
+
+    queue = JobQueue()
+    if args.command == "add":
+        stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+        options = build_options(args)
+        for item in args.inputs:
+            video_path = resolve_input(item)
+            if not video_path or not os.path.exists(video_path):
+                print(f"Skipping {item}: cannot find or download video")
+                continue
+            job = queue.add(video_path, options, stages)
+            print(f"Added {job['id']}: {os.path.basename(video_path)}")
+    elif args.command == "run":
+        workers = {
+            'ocr': args.ocr_workers,
+            'render': args.render_jobs,
+            'translate': args.io_workers,
+            'voiceover': args.io_workers
+        }
+        JobScheduler(queue, workers, poll=args.poll, max_retries=args.max_retries).run(keep_running=args.keep_running)
+        print_status(queue)
+    elif args.command == "retry":
+        print(f"{queue.retry(args.ids)} failed stage(s) back to pending")
+    else:
+        print_status(queue)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
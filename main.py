@@ -7,6 +7,10 @@ import cv2
 from downloader import download_bilibili_video
 from sub_processor import SubtitleProcessor
 from video_renderer import render_video_with_vietnamese_subs
+from voice_generator import VOICE_OPTIONS, STYLE_PRESETS
+from audio_utils import load_pcm, mix_clips, wav_bytes
+from encoding_profiles import ENCODING_PROFILES, DEFAULT_PROFILE
+import project_state
 
 # --- Page Config & Theme ---
 st.set_page_config(page_title="AutoViSub Pro", page_icon="🎬", layout="wide")
@@ -345,29 +349,18 @@ if 'auto_mode' not in st.session_state:
     st.session_state.auto_mode = False
 if 'global_settings' not in st.session_state:
     # Load global settings from file if exists
-    if os.path.exists("global_settings.json"):
-        with open("global_settings.json", "r") as f:
-            st.session_state.global_settings = json.load(f)
-    else:
-        st.session_state.global_settings = {
-            'gemini_keys': [],
-            'default_engine': "Gemini AI (Pro/Flash)",
-            'default_batch_size': 80
-        }
+    st.session_state.global_settings = project_state.load_global_settings()
 if 'show_keys' not in st.session_state:
     st.session_state.show_keys = False
 
-PROJECTS_DIR = os.path.abspath("projects")
+PROJECTS_DIR = project_state.PROJECTS_DIR
 if not os.path.exists(PROJECTS_DIR): os.makedirs(PROJECTS_DIR)
 
 # Auto-load logic moved after definitions
 
 # --- Helper Functions ---
 def get_project_folder(video_path):
-    video_name = os.path.splitext(os.path.basename(video_path))[0]
-    folder = os.path.join(PROJECTS_DIR, video_name)
-    if not os.path.exists(folder): os.makedirs(folder)
-    return folder
+    return project_state.get_project_folder(video_path, PROJECTS_DIR)
 
 def save_global_settings():
     with open("global_settings.json", "w") as f:
@@ -376,30 +369,44 @@ def save_global_settings():
 def save_project_state():
     if st.session_state.project:
         folder = get_project_folder(st.session_state.project['video_path'])
-        with open(os.path.join(folder, "state.json"), "w", encoding="utf-8") as f:
-            state_to_save = {
-                'video_path': os.path.abspath(st.session_state.project.get('video_path')),
-                'srt_path': st.session_state.project.get('srt_path'),
-                'output_video_path': st.session_state.project.get('output_video_path'),
-                'detected_region': st.session_state.project.get('detected_region'),
-                'steps_completed': list(st.session_state.steps_completed),
-                'settings': {
-                    'font_size': st.session_state.get('font_size', 36),
-                    'bg_volume': st.session_state.get('bg_volume', 0.3),
-                    'selected_voice': st.session_state.get('selected_voice', "Hoài My (Female)"),
-                    'selected_style': st.session_state.get('selected_style', "Standard (Normal)"),
-                    'max_speed_limit': st.session_state.get('max_speed_limit', 0.25),
-                    'logo_path': st.session_state.get('logo_path'),
-                    'logo_position': st.session_state.get('logo_position', "Top-Right"),
-                    'logo_size': st.session_state.get('logo_size', 0.15),
-                    'logo_x': st.session_state.get('logo_x', 20),
-                    'logo_y': st.session_state.get('logo_y', 20),
-                    'gemini_keys_raw': st.session_state.get('gemini_keys_raw', ""),
-                    'gemini_batch_size': st.session_state.get('gemini_batch_size', 80),
-                    't_engine': st.session_state.get('t_engine', "Google Translate")
-                }
+        # Merge into what is on disk: keys the UI does not own (stage 'timings' and
+        # 'ffmpeg_timings' written by the pipeline) must survive a save from the UI
+        try:
+            state = project_state.load_state(folder)
+        except ValueError:
+            # Unreadable state.json: rewrite it from the UI as before
+            state = {}
+        ui_state = {
+            'video_path': os.path.abspath(st.session_state.project.get('video_path')),
+            'srt_path': st.session_state.project.get('srt_path'),
+            'output_video_path': st.session_state.project.get('output_video_path'),
+            'detected_region': st.session_state.project.get('detected_region'),
+            'steps_completed': list(st.session_state.steps_completed),
+            'settings': {
+                'font_size': st.session_state.get('font_size', 36),
+                'font_path': st.session_state.get('font_path'),
+                'subtitle_cover': st.session_state.get('subtitle_cover', "box"),
+                'encoding_profile': st.session_state.get('encoding_profile', DEFAULT_PROFILE),
+                'encoding_two_pass': st.session_state.get('encoding_two_pass', False),
+                'bg_volume': st.session_state.get('bg_volume', 0.3),
+                'selected_voice': st.session_state.get('selected_voice', "Hoài My (Female)"),
+                'selected_style': st.session_state.get('selected_style', "Standard (Normal)"),
+                'max_speed_limit': st.session_state.get('max_speed_limit', 0.25),
+                'vieneu_workers': st.session_state.get('vieneu_workers', 0),
+                'logo_path': st.session_state.get('logo_path'),
+                'logo_position': st.session_state.get('logo_position', "Top-Right"),
+                'logo_size': st.session_state.get('logo_size', 0.15),
+                'logo_x': st.session_state.get('logo_x', 20),
+                'logo_y': st.session_state.get('logo_y', 20),
+                'gemini_keys_raw': st.session_state.get('gemini_keys_raw', ""),
+                'gemini_batch_size': st.session_state.get('gemini_batch_size', 80),
+                't_engine': st.session_state.get('t_engine', "Google Translate")
             }
-            json.dump(state_to_save, f, ensure_ascii=False, indent=4)
+        }
+        settings = state.get('settings', {})
+        settings.update(ui_state.pop('settings'))
+        state.update(ui_state, settings=settings)
+        project_state.save_state(folder, state)
         
         # Save data caches
         if 'extracted_subs' in st.session_state:
@@ -435,10 +442,15 @@ def load_project(video_path):
     if 'settings' in project_data:
         s = project_data['settings']
         st.session_state.font_size = s.get('font_size', 36)
+        st.session_state.font_path = s.get('font_path')
+        st.session_state.subtitle_cover = s.get('subtitle_cover', "box")
+        st.session_state.encoding_profile = s.get('encoding_profile', DEFAULT_PROFILE)
+        st.session_state.encoding_two_pass = s.get('encoding_two_pass', False)
         st.session_state.bg_volume = s.get('bg_volume', 0.3)
         st.session_state.selected_voice = s.get('selected_voice', "Hoài My (Female)")
         st.session_state.selected_style = s.get('selected_style', "Standard (Normal)")
         st.session_state.max_speed_limit = s.get('max_speed_limit', 0.25)
+        st.session_state.vieneu_workers = s.get('vieneu_workers', 0)
         st.session_state.logo_path = s.get('logo_path')
         
         # Force detect if file exists even if not in settings or path changed
@@ -457,10 +469,15 @@ def load_project(video_path):
     else:
         # Defaults for new project
         st.session_state.font_size = 36
+        st.session_state.font_path = None
+        st.session_state.subtitle_cover = "box"
+        st.session_state.encoding_profile = DEFAULT_PROFILE
+        st.session_state.encoding_two_pass = False
         st.session_state.bg_volume = 0.3
         st.session_state.selected_voice = "Hoài My (Female)"
         st.session_state.selected_style = "Standard (Normal)"
         st.session_state.max_speed_limit = 0.25
+        st.session_state.vieneu_workers = 0
         # Detection for missing settings case
         auto_logo = os.path.join(folder, "logo.png")
         st.session_state.logo_path = auto_logo if os.path.exists(auto_logo) else None
@@ -485,12 +502,29 @@ def load_project(video_path):
             st.session_state.translated_subs = json.load(f)
 
     vo_path = os.path.join(folder, "voiceover_data.json")
+    st.session_state.voiceover_preview = None
     if os.path.exists(vo_path):
         with open(vo_path, "r", encoding="utf-8") as f:
             st.session_state.voiceover_data = json.load(f)
 
     st.session_state.current_step = "📁 Project Selection"
 
+ENCODING_LABELS = {"draft": "Draft (fast, large file)", "balanced": "Balanced (upload)", "archive": "Archive (slow, best quality)"}
+
+def encoding_controls(key, disabled=False):
+    """Encoding profile and two-pass pickers for the final encode, saved with the project."""
+    profiles = list(ENCODING_PROFILES)
+    current = st.session_state.get('encoding_profile', DEFAULT_PROFILE)
+    profile = st.selectbox("Encoding Profile", profiles, format_func=lambda p: ENCODING_LABELS.get(p, p),
+                           index=profiles.index(current) if current in profiles else profiles.index(DEFAULT_PROFILE),
+                           help="x264 speed/size trade-off of the final encode.", key=f"{key}_profile", disabled=disabled)
+    two_pass = st.checkbox("Two-pass (predictable size, ~2x encode time)", st.session_state.get('encoding_two_pass', False),
+                           key=f"{key}_two_pass", disabled=disabled)
+    if (profile, two_pass) != (current, st.session_state.get('encoding_two_pass', False)):
+        st.session_state.encoding_profile = profile
+        st.session_state.encoding_two_pass = two_pass
+        save_project_state()
+
 # Auto-load last project on refresh (Now called after load_project is defined)
 if st.session_state.project is None:
     last_p_file = os.path.join(PROJECTS_DIR, "last_project.txt")
@@ -650,6 +684,7 @@ if st.session_state.current_step == "📁 Project Selection":
             st.success("✅ Video Loaded & Ready")
             
             st.markdown("Run the complete pipeline from OCR to Final Video Render automatically.")
+            encoding_controls("auto")
             if st.button("🚀 START FULL AUTO MODE", type="primary", use_container_width=True):
                 # Clear previous progress to force it to actually run
                 st.session_state.steps_completed = {1}
@@ -729,10 +764,18 @@ elif st.session_state.current_step == "🔍 Subtitle Extraction":
                 log_detect = status.empty()
                 log_detect.write("🔍 Analyzing Subtitle Region...")
                 
-                from auto_detect_region import auto_detect_subtitle_region
-                def update_detect(p): progress_ocr.progress(min(0.1, p * 0.1), text=f"Detecting region: {int(p*100)}%")
-                region = auto_detect_subtitle_region(st.session_state.project['video_path'], progress_callback=update_detect)
-                st.session_state.project['detected_region'] = region
+                folder = get_project_folder(st.session_state.project['video_path'])
+                ocr_checkpoint = os.path.join(folder, "ocr_checkpoint.json")
+                
+                if os.path.exists(ocr_checkpoint) and st.session_state.project.get('detected_region'):
+                    # Interrupted run: keep the same region so the checkpoint stays valid
+                    region = st.session_state.project['detected_region']
+                else:
+                    from auto_detect_region import auto_detect_subtitle_region
+                    def update_detect(p): progress_ocr.progress(min(0.1, p * 0.1), text=f"Detecting region: {int(p*100)}%")
+                    region = auto_detect_subtitle_region(st.session_state.project['video_path'], progress_callback=update_detect)
+                    st.session_state.project['detected_region'] = region
+                    save_project_state()
                 log_detect.empty()
                 
                 log_ocr = status.empty()
@@ -764,7 +807,8 @@ elif st.session_state.current_step == "🔍 Subtitle Extraction":
                     progress_callback=update_ocr,
                     min_text_len=f_min_len,
                     min_duration=f_min_dur,
-                    step=f_step
+                    step=f_step,
+                    checkpoint_path=ocr_checkpoint
                 )
                 
                 log_ocr.empty()
@@ -866,6 +910,8 @@ elif st.session_state.current_step == "🌐 Translation":
                 "LM Studio (Gemma)": "lm-studio"
             }
             engine_key = engine_map[t_engine]
+            folder = get_project_folder(st.session_state.project['video_path'])
+            t_checkpoint = os.path.join(folder, "translation_checkpoint.json")
             
             translated = processor.translate_subtitles(
                 st.session_state.extracted_subs, 
@@ -874,10 +920,11 @@ elif st.session_state.current_step == "🌐 Translation":
                 lm_studio_url=lm_url if engine_key == 'lm-studio' else None,
                 gemini_keys=st.session_state.global_settings.get('gemini_keys', []) if engine_key == 'gemini' else None,
                 gemini_batch_size=st.session_state.get('gemini_batch_size', 80) if engine_key == 'gemini' else 80,
-                custom_prompt=custom_prompt
+                custom_prompt=custom_prompt,
+                checkpoint_path=t_checkpoint
             )
+            if os.path.exists(t_checkpoint): os.remove(t_checkpoint)
             
-            folder = get_project_folder(st.session_state.project['video_path'])
             srt_path = os.path.join(folder, "subtitles_vi.srt")
             processor.save_to_srt(translated, srt_path)
             
@@ -928,21 +975,13 @@ elif st.session_state.current_step == "🎙️ VoiceOver":
         if st.session_state.v_engine == 'edge-tts':
             col_v1, col_v2 = st.columns([1, 1])
             with col_v1:
-                voice_opts = {
-                    "Hoài My (Female)": "vi-VN-HoaiMyNeural",
-                    "Nam Minh (Male)": "vi-VN-NamMinhNeural"
-                }
+                voice_opts = VOICE_OPTIONS
                 if 'selected_voice' not in st.session_state: st.session_state.selected_voice = list(voice_opts.keys())[0]
                 selected_voice = st.selectbox("Select Voice", list(voice_opts.keys()), index=list(voice_opts.keys()).index(st.session_state.selected_voice), disabled=st.session_state.auto_mode)
                 st.session_state.selected_voice = selected_voice
             
             with col_v2:
-                style_opts = {
-                    "Young Girl (Cute/High Pitch)": {"pitch": "+30Hz", "rate": "+5%"},
-                    "Standard (Normal)": {"pitch": "+0Hz", "rate": "+0%"},
-                    "Dramatic Movie Review": {"pitch": "-4Hz", "rate": "+15%"},
-                    "Storytelling (Soft)": {"pitch": "+0Hz", "rate": "-5%"}
-                }
+                style_opts = STYLE_PRESETS
                 if 'selected_style' not in st.session_state: st.session_state.selected_style = list(style_opts.keys())[1]
                 selected_style = st.selectbox("Style Preset", list(style_opts.keys()), index=list(style_opts.keys()).index(st.session_state.selected_style), disabled=st.session_state.auto_mode)
                 st.session_state.selected_style = selected_style
@@ -973,7 +1012,9 @@ elif st.session_state.current_step == "🎙️ VoiceOver":
                     voice=v_id,
                     pitch=v_params['pitch'],
                     rate=v_params['rate'],
-                    max_speed_limit=max_speed_val
+                    max_speed_limit=max_speed_val,
+                    # Project setting (0 = fit to cores and RAM); only used by the VieNeu engine
+                    vieneu_workers=st.session_state.get('vieneu_workers', 0) or None
                 )
                 
                 folder = get_project_folder(st.session_state.project['video_path'])
@@ -990,16 +1031,21 @@ elif st.session_state.current_step == "🎙️ VoiceOver":
                     st.session_state.translated_subs, 
                     audio_dir, 
                     video_duration_ms=duration_ms,
-                    progress_callback=update_v
+                    progress_callback=update_v,
+                    resume=True
                 )
                 
                 if audio_data:
-                    full_audio_path = os.path.join(folder, "full_voiceover.mp3")
-                    vg.create_full_audio_track(audio_data, duration_ms, full_audio_path)
+                    placements = vg.plan_timeline(audio_data, duration_ms)
+                    clips = vg.export_placed_clips(audio_data, placements)
+                    # Preview track mixed in memory from the clips still decoded; the render mixes the clips itself
+                    st.session_state.voiceover_preview = wav_bytes(vg.mix_placed_clips(clips, duration_ms))
                     
                     st.session_state.voiceover_data = {
-                        'full_audio_path': full_audio_path,
-                        'audio_data': audio_data
+                        'full_audio_path': None,
+                        'audio_data': audio_data,
+                        'placements': placements,
+                        'clips': clips
                     }
                     with open(os.path.join(folder, "voiceover_data.json"), "w", encoding="utf-8") as f:
                         json.dump(st.session_state.voiceover_data, f, ensure_ascii=False)
@@ -1010,8 +1056,24 @@ elif st.session_state.current_step == "🎙️ VoiceOver":
                         time.sleep(1.5) # Prevent ghosting
                     st.rerun()
 
-        if 'voiceover_data' in st.session_state:
-            st.audio(st.session_state.voiceover_data['full_audio_path'])
+        voice_data = st.session_state.get('voiceover_data') or {}
+        if voice_data.get('clips'):
+            if st.session_state.get('voiceover_preview') is None:
+                # Project loaded from disk: decode and mix the placed clips on request
+                if st.button("🎧 Mix voiceover preview", use_container_width=True):
+                    cap = cv2.VideoCapture(st.session_state.project['video_path'])
+                    duration_ms = int((cap.get(cv2.CAP_PROP_FRAME_COUNT) / cap.get(cv2.CAP_PROP_FPS)) * 1000)
+                    cap.release()
+                    track = mix_clips([(c['start_ms'], load_pcm(c['path'])) for c in voice_data['clips']
+                                       if os.path.exists(c['path'])], duration_ms)
+                    st.session_state.voiceover_preview = wav_bytes(track)
+            if st.session_state.get('voiceover_preview') is not None:
+                st.audio(st.session_state.voiceover_preview, format="audio/wav")
+                st.download_button("⬇️ DOWNLOAD VOICEOVER (WAV)", st.session_state.voiceover_preview,
+                                   file_name="full_voiceover.wav", mime="audio/wav", use_container_width=True)
+        elif voice_data.get('full_audio_path') and os.path.exists(voice_data['full_audio_path']):
+            # Projects voiced before the clips were kept separately
+            st.audio(voice_data['full_audio_path'])
 
 # ==========================================
 # STEP 5: VIDEO RENDERING
@@ -1028,6 +1090,20 @@ elif st.session_state.current_step == "🎬 Video Rendering":
         fsize = st.slider("Subtitle Font Size", 20, 60, st.session_state.font_size, disabled=st.session_state.auto_mode)
         st.session_state.font_size = fsize
 
+        font_path = st.text_input("Subtitle Font File (optional)", st.session_state.get('font_path') or "",
+                                  help="Path to a .ttf/.otf font with Vietnamese glyphs. Empty = fonts/ folder or system font.",
+                                  disabled=st.session_state.auto_mode)
+        st.session_state.font_path = font_path.strip() or None
+
+        cover_options = {"box": "Black box", "inpaint": "Inpaint (remove original text)"}
+        cover = st.selectbox("Original Subtitle", list(cover_options), format_func=cover_options.get,
+                             index=list(cover_options).index(st.session_state.get('subtitle_cover', "box")),
+                             help="Inpaint fills the original text from its surroundings (uses the OCR boxes) instead of covering it.",
+                             disabled=st.session_state.auto_mode)
+        st.session_state.subtitle_cover = cover
+
+        encoding_controls("render", disabled=st.session_state.auto_mode)
+
         if 'bg_volume' not in st.session_state: st.session_state.bg_volume = 0.3
         bg_volume = st.slider("Original Video Volume", 0.0, 1.0, st.session_state.bg_volume, 0.05, 
                              help="How loud the original video sound should be.", disabled=st.session_state.auto_mode)
@@ -1093,6 +1169,41 @@ elif st.session_state.current_step == "🎬 Video Rendering":
                 st.session_state.logo_path = None
                 st.rerun()
 
+        # --- PREVIEW RENDER (low-res, same compositing as the export) ---
+        with st.expander("🔍 Preview Render"):
+            from video_renderer import VideoRenderer
+            subs = st.session_state.get('translated_subs') or []
+            p_start = st.number_input("Preview start (s)", 0.0, value=float(subs[0]['start']) if subs else 0.0, step=1.0,
+                                      key='preview_start')
+            preview_args = dict(
+                subtitle_region=project.get('detected_region'),
+                font_size=fsize,
+                logo_path=st.session_state.get('logo_path'),
+                logo_position=st.session_state.get('logo_position', "Top-Right"),
+                logo_size=st.session_state.get('logo_size', 0.15),
+                logo_x=st.session_state.get('logo_x', 20),
+                logo_y=st.session_state.get('logo_y', 20),
+                cover=st.session_state.get('subtitle_cover', "box"),
+                cache_dir=get_project_folder(project['video_path'])
+            )
+            pv1, pv2 = st.columns(2)
+            with pv1:
+                if st.button("▶️ Preview 3 s", use_container_width=True):
+                    with st.spinner("Rendering preview..."):
+                        clip = VideoRenderer(st.session_state.get('font_path')).render_preview_clip(
+                            project['video_path'], subs, p_start, 3.0, **preview_args)
+                    if clip:
+                        st.video(clip)
+                    else:
+                        st.warning("ffmpeg not found, use the sample frames preview.")
+            with pv2:
+                if st.button("🖼️ Sample Frames", use_container_width=True, disabled=not subs):
+                    with st.spinner("Rendering preview..."):
+                        strip = VideoRenderer(st.session_state.get('font_path')).render_preview_strip(
+                            project['video_path'], subs, **preview_args)
+                    if strip is not None:
+                        st.image(cv2.cvtColor(strip, cv2.COLOR_BGR2RGB), caption="Subtitle samples")
+
         if st.button("🎬 EXPORT FINAL VIDEO", type="primary", use_container_width=True, disabled=st.session_state.auto_mode) or st.session_state.auto_mode:
             if 5 in st.session_state.steps_completed and st.session_state.auto_mode:
                 # Project complete, stop auto mode
@@ -1106,7 +1217,9 @@ elif st.session_state.current_step == "🎬 Video Rendering":
             
             def update_r(p): prog_r.progress(p, text=f"Rendering Final Video: {int(p*100)}%")
             
-            voice_path = st.session_state.voiceover_data['full_audio_path'] if 'voiceover_data' in st.session_state else None
+            voice_data = st.session_state.get('voiceover_data') or {}
+            voice_path = voice_data.get('full_audio_path')
+            voice_clips = voice_data.get('clips')
 
             render_video_with_vietnamese_subs(
                 project['video_path'],
@@ -1114,8 +1227,13 @@ elif st.session_state.current_step == "🎬 Video Rendering":
                 out_path,
                 subtitle_region=project.get('detected_region'),
                 font_size=fsize,
+                font_path=st.session_state.get('font_path'),
+                cover=st.session_state.get('subtitle_cover', "box"),
+                encoding_profile=st.session_state.get('encoding_profile', DEFAULT_PROFILE),
+                two_pass=st.session_state.get('encoding_two_pass', False),
                 progress_callback=update_r,
                 voiceover_audio=voice_path,
+                voiceover_clips=voice_clips,
                 original_volume=bg_volume,
                 logo_path=st.session_state.get('logo_path'),
                 logo_position=st.session_state.get('logo_position', "Top-Right"),
@@ -0,0 +1,430 @@
+"""
+Headless OCR -> Translate -> VoiceOver -> Render pipeline.
+
+Uses the same project folder layout and state.json format as the Streamlit app,
+so a project started here can be opened in the UI (and the other way around).
+
+Usage:
+    python pipeline.py video1.mp4 https://www.bilibili.com/video/BV... [options]
+    python pipeline.py --watch incoming/ [--poll 30] [options]
+"""
+import os
+import sys
+import time
+import argparse
+
+import project_state
+import ffmpeg_runner
+from project_state import PROJECTS_DIR, DEFAULT_SETTINGS
+from encoding_profiles import ENCODING_PROFILES
+
+VIDEO_EXTS = ('.mp4', '.mkv', '.avi')
+
+# UI display names <-> engine keys, kept identical to main.py
+TRANSLATION_ENGINES = {
+    "Google Translate": "google",
+    "Gemini AI (Pro/Flash)": "gemini",
+    "LM Studio (Gemma)": "lm-studio"
+}
+
+STAGES = ['ocr', 'translate', 'voiceover', 'render']
+
+# Stage -> step number in state.json 'steps_completed' (1 = project loaded)
+STAGE_STEPS = {'ocr': 2, 'translate': 3, 'voiceover': 4, 'render': 5}
+
+
+def get_video_duration_ms(video_path):
+    import cv2
+    cap = cv2.VideoCapture(video_path)
+    duration_ms = int((cap.get(cv2.CAP_PROP_FRAME_COUNT) / cap.get(cv2.CAP_PROP_FPS)) * 1000)
+    cap.release()
+    return duration_ms
+
+
+class ProjectPipeline:
+    """
+    Runs the pipeline stages for one video. Each stage reads its input from and
+    writes its output to the project folder, so stages can run in separate processes.
+    """
+
+    def __init__(self, video_path, options=None, projects_dir=PROJECTS_DIR, log=print):
+        self.video_path = os.path.abspath(video_path)
+        self.options = options or {}
+        self.folder = project_state.get_project_folder(self.video_path, projects_dir)
+        self.log = log
+        self._processor = None
+
+        self.state = project_state.load_state(self.folder)
+        self.state['video_path'] = self.video_path
+        self.state.setdefault('steps_completed', [1])
+        settings = dict(DEFAULT_SETTINGS)
+        settings.update(self.state.get('settings', {}))
+        # Explicit options win over what was saved in the project
+        for key in DEFAULT_SETTINGS:
+            if self.options.get(key) is not None:
+                settings[key] = self.options[key]
+        self.state['settings'] = settings
+
+    @property
+    def settings(self):
+        return self.state['settings']
+
+    def save(self):
+        project_state.save_state(self.folder, self.state)
+
+    def is_done(self, stage):
+        return STAGE_STEPS[stage] in self.state['steps_completed']
+
+    def _mark_done(self, stage):
+        step = STAGE_STEPS[stage]
+        # Re-running a stage invalidates everything downstream, like the UI does
+        self.state['steps_completed'] = sorted(s for s in set(self.state['steps_completed']) if s < step) + [step]
+        self.save()
+
+    def _get_processor(self):
+        if self._processor is None:
+            from sub_processor import SubtitleProcessor
+            self._processor = SubtitleProcessor(lang=self.options.get('lang', 'ch'),
+                                                engine=self.options.get('ocr_engine', 'rapid'))
+        return self._processor
+
+    def run_ocr(self, progress_callback=None):
+        ocr_checkpoint = os.path.join(self.folder, "ocr_checkpoint.json")
+        # Keep a saved region (detected earlier or set in the app); detect only when there is none
+        region = self.state.get('detected_region')
+        if not region:
+            from auto_detect_region import auto_detect_subtitle_region
+            region = auto_detect_subtitle_region(self.video_path)
+            self.state['detected_region'] = list(region)
+            self.save()
+
+        processor = self._get_processor()
+        subs = processor.extract_subtitles(
+            self.video_path,
+            crop_region=region,
+            progress_callback=(lambda p, preview=None: progress_callback(p)) if progress_callback else None,
+            min_text_len=self.options.get('min_text_len', 2),
+            min_duration=self.options.get('min_duration', 0.5),
+            step=self.options.get('step', 6),
+            checkpoint_path=ocr_checkpoint
+        )
+        project_state.save_json(self.folder, "extracted_subs.json", subs)
+        self._mark_done('ocr')
+        return subs
+
+    def run_translate(self, progress_callback=None):
+        subs = project_state.load_json(self.folder, "extracted_subs.json")
+        if subs is None:
+            raise RuntimeError("Missing extracted_subs.json, run OCR first")
+
+        engine_key = TRANSLATION_ENGINES.get(self.settings['t_engine'], 'google')
+        gemini_keys = [k.strip() for k in self.settings.get('gemini_keys_raw', "").split("\n") if k.strip()]
+        if not gemini_keys:
+            gemini_keys = project_state.load_global_settings().get('gemini_keys', [])
+
+        t_checkpoint = os.path.join(self.folder, "translation_checkpoint.json")
+        if self._processor is None:
+            from sub_processor import SubtitleProcessor
+            processor = SubtitleProcessor(engine=None)
+        else:
+            processor = self._processor
+        translated = processor.translate_subtitles(
+            subs,
+            progress_callback=progress_callback,
+            engine=engine_key,
+            lm_studio_url=self.options.get('lm_studio_url') if engine_key == 'lm-studio' else None,
+            custom_prompt=self.options.get('custom_prompt'),
+            gemini_keys=gemini_keys if engine_key == 'gemini' else None,
+            gemini_batch_size=self.settings['gemini_batch_size'],
+            checkpoint_path=t_checkpoint
+        )
+        if os.path.exists(t_checkpoint): os.remove(t_checkpoint)
+
+        srt_path = os.path.join(self.folder, "subtitles_vi.srt")
+        processor.save_to_srt(translated, srt_path)
+        project_state.save_json(self.folder, "translated_subs.json", translated)
+        self.state['srt_path'] = srt_path
+        self._mark_done('translate')
+        return translated
+
+    def run_voiceover(self, progress_callback=None):
+        from voice_generator import VoiceOverGenerator, VOICE_OPTIONS, STYLE_PRESETS
+
+        translated = project_state.load_json(self.folder, "translated_subs.json")
+        if translated is None:
+            raise RuntimeError("Missing translated_subs.json, run translation first")
+
+        method = self.options.get('v_engine', 'edge-tts')
+        if method == 'edge-tts':
+            voice = VOICE_OPTIONS[self.settings['selected_voice']]
+            v_params = STYLE_PRESETS[self.settings['selected_style']]
+        else:
+            voice = "vi"
+            v_params = {'pitch': "+0Hz", 'rate': "+0%"}
+
+        vg = VoiceOverGenerator(
+            method=method,
+            voice=voice,
+            pitch=v_params['pitch'],
+            rate=v_params['rate'],
+            max_speed_limit=self.settings['max_speed_limit'],
+            vieneu_workers=self.settings['vieneu_workers'] or None,
+            stretch_engine=self.options.get('stretch_engine', 'wsola')
+        )
+        duration_ms = get_video_duration_ms(self.video_path)
+        audio_data = vg.generate_voiceovers(
+            translated,
+            os.path.join(self.folder, "voiceovers"),
+            video_duration_ms=duration_ms,
+            progress_callback=progress_callback,
+            resume=True
+        )
+        if not audio_data:
+            raise RuntimeError("No voiceover clip was generated")
+
+        # No full track here: the render stage mixes the placed clips inside its ffmpeg graph
+        placements = vg.plan_timeline(audio_data, duration_ms)
+        clips = vg.export_placed_clips(audio_data, placements)
+        project_state.save_json(self.folder, "voiceover_data.json", {
+            'full_audio_path': None,
+            'audio_data': audio_data,
+            'placements': placements,
+            'clips': clips
+        })
+        self._mark_done('voiceover')
+        return clips
+
+    def run_render(self, progress_callback=None):
+        from video_renderer import render_video_with_vietnamese_subs
+
+        translated = project_state.load_json(self.folder, "translated_subs.json")
+        if translated is None:
+            raise RuntimeError("Missing translated_subs.json, run translation first")
+        voiceover_data = project_state.load_json(self.folder, "voiceover_data.json")
+        voice_path = voiceover_data.get('full_audio_path') if voiceover_data else None
+        voice_clips = voiceover_data.get('clips') if voiceover_data else None
+
+        s = self.settings
+        out_path = os.path.join(self.folder, f"translated_{os.path.basename(self.video_path)}")
+        render_video_with_vietnamese_subs(
+            self.video_path,
+            translated,
+            out_path,
+            subtitle_region=self.state.get('detected_region'),
+            font_size=s['font_size'],
+            font_path=s.get('font_path'),
+            cover=s.get('subtitle_cover', "box"),
+            encoding_profile=s.get('encoding_profile'),
+            two_pass=s.get('encoding_two_pass', False),
+            progress_callback=progress_callback,
+            voiceover_audio=voice_path,
+            voiceover_clips=voice_clips,
+            original_volume=s['bg_volume'],
+            logo_path=s.get('logo_path'),
+            logo_position=s['logo_position'],
+            logo_size=s['logo_size'],
+            logo_x=s['logo_x'],
+            logo_y=s['logo_y'],
+            passthrough=self.options.get('passthrough', False),
+            ffmpeg_logo=self.options.get('ffmpeg_logo', False),
+            workers=self.options.get('render_workers', 1),
+            backend=self.options.get('subtitle_backend', "python")
+        )
+        self.state['output_video_path'] = out_path
+        self._mark_done('render')
+        return out_path
+
+    def run_stage(self, stage, progress_callback=None):
+        """
+        Runs one stage and records its wall time in state.json under 'timings', and the
+        ffmpeg calls it made (in this thread) under 'ffmpeg_timings'.
+        """
+        start = time.perf_counter()
+        with ffmpeg_runner.collect() as runs:
+            getattr(self, f"run_{stage}")(progress_callback)
+        elapsed = time.perf_counter() - start
+        self.state.setdefault('timings', {})[stage] = round(elapsed, 2)
+        if runs:
+            self.state.setdefault('ffmpeg_timings', {})[stage] = runs
+            self.log(ffmpeg_runner.summarize(runs))
+        self.save()
+        return elapsed
+
+    def run(self, stages=STAGES, force=False):
+        """Runs the given stages in order, skipping those already completed. Returns {stage: seconds}."""
+        timings = {}
+        for stage in stages:
+            if not force and self.is_done(stage):
+                self.log(f"[{stage}] already done, skipping")
+                continue
+            self.log(f"[{stage}] started")
+            timings[stage] = self.run_stage(stage)
+            self.log(f"[{stage}] finished in {timings[stage]:.1f}s")
+        return timings
+
+
+def resolve_input(item):
+    """Downloads URLs into downloads/, returns local paths unchanged."""
+    if item.startswith(("http://", "https://")):
+        from downloader import download_bilibili_video
+        return download_bilibili_video(item, output_path=os.path.abspath("downloads"))
+    return item
+
+
+def list_videos(folder):
+    return sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(VIDEO_EXTS))
+
+
+def print_report(report):
+    print("\n" + "=" * 60)
+    print(f"{'Video':30} " + " ".join(f"{s:>10}" for s in STAGES) + f" {'total':>10}")
+    for name, timings in report:
+        cells = [f"{timings[s]:>9.1f}s" if s in timings else f"{'-':>10}" for s in STAGES]
+        print(f"{name[:30]:30} " + " ".join(cells) + f" {sum(timings.values()):>9.1f}s")
+    print("=" * 60)
+
+
+def add_pipeline_options(parser):
+    """Per-video options shared by this CLI and the job queue."""
+    parser.add_argument("--ocr-engine", choices=["rapid", "easyocr"], default="rapid")
+    parser.add_argument("--lang", choices=["ch", "en", "ja", "ko"], default="ch")
+    parser.add_argument("--min-text-len", type=int, default=2)
+    parser.add_argument("--min-duration", type=float, default=0.5)
+    parser.add_argument("--step", type=int, default=6, help="OCR frame skip")
+
+    parser.add_argument("--engine", choices=list(TRANSLATION_ENGINES.values()), help="Translation engine")
+    parser.add_argument("--gemini-key", action="append", help="Gemini API key (repeatable, default: global_settings.json)")
+    parser.add_argument("--gemini-batch-size", type=int)
+    parser.add_argument("--lm-studio-url", default="http://localhost:1234/v1")
+
+    parser.add_argument("--voice-engine", choices=["edge-tts", "gtts", "vieneu"], default="edge-tts")
+    parser.add_argument("--vieneu-workers", type=int,
+                        help="VieNeu worker processes (0 = fit to cores and RAM, 1 = in-process; default: the project's)")
+    parser.add_argument("--stretch-engine", choices=["wsola", "pydub"], default="wsola",
+                        help="How VieNeu/gTTS lines that overflow their slot are sped up")
+    parser.add_argument("--voice", help="Voice display name, e.g. 'Nam Minh (Male)'")
+    parser.add_argument("--style", help="Style preset name, e.g. 'Standard (Normal)'")
+    parser.add_argument("--max-speed-limit", type=float)
+
+    parser.add_argument("--font-size", type=int)
+    parser.add_argument("--font", help="Subtitle font file (.ttf/.otf), default: fonts/ folder or a system font")
+    parser.add_argument("--bg-volume", type=float)
+    parser.add_argument("--logo", help="Logo image path")
+    parser.add_argument("--cover", choices=["box", "inpaint"],
+                        help="Hide the original subtitle with a black box or remove it by inpainting")
+    parser.add_argument("--encoding-profile", choices=list(ENCODING_PROFILES),
+                        help="x264 settings of the final encode (default: the project's, else balanced)")
+    parser.add_argument("--two-pass", action="store_true", default=None,
+                        help="Two-pass encode to the profile's average bitrate (predictable size)")
+    parser.add_argument("--subtitle-backend", choices=["python", "ass"], default="python",
+                        help="ass: burn subtitles in with ffmpeg/libass in the encoding pass, no Python frame loop")
+    parser.add_argument("--render-workers", type=int, default=1,
+                        help="Render processes, each on its own keyframe-aligned segment (0 = one per CPU core)")
+    parser.add_argument("--ffmpeg-logo", action="store_true",
+                        help="Draw the logo with ffmpeg's overlay filter during the encode instead of in Python")
+    parser.add_argument("--passthrough", action="store_true",
+                        help="Re-encode only the segments with subtitles, copy the rest (no logo, H.264 sources)")
+
+
+def build_options(args):
+    options = {
+        'ocr_engine': args.ocr_engine,
+        'lang': args.lang,
+        'min_text_len': args.min_text_len,
+        'min_duration': args.min_duration,
+        'step': args.step,
+        'lm_studio_url': args.lm_studio_url,
+        'v_engine': args.voice_engine,
+        'vieneu_workers': args.vieneu_workers,
+        'stretch_engine': args.stretch_engine,
+        'font_size': args.font_size,
+        'font_path': args.font,
+        'subtitle_cover': args.cover,
+        'encoding_profile': args.encoding_profile,
+        'encoding_two_pass': args.two_pass,
+        'bg_volume': args.bg_volume,
+        'selected_voice': args.voice,
+        'selected_style': args.style,
+        'max_speed_limit': args.max_speed_limit,
+        'logo_path': args.logo,
+        'gemini_batch_size': args.gemini_batch_size,
+        'passthrough': args.passthrough,
+        'ffmpeg_logo': args.ffmpeg_logo,
+        'render_workers': args.render_workers,
+        'subtitle_backend': args.subtitle_backend
+    }
+    if args.engine:
+        options['t_engine'] = {v: k for k, v in TRANSLATION_ENGINES.items()}[args.engine]
+    if args.gemini_key:
+        options['gemini_keys_raw'] = "\n".join(args.gemini_key)
+    return options
+
+
+def process_video(item, options, stages, force, report):
+    video_path = resolve_input(item)
+    if not video_path or not os.path.exists(video_path):
+        print(f"Skipping {item}: cannot find or download video")
+        return False
+    print(f"\n=== {os.path.basename(video_path)} ===")
+    pipeline = ProjectPipeline(video_path, options)
+    try:
+        report.append((os.path.basename(video_path), pipeline.run(stages, force=force)))
+        return True
+    except Exception as e:
+        print(f"Pipeline failed for {video_path}: {e}")
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AutoViSub headless pipeline (OCR -> translate -> voiceover -> render)")
+    parser.add_argument("inputs", nargs="*", help="Video files or Bilibili URLs")
+    parser.add_argument("--watch", help="Folder to watch for new videos")
+    parser.add_argument("--poll", type=float, default=30, help="Watch folder poll interval in seconds")
+    parser.add_argument("--once", action="store_true", help="With --watch: process what is there and exit")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma separated subset of: " + ",".join(STAGES))
+    parser.add_argument("--force", action="store_true", help="Re-run stages already marked as completed")
+
+    add_pipeline_options(parser)
+    args = parser.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stages: {unknown}")
+    if not args.inputs and not args.watch:
+        parser.error("Give at least one video/URL or --watch FOLDER")
+
+    options = build_options(args)
+    report = []
+    ok = True
+    for item in args.inputs:
+        ok = process_video(item, options, stages, args.force, report) and ok
+
+    if args.watch:
+        seen = set()
+        sizes = {}
+        try:
+            while True:
+                for video in list_videos(args.watch):
+                    if video in seen:
+                        continue
+                    # Wait until the file stops growing (still being copied in)
+                    size = os.path.getsize(video)
+                    if not args.once and sizes.get(video) != size:
+                        sizes[video] = size
+                        continue
+                    seen.add(video)
+                    ok = process_video(video, options, stages, args.force, report) and ok
+                if args.once:
+                    break
+                time.sleep(args.poll)
+        except KeyboardInterrupt:
+            print("\nStopped watching")
+
+    if report:
+        print_report(report)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import os
+import json
+
+# Same layout as the Streamlit app: projects/<video name>/state.json + data caches
+PROJECTS_DIR = os.path.abspath("projects")
+
+DEFAULT_SETTINGS = {
+    'font_size': 36,
+    'font_path': None,
+    'subtitle_cover': "box",
+    'encoding_profile': "balanced",
+    'encoding_two_pass': False,
+    'bg_volume': 0.3,
+    'selected_voice': "Hoài My (Female)",
+    'selected_style': "Standard (Normal)",
+    'max_speed_limit': 0.25,
+    'vieneu_workers': 0,
+    'logo_path': None,
+    'logo_position': "Top-Right",
+    'logo_size': 0.15,
+    'logo_x': 20,
+    'logo_y': 20,
+    'gemini_keys_raw': "",
+    'gemini_batch_size': 80,
+    't_engine': "Google Translate"
+}
+
+
+def get_project_folder(video_path, projects_dir=PROJECTS_DIR):
+    """Returns (and creates) the project folder of a video."""
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    folder = os.path.join(projects_dir, video_name)
+    if not os.path.exists(folder): os.makedirs(folder)
+    return folder
+
+
+def load_json(folder, name, default=None):
+    path = os.path.join(folder, name)
+    if not os.path.exists(path):
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(folder, name, data, indent=None):
+    """Writes through a temp file so a crash never leaves a truncated cache behind."""
+    path = os.path.join(folder, name)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+    os.replace(tmp_path, path)
+
+
+def load_state(folder):
+    return load_json(folder, "state.json", default={})
+
+
+def save_state(folder, state):
+    save_json(folder, "state.json", state, indent=4)
+
+
+def load_global_settings(path="global_settings.json"):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {
+        'gemini_keys': [],
+        'default_engine': "Gemini AI (Pro/Flash)",
+        'default_batch_size': 80
+    }
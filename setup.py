@@ -45,6 +45,10 @@ def setup_ffmpeg():
     print("\n📦 Setting up FFmpeg...")
     
     if platform.system() != "Windows":
+        from ffmpeg_runner import find_ffmpeg
+        if find_ffmpeg():
+            print(f"✅ FFmpeg found: {find_ffmpeg()}")
+            return True
         print("⚠️  This auto-installer is for Windows only.")
         print("   Please install ffmpeg manually for your OS:")
         print("   - Linux: sudo apt install ffmpeg")
@@ -115,8 +119,8 @@ def main():
     print()
     
     # Check Python version
-    if sys.version_info < (3, 8):
-        print("❌ Python 3.8 or higher is required!")
+    if sys.version_info < (3, 9):
+        print("❌ Python 3.9 or higher is required (asyncio.to_thread)!")
         print(f"   Current version: {sys.version}")
         return False
     
@@ -0,0 +1,133 @@
+"""
+Predicts how long edge-tts will take to speak a line, so the speed-up rate can be
+chosen before the first synthesis instead of synthesizing twice.
+
+The model is a per-voice linear fit  duration_ms = a + b * syllables / (1 + rate),
+calibrated online from every clip generated and stored in a small JSON file so it
+keeps improving across runs and projects. Several projects can share the file: a
+save merges this run's new samples into whatever is on disk.
+"""
+import os
+import re
+import json
+import tempfile
+import threading
+
+# Vietnamese is written one syllable per word; punctuation adds a short pause
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_PAUSE_RE = re.compile(r"[,.;:!?…]")
+
+_SUMS = ('n', 'sx', 'sy', 'sxx', 'sxy')
+
+# Serializes the read-merge-write of save() between generators in this process
+_SAVE_LOCK = threading.Lock()
+
+
+def count_syllables(text):
+    return len(_WORD_RE.findall(text)) + 0.5 * len(_PAUSE_RE.findall(text))
+
+
+def parse_rate(rate):
+    """'+15%' -> 0.15"""
+    try:
+        return int(str(rate).strip().rstrip('%')) / 100.0
+    except ValueError:
+        return 0.0
+
+
+def format_rate(rate):
+    """0.15 -> '+15%'"""
+    return f"{int(round(rate * 100)):+d}%"
+
+
+class SpeechDurationModel:
+    def __init__(self, path="tts_duration_model.json", min_samples=5):
+        self.path = path
+        self.min_samples = min_samples
+        self.stats = self._load()
+        # Samples added since the last save, merged into the file by save()
+        self._pending = {}
+
+    def _load(self):
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Cannot read duration model: {e}")
+        return {}
+
+    def _key(self, voice, pitch):
+        return f"{voice}|{pitch}"
+
+    def add_sample(self, voice, pitch, text, rate, duration_ms):
+        x = count_syllables(text) / (1 + rate)
+        if x <= 0:
+            return
+        sample = {'n': 1, 'sx': x, 'sy': duration_ms, 'sxx': x * x, 'sxy': x * duration_ms}
+        for stats in (self.stats, self._pending):
+            self._accumulate(stats, self._key(voice, pitch), sample)
+
+    def _accumulate(self, stats, key, sums):
+        s = stats.setdefault(key, {'n': 0, 'sx': 0.0, 'sy': 0.0, 'sxx': 0.0, 'sxy': 0.0})
+        for k in _SUMS:
+            s[k] += sums[k]
+
+    def _fit(self, voice, pitch):
+        s = self.stats.get(self._key(voice, pitch))
+        if not s or s['n'] < self.min_samples:
+            return None
+        n = s['n']
+        var = s['sxx'] - s['sx'] * s['sx'] / n
+        if var <= 1e-9:
+            # All samples have the same length: fall back to a pure rate, no fixed overhead
+            return 0.0, s['sy'] / s['sx']
+        b = (s['sxy'] - s['sx'] * s['sy'] / n) / var
+        a = (s['sy'] - b * s['sx']) / n
+        if b <= 0:
+            return None
+        return max(0.0, a), b
+
+    def predict_ms(self, voice, pitch, text, rate):
+        fit = self._fit(voice, pitch)
+        if fit is None:
+            return None
+        a, b = fit
+        return a + b * count_syllables(text) / (1 + rate)
+
+    def rate_for(self, voice, pitch, text, allowed_ms, base_rate, max_rate):
+        """
+        Rate needed for `text` to fit in `allowed_ms`, clamped to [base_rate, max(base_rate, max_rate)].
+        Returns None when the model has not seen enough clips for this voice yet.
+        """
+        fit = self._fit(voice, pitch)
+        if fit is None:
+            return None
+        a, b = fit
+        syllables = count_syllables(text)
+        upper = max(base_rate, max_rate)
+        if allowed_ms <= a:
+            return upper
+        needed = b * syllables / (allowed_ms - a) - 1
+        return min(max(needed, base_rate), upper)
+
+    def save(self):
+        """
+        Adds the samples since the last save to the stats on disk (another generator may have
+        saved in the meantime) and atomically replaces the file.
+        """
+        if not self.path or not self._pending:
+            return
+        with _SAVE_LOCK:
+            stats = self._load()
+            for key, sums in self._pending.items():
+                self._accumulate(stats, key, sums)
+            folder = os.path.dirname(os.path.abspath(self.path))
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=folder, suffix=".tmp", delete=False) as f:
+                json.dump(stats, f)
+            try:
+                os.replace(f.name, self.path)
+            except OSError:
+                os.remove(f.name)
+                raise
+            self.stats, self._pending = stats, {}
@@ -19,7 +19,7 @@ class SubtitleProcessor:
     def __init__(self, lang='ch', engine='easyocr'):
         """
         Initialize OCR Engine.
-        engine: 'easyocr' or 'rapid'
+        engine: 'easyocr', 'rapid' or None (translation only, no OCR model is loaded)
         """
         self.engine = engine
         self.lang = lang
@@ -35,7 +35,7 @@ class SubtitleProcessor:
             if target_lang != 'en': langs.append('en')
             print(f"Initializing EasyOCR with languages: {langs}...")
             self.reader = easyocr.Reader(langs)
-        else:
+        elif engine is not None:
             print("Initializing RapidOCR with GPU support...")
             from rapidocr_onnxruntime import RapidOCR
             # RapidOCR will auto-detect CUDA if onnxruntime-gpu is present
@@ -116,9 +116,54 @@ class SubtitleProcessor:
                 except: continue
         return subtitles
 
-    def extract_subtitles_rapid(self, video_path, crop_region=None, progress_callback=None, subtitle_callback=None, min_text_len=2, min_duration=0.5, step=None):
+    def _load_ocr_checkpoint(self, checkpoint_path, params):
+        """Returns saved OCR progress if it was produced with the same parameters, else None."""
+        import json
+        if not checkpoint_path or not os.path.exists(checkpoint_path):
+            return None
+        try:
+            with open(checkpoint_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except Exception as e:
+            print(f"Cannot read OCR checkpoint: {e}")
+            return None
+        if saved.get('params') != params:
+            return None
+        return saved
+
+    def _save_ocr_checkpoint(self, checkpoint_path, params, frame_idx, subtitles, current_sub):
+        """Stores the next frame to process together with the partial subtitles."""
+        if not checkpoint_path:
+            return
+        import json
+        data = {
+            'params': params,
+            'frame_idx': frame_idx,
+            'subtitles': subtitles,
+            'current_sub': current_sub
+        }
+        tmp_path = checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, checkpoint_path)
+
+    def _ocr_params(self, video_path, crop_region, min_text_len, min_duration, step):
+        # Round-trip through JSON types so it compares equal to the saved copy
+        return {
+            'video_path': os.path.abspath(video_path),
+            'engine': self.engine,
+            'crop_region': list(crop_region) if crop_region else None,
+            'min_text_len': min_text_len,
+            'min_duration': min_duration,
+            'step': step
+        }
+
+    def extract_subtitles_rapid(self, video_path, crop_region=None, progress_callback=None, subtitle_callback=None, min_text_len=2, min_duration=0.5, step=None,
+                                checkpoint_path=None, checkpoint_every=150):
         """
         Custom high-performance extraction with noise filtering and GPU support.
+        checkpoint_path: if set, progress is saved every `checkpoint_every` processed frames
+        and an interrupted run resumes from the last saved frame.
         """
         cap = cv2.VideoCapture(video_path)
         fps = cap.get(cv2.CAP_PROP_FPS)
@@ -143,12 +188,27 @@ class SubtitleProcessor:
             processed_step = step
         
         frame_idx = 0
+        params = self._ocr_params(video_path, crop_region, min_text_len, min_duration, processed_step)
+        saved = self._load_ocr_checkpoint(checkpoint_path, params)
+        if saved:
+            frame_idx = saved['frame_idx']
+            subtitles = saved['subtitles']
+            current_sub = saved['current_sub']
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+            print(f"Resuming OCR from frame {frame_idx} ({len(subtitles)} subtitles recovered)")
+            if subtitle_callback and subtitles: subtitle_callback(subtitles.copy())
+
+        processed_count = 0
         while True:
             ret, frame = cap.read()
             if not ret: break
             if frame_idx % processed_step != 0:
                 frame_idx += 1; continue
             
+            processed_count += 1
+            if checkpoint_path and processed_count % checkpoint_every == 0:
+                self._save_ocr_checkpoint(checkpoint_path, params, frame_idx, subtitles, current_sub)
+            
             # Progress update with optional preview frame
             preview_frame = None
             if progress_callback:
@@ -235,12 +295,16 @@ class SubtitleProcessor:
             if subtitle_callback: subtitle_callback(subtitles.copy())
 
         cap.release()
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
         return subtitles
 
-    def extract_subtitles(self, video_path, crop_region=None, progress_callback=None, subtitle_callback=None, min_text_len=2, min_duration=0.5, step=None):
+    def extract_subtitles(self, video_path, crop_region=None, progress_callback=None, subtitle_callback=None, min_text_len=2, min_duration=0.5, step=None,
+                          checkpoint_path=None, checkpoint_every=150):
         """Main entry point for extraction, dispatches to selected engine"""
         if self.engine == 'rapid':
-            return self.extract_subtitles_rapid(video_path, crop_region, progress_callback, subtitle_callback, min_text_len, min_duration, step)
+            return self.extract_subtitles_rapid(video_path, crop_region, progress_callback, subtitle_callback, min_text_len, min_duration, step,
+                                                checkpoint_path=checkpoint_path, checkpoint_every=checkpoint_every)
         
         # Legacy EasyOCR logic (does not support preview yet)
         cap = cv2.VideoCapture(video_path)
@@ -264,12 +328,27 @@ class SubtitleProcessor:
         step = max(1, int(fps / 5)) 
         
         frame_idx = 0
+        params = self._ocr_params(video_path, crop_region, min_text_len, min_duration, step)
+        saved = self._load_ocr_checkpoint(checkpoint_path, params)
+        if saved:
+            frame_idx = saved['frame_idx']
+            subtitles = saved['subtitles']
+            current_sub = saved['current_sub']
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+            print(f"Resuming OCR from frame {frame_idx} ({len(subtitles)} subtitles recovered)")
+            if subtitle_callback and subtitles: subtitle_callback(subtitles.copy())
+
+        processed_count = 0
         while True:
             ret, frame = cap.read()
             if not ret: break
             if frame_idx % step != 0:
                 frame_idx += 1; continue
             
+            processed_count += 1
+            if checkpoint_path and processed_count % checkpoint_every == 0:
+                self._save_ocr_checkpoint(checkpoint_path, params, frame_idx, subtitles, current_sub)
+            
             if progress_callback: progress_callback(frame_idx / total_frames)
             cropped = frame[max(0,y1):min(height,y2), max(0,x1):min(width,x2)]
             
@@ -308,6 +387,8 @@ class SubtitleProcessor:
             if subtitle_callback: subtitle_callback(subtitles.copy())
 
         cap.release()
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
         return subtitles
 
     def _translate_batch_lm_studio(self, batch_texts, custom_prompt=None):
@@ -380,7 +461,13 @@ class SubtitleProcessor:
             print(f"LM Studio Error: {e}")
             return None
 
-    def _translate_batch_gemini(self, batch_texts, api_keys, custom_prompt=None):
+    def _translate_batch_gemini(self, batch_texts, api_keys, custom_prompt=None, context=None):
+        """
+        context: optional list of (original, translation) pairs for the lines right
+        before this batch. They are sent as read-only reference and never re-translated.
+        Returns None when no key answered (quota, network), [] when every answer was
+        blocked for its content.
+        """
         import requests
         import json
         import re
@@ -391,10 +478,18 @@ class SubtitleProcessor:
             "Chỉ xuất ra bản dịch, giữ nguyên số thứ tự dòng."
         )
         
-        user_content = "Dịch danh sách sau (giữ đúng số dòng):\n"
+        user_content = ""
+        if context:
+            user_content += "Ngữ cảnh trước đó (chỉ để tham khảo, KHÔNG dịch lại):\n"
+            for original, translated in context:
+                user_content += f"- {original} => {translated}\n" if translated else f"- {original}\n"
+            user_content += "\n"
+
+        user_content += "Dịch danh sách sau (giữ đúng số dòng):\n"
         for i, text in enumerate(batch_texts):
             user_content += f"{i+1}. {text}\n"
 
+        blocked = False
         for api_key in api_keys:
             # Cách viết an toàn nhất
             base_url = "https://generativelanguage.googleapis.com/v1beta"
@@ -431,6 +526,7 @@ class SubtitleProcessor:
                 # Kiểm tra xem có bị block nội dung không
                 if 'candidates' not in result or not result['candidates'][0].get('content'):
                     print(f"Key {api_key[:5]} bị từ chối do nội dung nhạy cảm.")
+                    blocked = True
                     continue
 
                 content = result['candidates'][0]['content']['parts'][0]['text'].strip()
@@ -463,42 +559,124 @@ class SubtitleProcessor:
                 print(f"Lỗi Key {api_key[:5]}: {e}")
                 continue
                 
-        return None
+        return [] if blocked else None
 
-    def translate_subtitles(self, subtitles, progress_callback=None, engine='google', lm_studio_url=None, custom_prompt=None, gemini_keys=None, gemini_batch_size=80):
+    def _load_translation_checkpoint(self, checkpoint_path, subtitles):
+        """Returns {index: translation} for lines already translated in a previous run."""
+        import json
+        done = {}
+        if not checkpoint_path or not os.path.exists(checkpoint_path):
+            return done
+        try:
+            with open(checkpoint_path, "r", encoding="utf-8") as f:
+                saved = json.load(f).get('lines', {})
+        except Exception as e:
+            print(f"Cannot read translation checkpoint: {e}")
+            return done
+
+        for key, item in saved.items():
+            idx = int(key)
+            # Only reuse a line if its source text is unchanged (OCR may have been re-run)
+            if idx < len(subtitles) and item.get('src') == subtitles[idx]['text']:
+                done[idx] = item.get('text', "")
+        return done
+
+    def _save_translation_checkpoint(self, checkpoint_path, subtitles, done):
+        if not checkpoint_path:
+            return
+        import json
+        data = {'lines': {str(i): {'src': subtitles[i]['text'], 'text': t} for i, t in sorted(done.items())}}
+        tmp_path = checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, checkpoint_path)
+
+    def _translate_gemini_resilient(self, subtitles, indices, done, api_keys, custom_prompt=None,
+                                    context_lines=3, min_batch=4, checkpoint_path=None):
+        """
+        Translates subtitles[indices] (contiguous) with Gemini into `done`.
+        A batch whose reply is blocked or missing some lines is bisected and each half
+        retried; batches of at most `min_batch` lines fall back to Google Translate
+        line-by-line. When no key answers at all (quota, network) smaller batches would
+        fail the same way, so the whole batch falls back at once. Lines that get no translation stay out of `done` (and the checkpoint),
+        so a resumed run retries them.
+        """
+        if not indices:
+            return
+
+        first = indices[0]
+        context = [(subtitles[k]['text'], done.get(k)) for k in range(max(0, first - context_lines), first)]
+        texts = [subtitles[k]['text'] for k in indices]
+
+        translated = self._translate_batch_gemini(texts, api_keys, custom_prompt=custom_prompt, context=context)
+        if translated is not None and len(translated) == len(indices) and all(t.strip() for t in translated):
+            for j, k in enumerate(indices):
+                done[k] = translated[j]
+            self._save_translation_checkpoint(checkpoint_path, subtitles, done)
+            return
+
+        if translated is None:
+            print(f"No Gemini key answered for lines {first}-{indices[-1]}. Falling back to Google Translate.")
+        elif len(indices) > min_batch:
+            mid = len(indices) // 2
+            print(f"Gemini failed for lines {first}-{indices[-1]}. Retrying as two halves.")
+            for half in (indices[:mid], indices[mid:]):
+                self._translate_gemini_resilient(subtitles, half, done, api_keys, custom_prompt,
+                                                 context_lines, min_batch, checkpoint_path)
+            return
+        else:
+            print(f"Gemini failed for lines {first}-{indices[-1]}. Falling back to Google Translate.")
+
+        translated_any = False
+        for k in indices:
+            try:
+                text = self.translator.translate(subtitles[k]['text'])
+            except Exception as e:
+                print(f"Google Translate failed for line {k}: {e}")
+                continue
+            if text:
+                done[k] = text
+                translated_any = True
+        if translated_any:
+            self._save_translation_checkpoint(checkpoint_path, subtitles, done)
+
+    def translate_subtitles(self, subtitles, progress_callback=None, engine='google', lm_studio_url=None, custom_prompt=None, gemini_keys=None, gemini_batch_size=80,
+                            checkpoint_path=None, context_lines=3):
+        """
+        checkpoint_path: optional JSON file storing per-line results. Lines found there
+        (with unchanged source text) are not sent again when an interrupted run resumes.
+        context_lines: number of previous lines given to Gemini as read-only context.
+        """
         if lm_studio_url:
             self.lm_studio_url = lm_studio_url
             
         translated_subs = []
         total = len(subtitles)
+        done = self._load_translation_checkpoint(checkpoint_path, subtitles)
         
         if engine == 'gemini' and gemini_keys:
             # Gemini Batch Translation
             for i in range(0, total, gemini_batch_size):
-                batch = subtitles[i : i + gemini_batch_size]
-                batch_texts = [sub['text'] for sub in batch]
-                
-                translated_batch = self._translate_batch_gemini(batch_texts, gemini_keys, custom_prompt=custom_prompt)
-                
-                # FALLBACK TO GOOGLE if Gemini fails
-                if translated_batch is None:
-                    print("Gemini failed for this batch. Falling back to Google Translate.")
-                    translated_batch = []
-                    for text in batch_texts:
-                        try:
-                            translated_batch.append(self.translator.translate(text))
-                        except:
-                            translated_batch.append(text)
-                
-                # Ensure we have the same number of lines
-                if len(translated_batch) < len(batch):
-                    translated_batch.extend([""] * (len(batch) - len(translated_batch)))
+                batch_indices = list(range(i, min(i + gemini_batch_size, total)))
+                pending = [k for k in batch_indices if k not in done]
+
+                # Split pending lines into contiguous runs so the context window stays meaningful
+                runs = []
+                for k in pending:
+                    if runs and runs[-1][-1] == k - 1:
+                        runs[-1].append(k)
+                    else:
+                        runs.append([k])
+                for run in runs:
+                    self._translate_gemini_resilient(subtitles, run, done, gemini_keys, custom_prompt=custom_prompt,
+                                                     context_lines=context_lines, checkpoint_path=checkpoint_path)
                 
-                for j, sub in enumerate(batch):
+                for k in batch_indices:
+                    sub = subtitles[k]
                     translated_subs.append({
                         'start': sub['start'],
                         'end': sub['end'],
-                        'text': translated_batch[j] if translated_batch[j] else sub['text'],
+                        'text': done.get(k) or sub['text'],
                         'original': sub['text'],
                         'bbox': sub.get('bbox')
                     })
@@ -510,21 +688,25 @@ class SubtitleProcessor:
             batch_size = 10
             for i in range(0, total, batch_size):
                 batch = subtitles[i : i + batch_size]
-                batch_texts = [sub['text'] for sub in batch]
+                batch_indices = list(range(i, i + len(batch)))
                 
-                translated_batch = self._translate_batch_lm_studio(batch_texts, custom_prompt=custom_prompt)
+                if any(k not in done for k in batch_indices):
+                    batch_texts = [sub['text'] for sub in batch]
+                    translated_batch = self._translate_batch_lm_studio(batch_texts, custom_prompt=custom_prompt) or []
+
+                    # Only real translations go into `done` (and the checkpoint). Failed or missing
+                    # lines are shown untranslated for this run and retried on resume
+                    new = [(k, translated_batch[j]) for j, k in enumerate(batch_indices)
+                           if k not in done and j < len(translated_batch) and translated_batch[j].strip()]
+                    done.update(new)
+                    if new:
+                        self._save_translation_checkpoint(checkpoint_path, subtitles, done)
                 
-                if translated_batch is None:
-                    translated_batch = batch_texts
-                
-                if len(translated_batch) < len(batch):
-                    translated_batch.extend([""] * (len(batch) - len(translated_batch)))
-                
-                for j, sub in enumerate(batch):
+                for k, sub in zip(batch_indices, batch):
                     translated_subs.append({
                         'start': sub['start'],
                         'end': sub['end'],
-                        'text': translated_batch[j] if translated_batch[j] else sub['text'],
+                        'text': done.get(k) or sub['text'],
                         'original': sub['text'],
                         'bbox': sub.get('bbox')
                     })
@@ -537,10 +719,17 @@ class SubtitleProcessor:
                 original = sub['text']
                 if len(original) < 1: continue 
 
-                try:
-                    translated = self.translator.translate(original)
-                except Exception as e:
-                    translated = original 
+                if i in done:
+                    translated = done[i]
+                else:
+                    try:
+                        translated = self.translator.translate(original)
+                        done[i] = translated
+                    except Exception as e:
+                        # Shown untranslated, but not checkpointed, so a resume retries it
+                        translated = original
+                    if i % 10 == 9:
+                        self._save_translation_checkpoint(checkpoint_path, subtitles, done)
                 
                 translated_subs.append({
                     'start': sub['start'],
@@ -552,6 +741,7 @@ class SubtitleProcessor:
                 
                 if progress_callback:
                     progress_callback((i + 1) / total)
+            self._save_translation_checkpoint(checkpoint_path, subtitles, done)
                     
         return translated_subs
 
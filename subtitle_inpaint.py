@@ -0,0 +1,86 @@
+"""
+Removal of the original hard subtitle by inpainting instead of covering it with a box.
+
+Inside the OCR box of a subtitle, the text pixels are found with a white top-hat
+(hard subtitles are bright strokes on a darker outline) and filled in with
+cv2.inpaint. Inpainting is the expensive part, so the result is cached per
+subtitle: while the same subtitle stays on screen and the pixels around the text
+do not change (static shot), the cached patch is pasted back. Only when that
+background changes is the frame inpainted again (and the cache refreshed).
+"""
+import time
+
+import cv2
+import numpy as np
+
+
+class SubtitleInpainter:
+    def __init__(self, pad=6, radius=3, change_threshold=6.0, method=cv2.INPAINT_TELEA):
+        """
+        pad: pixels added around the OCR box (outline and antialiasing spill over it).
+        change_threshold: mean absolute difference (0-255) of the unmasked pixels above
+        which the background counts as changed and the cached patch is not reused.
+        """
+        self.pad = pad
+        self.radius = radius
+        self.change_threshold = change_threshold
+        self.method = method
+        self._cache = {}
+        self.stats = {'frames': 0, 'inpainted': 0, 'reused': 0, 'inpaint_s': 0.0, 'check_s': 0.0}
+
+    def text_mask(self, roi):
+        """255 where the subtitle text (with its outline) is."""
+        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+        # Wider than a stroke, so the top-hat keeps the letters and drops the background
+        k = max(3, (roi.shape[0] // 2) | 1)
+        bright = cv2.morphologyEx(gray, cv2.MORPH_TOPHAT, cv2.getStructuringElement(cv2.MORPH_RECT, (k, k)))
+        _, mask = cv2.threshold(bright, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return cv2.dilate(mask, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)), iterations=2)
+
+    def remove(self, frame, boxes):
+        """
+        Inpaints the text inside every {key: (x1, y1, x2, y2)} box of this frame, in place.
+        key identifies the subtitle, so its cached patch is only reused for the same line.
+        """
+        fh, fw = frame.shape[:2]
+        self.stats['frames'] += 1
+        for key, (x1, y1, x2, y2) in boxes.items():
+            rect = (max(0, x1 - self.pad), max(0, y1 - self.pad), min(fw, x2 + self.pad), min(fh, y2 + self.pad))
+            if rect[0] >= rect[2] or rect[1] >= rect[3]:
+                continue
+            roi = frame[rect[1]:rect[3], rect[0]:rect[2]]
+            entry = self._cache.get(key)
+            if entry is not None and entry['rect'] == rect and self._unchanged(roi, entry):
+                np.copyto(roi, entry['patch'], where=entry['mask'][:, :, None])
+                self.stats['reused'] += 1
+                continue
+
+            start = time.perf_counter()
+            reference = roi.copy()
+            mask = self.text_mask(roi)
+            patch = cv2.inpaint(roi, mask, self.radius, self.method)
+            roi[:] = patch
+            self.stats['inpaint_s'] += time.perf_counter() - start
+            self.stats['inpainted'] += 1
+            self._cache[key] = {'rect': rect, 'mask': mask > 0, 'patch': patch, 'reference': reference}
+
+        # Lines that left the screen never come back
+        for key in [k for k in self._cache if k not in boxes]:
+            del self._cache[key]
+        return frame
+
+    def _unchanged(self, roi, entry):
+        """Compares the pixels around the text (every other row/column) with the frame the patch was made from."""
+        start = time.perf_counter()
+        keep = ~entry['mask'][::2, ::2]
+        diff = np.abs(roi[::2, ::2].astype(np.int16) - entry['reference'][::2, ::2])[keep]
+        self.stats['check_s'] += time.perf_counter() - start
+        return diff.size == 0 or diff.mean() <= self.change_threshold
+
+    def report(self):
+        s = self.stats
+        boxes = s['inpainted'] + s['reused']
+        reuse = 100.0 * s['reused'] / boxes if boxes else 0.0
+        return (f"Inpaint: {s['frames']} frames with subtitles, {s['inpainted']} boxes inpainted "
+                f"({s['inpaint_s']:.1f} s), {s['reused']} reused from cache ({reuse:.0f}%, "
+                f"checks {s['check_s']:.1f} s)")
@@ -0,0 +1,88 @@
+"""
+WSOLA (waveform-similarity overlap-add) time-stretch on int16 PCM arrays.
+
+Used to speed up VieNeu/gTTS clips that overflow their subtitle slot without
+changing pitch. Frames of the input are read at `speed` times the output hop,
+and each frame is shifted by up to `search_ms` to best match the natural
+continuation of the previous one, so there are no phase jumps (the "choppy"
+sound of plain chunk slicing).
+
+Clips are processed in batches: all clips of a batch advance one output frame
+per step, and the similarity search of the whole batch is a single FFT
+cross-correlation, so the Python loop runs once per frame, not per frame per clip.
+"""
+import numpy as np
+
+from audio_utils import SAMPLE_RATE
+
+
+def _next_pow2(n):
+    return 1 << (int(n) - 1).bit_length()
+
+
+def _wsola_group(clips, speeds, frame_len, hop, tol):
+    """Stretches a group of clips of similar length together. Returns float32 arrays."""
+    count = len(clips)
+    speeds = np.asarray(speeds, dtype=np.float64)
+    out_lens = [int(round(len(c) / s)) for c, s in zip(clips, speeds)]
+    # Frame k covers output [k*hop - hop, k*hop - hop + frame_len), so every kept sample gets the full window sum
+    n_frames = max(out_lens) // hop + 2
+
+    # Zero padding so every read (nominal position +- tol, plus one frame) stays in bounds
+    pad_front = int(np.ceil(hop * speeds.max())) + tol
+    pad_back = int(np.ceil(n_frames * hop * speeds.max())) + frame_len + tol
+    width = pad_front + max(len(c) for c in clips) + pad_back
+    x = np.zeros((count, width), dtype=np.float32)
+    for b, clip in enumerate(clips):
+        x[b, pad_front:pad_front + len(clip)] = clip
+
+    y = np.zeros((count, n_frames * hop + frame_len), dtype=np.float32)
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame_len) / frame_len)).astype(np.float32)
+    rows = np.arange(count)[:, None]
+    frame_idx = np.arange(frame_len)
+    # Only the half that overlaps the previous frame is compared
+    overlap_idx = np.arange(hop)
+    search_idx = np.arange(2 * tol + hop)
+    nfft = _next_pow2(2 * tol + hop)
+
+    prev = None
+    for k in range(n_frames):
+        nominal = pad_front + np.round((k * hop - hop) * speeds).astype(np.int64)
+        if prev is None:
+            pos = nominal
+        else:
+            # Best match between the candidates around the nominal position and what would
+            # naturally follow the previous frame
+            target = x[rows, (prev + hop)[:, None] + overlap_idx]
+            region = x[rows, (nominal - tol)[:, None] + search_idx]
+            spec = np.fft.rfft(region, nfft) * np.conj(np.fft.rfft(target, nfft))
+            corr = np.fft.irfft(spec, nfft)[:, :2 * tol + 1]
+            pos = nominal - tol + np.argmax(corr, axis=1)
+        y[:, k * hop:k * hop + frame_len] += window * x[rows, pos[:, None] + frame_idx]
+        prev = pos
+
+    return [y[b, hop:hop + out_lens[b]] for b in range(count)]
+
+
+def wsola_batch(clips, speeds, sample_rate=SAMPLE_RATE, frame_ms=30, search_ms=10, batch_size=32):
+    """
+    Time-stretches int16 clips by their playback speeds (1.25 = 25% shorter).
+    Clips are sorted by length and processed batch_size at a time to limit padding.
+    Returns int16 arrays in the input order.
+    """
+    frame_len = int(sample_rate * frame_ms / 1000) // 2 * 2
+    hop = frame_len // 2
+    tol = int(sample_rate * search_ms / 1000)
+
+    results = [None] * len(clips)
+    order = sorted(range(len(clips)), key=lambda i: len(clips[i]))
+    for start in range(0, len(order), batch_size):
+        group = order[start:start + batch_size]
+        stretched = _wsola_group([clips[i] for i in group], [speeds[i] for i in group], frame_len, hop, tol)
+        for i, pcm in zip(group, stretched):
+            results[i] = np.clip(np.round(pcm), -32768, 32767).astype(np.int16)
+    return results
+
+
+def wsola(pcm, speed, sample_rate=SAMPLE_RATE, **kwargs):
+    return wsola_batch([pcm], [speed], sample_rate, **kwargs)[0]
@@ -0,0 +1,157 @@
+"""
+Global placement of voiceover clips on the video timeline.
+
+Each clip wants to start at its subtitle start. Instead of letting a long clip
+run over the next one, all clips are placed together, in this order of preference:
+
+1. Shift: a clip may start up to lead_ms before or lag_ms after its subtitle,
+   which moves speech into nearby silence. Among the placements that do not
+   overlap, the one with the least total squared shift is chosen (bounded
+   isotonic regression, solved with pool-adjacent-violators in O(n)).
+2. Speed up: where shifting alone cannot avoid an overlap, the whole congested
+   run of lines is sped up by one common factor (each clip capped at its own
+   remaining headroom), so the speed-up is spread over neighbours instead of
+   falling on one line.
+3. Overlap: only if the run still does not fit at full speed, the clip that
+   does not fit starts at its latest allowed time and overlaps the previous one.
+
+The result is the placement plan the mixer uses: start, extra speed and final
+duration for every clip.
+"""
+
+_SPEED_STEPS = 20  # bisection steps for the speed of a congested run (~1e-6 precision)
+
+
+class _Block:
+    """Consecutive clips packed back to back, placed as one unit at start `c`."""
+    __slots__ = ('first', 'n', 'sum_t', 'lo', 'hi', 'length')
+
+    def __init__(self, first, start, lo, hi, length):
+        self.first = first
+        self.n = 1
+        self.sum_t = start
+        self.lo = lo
+        self.hi = hi
+        self.length = length
+
+    @property
+    def c(self):
+        # Least squares start of the block, clamped to what all its clips allow
+        return min(max(self.sum_t / self.n, self.lo), self.hi)
+
+    def absorb(self, other):
+        # other's clips now sit self.length after the block start
+        self.n += other.n
+        self.sum_t += other.sum_t - other.n * self.length
+        self.lo = max(self.lo, other.lo - self.length)
+        self.hi = min(self.hi, other.hi - self.length)
+        self.length += other.length
+
+
+def plan_timeline(items, video_duration_ms, lead_ms=250, lag_ms=600, gap_ms=50):
+    """
+    items: [{'start_ms', 'duration_ms', 'max_speed'}, ...] in subtitle order, where
+    max_speed is the extra speed-up the clip can still take (1.0 = none).
+    Returns [{'start_ms', 'speed', 'duration_ms', 'shift_ms', 'overlap'}, ...] in the same order.
+    """
+    n = len(items)
+    starts = [float(it['start_ms']) for it in items]
+    base = [float(it['duration_ms']) for it in items]
+    caps = [max(1.0, it.get('max_speed', 1.0)) for it in items]
+    speeds = [1.0] * n
+    durs = list(base)
+    lows = [max(0.0, s - lead_ms) for s in starts]
+
+    def upper(i):
+        # Latest start: lag limit, and the clip should end before the video does
+        return max(lows[i], min(starts[i] + lag_ms, video_duration_ms - durs[i]))
+
+    def set_speed(i, v):
+        speeds[i] = min(v, caps[i])
+        durs[i] = base[i] / speeds[i]
+
+    def sweep(a, v, prev_end):
+        """
+        Places clips from a on as early as allowed, all at common speed v, until the chain
+        breaks (a clip is no longer pushed by the one before it) or a clip does not fit.
+        Returns (fits, stop, end): stop is the first clip after the run, or the clip that
+        does not fit; end is where the next clip may start.
+        """
+        for i in range(a, n):
+            x = max(lows[i], prev_end)
+            if i > a and x == lows[i]:
+                return True, i, prev_end
+            set_speed(i, v)
+            if x > upper(i):
+                return False, i, prev_end
+            pos[i] = x
+            prev_end = x + durs[i] + gap_ms
+        return True, n, prev_end
+
+    # Pass 1: congested runs (every clip pushed by the one before) get the lowest common
+    # speed-up that makes the whole run fit. A run that fits at some speed also fits when
+    # faster, so one bisection per run is enough: O(n * _SPEED_STEPS) overall.
+    pos = [0.0] * n
+    overlap = [False] * n
+    # Above the largest cap still ahead every clip is at its own cap
+    cap_ahead = caps[:] + [1.0]
+    for i in range(n - 2, -1, -1):
+        cap_ahead[i] = max(caps[i], cap_ahead[i + 1])
+    a = 0
+    prev_end = float('-inf')
+    while a < n:
+        fits, stop, end = sweep(a, 1.0, prev_end)
+        if not fits:
+            v_max = cap_ahead[a]
+            fits, stop, end = sweep(a, v_max, prev_end)
+            if not fits:
+                # Does not fit even at full speed: overlap at its latest start, and start a fresh run after it
+                pos[stop] = upper(stop)
+                overlap[stop] = True
+                a, prev_end = stop + 1, pos[stop] + durs[stop] + gap_ms
+                continue
+            v_lo, v_hi = 1.0, v_max
+            for _ in range(_SPEED_STEPS):
+                v = (v_lo + v_hi) / 2
+                if sweep(a, v, prev_end)[0]:
+                    v_hi = v
+                else:
+                    v_lo = v
+            fits, stop, end = sweep(a, v_hi, prev_end)
+        a, prev_end = stop, end
+
+    # Pass 2: with durations fixed, move clips as close to their subtitles as the
+    # no-overlap constraints allow. An overlapping clip starts a new chain.
+    stack = []
+    for i in range(n):
+        # Overlapping clips stay at their latest start, so the overlap is as short as possible
+        lo = pos[i] if overlap[i] else lows[i]
+        block = _Block(i, starts[i], lo, upper(i), durs[i] + gap_ms)
+        stack.append(block)
+        while (len(stack) > 1 and not overlap[stack[-1].first]
+               and stack[-2].c + stack[-2].length > stack[-1].c):
+            top = stack.pop()
+            stack[-1].absorb(top)
+
+    for block in stack:
+        x = block.c
+        for i in range(block.first, block.first + block.n):
+            pos[i] = x
+            x += durs[i] + gap_ms
+
+    return [{
+        'start_ms': int(round(pos[i])),
+        'speed': speeds[i],
+        'duration_ms': int(round(durs[i])),
+        'shift_ms': int(round(pos[i] - starts[i])),
+        'overlap': overlap[i]
+    } for i in range(n)]
+
+
+def summarize_plan(plan):
+    shifted = sum(1 for p in plan if p['shift_ms'])
+    sped_up = sum(1 for p in plan if p['speed'] > 1.001)
+    overlaps = sum(1 for p in plan if p['overlap'])
+    max_shift = max((abs(p['shift_ms']) for p in plan), default=0)
+    return (f"Timeline: {shifted} clips shifted (max {max_shift} ms), "
+            f"{sped_up} sped up, {overlaps} overlapping")
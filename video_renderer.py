@@ -1,7 +1,114 @@
 import cv2
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 import os
+from collections import OrderedDict
+from audio_utils import SAMPLE_RATE, load_pcm, mix_clips, write_wav
+from font_manager import FontManager
+from ass_subtitles import build_ass_script
+from subtitle_inpaint import SubtitleInpainter
+from encoding_profiles import LOSSLESS, get_profile, two_pass_bitrate, x264_args
+import ffmpeg_runner
+
+# Background is pushed down further while the voiceover speaks (sidechain = voiceover)
+DUCKING_FILTER = "sidechaincompress=threshold=0.02:ratio=8:attack=20:release=300"
+
+# Rasterized subtitle overlays kept per renderer (a few lines can be on screen around a cut)
+SPRITE_CACHE_SIZE = 16
+
+# Vertical gap between subtitles that are on screen at the same time
+STACK_GAP = 8
+
+# Low-res preview proxies kept per project (oldest are deleted first)
+PREVIEW_CACHE_FILES = 64
+
+# H.264 profile_idc -> libx264 profile name, to encode passthrough parts like the source
+H264_PROFILES = {66: "baseline", 77: "main", 100: "high", 110: "high10", 122: "high422", 244: "high444"}
+
+
+class SubtitleIndex:
+    """
+    Subtitle frame intervals as sorted NumPy start/end arrays (inclusive, with the
+    2-frame anti-flicker buffer). Memory is O(subtitles), not O(frames), and any number
+    of subtitles can be active on the same frame.
+    """
+
+    def __init__(self, subtitles, fps, total_frames):
+        items = []
+        for sub in subtitles:
+            # Simple constant 2-frame buffer to prevent flicker
+            start_frame = max(0, int(round(sub['start'] * fps)) - 2)
+            end_frame = min(total_frames - 1, int(round(sub['end'] * fps)) + 2)
+            if end_frame >= start_frame:
+                items.append((start_frame, end_frame, {'text': sub['text'], 'bbox': sub.get('bbox')}))
+        # Stable sort: subtitles starting together keep their input order
+        items.sort(key=lambda item: item[0])
+        self.starts = np.array([item[0] for item in items], dtype=np.int64)
+        self.ends = np.array([item[1] for item in items], dtype=np.int64)
+        self.subs = [item[2] for item in items]
+
+    def __len__(self):
+        return len(self.subs)
+
+    def at(self, frame_idx):
+        """Subtitles shown on one frame (random access, for previews)."""
+        count = int(np.searchsorted(self.starts, frame_idx, side="right"))
+        return [self.subs[i] for i in np.nonzero(self.ends[:count] >= frame_idx)[0]]
+
+    def cursor(self, first_frame=0):
+        return SubtitleCursor(self, first_frame)
+
+    def spans(self):
+        """Merged [first, last] frame ranges that show at least one subtitle."""
+        spans = []
+        for start, end in zip(self.starts.tolist(), self.ends.tolist()):
+            if spans and start <= spans[-1][1] + 1:
+                spans[-1][1] = max(spans[-1][1], end)
+            else:
+                spans.append([start, end])
+        return spans
+
+
+class SubtitleCursor:
+    """Walks a SubtitleIndex frame by frame, O(1) amortized per frame (frames must not go backwards)."""
+
+    def __init__(self, index, first_frame=0):
+        self.index = index
+        self.next = int(np.searchsorted(index.starts, first_frame, side="left"))
+        # Subtitles that started before first_frame and are still on screen
+        self.active = np.nonzero(index.ends[:self.next] >= first_frame)[0].tolist()
+        self._next_start = self._start(self.next)
+        # Earliest last frame among the active subtitles: nothing to drop before it
+        self._expiry = min((int(index.ends[i]) for i in self.active), default=None)
+
+    def _start(self, i):
+        return int(self.index.starts[i]) if i < len(self.index) else None
+
+    def advance(self, frame_idx):
+        """Subtitles shown on frame_idx, oldest first."""
+        index = self.index
+        while self._next_start is not None and self._next_start <= frame_idx:
+            end = int(index.ends[self.next])
+            self.active.append(self.next)
+            self._expiry = end if self._expiry is None else min(self._expiry, end)
+            self.next += 1
+            self._next_start = self._start(self.next)
+        if self._expiry is not None and frame_idx > self._expiry:
+            self.active = [i for i in self.active if index.ends[i] >= frame_idx]
+            self._expiry = min((int(index.ends[i]) for i in self.active), default=None)
+        return [index.subs[i] for i in self.active]
+
+
+class _FrameReader:
+    """cv2.VideoCapture-like read() over frames already in memory (preview proxies)."""
+
+    def __init__(self, frames):
+        self._frames = iter(frames)
+
+    def read(self):
+        frame = next(self._frames, None)
+        return frame is not None, frame
+
 
 class VideoRenderer:
     """
@@ -10,27 +117,11 @@ class VideoRenderer:
     2. Drawing Vietnamese text on top
     """
     
-    def __init__(self):
-        # Try to load a Vietnamese-compatible font
-        self.font_path = self._find_font()
-        
-    def _find_font(self):
-        """Find a suitable font for Vietnamese text"""
-        # Common font paths on Windows
-        possible_fonts = [
-            "C:/Windows/Fonts/arial.ttf",
-            "C:/Windows/Fonts/arialbd.ttf",
-            "C:/Windows/Fonts/times.ttf",
-            "C:/Windows/Fonts/calibri.ttf",
-            "C:/Windows/Fonts/seguisb.ttf",  # Segoe UI Semibold - good for Vietnamese
-        ]
-        
-        for font in possible_fonts:
-            if os.path.exists(font):
-                return font
-        
-        # Fallback to default
-        return None
+    def __init__(self, font_path=None):
+        # Vietnamese-compatible font: configured path first, then bundled/system fonts
+        self.fonts = FontManager([font_path])
+        self.font_path = self.fonts.font_path
+        self._sprites = OrderedDict()
 
     def generate_logo_preview(self, video_path, logo_path, position, size_pct, x_offset, y_offset):
         """Generate a single frame preview of the logo overlay"""
@@ -41,20 +132,167 @@ class VideoRenderer:
         cap.release()
         if not ret: return None
         
-        if not logo_path or not os.path.exists(logo_path): return frame
-        
-        logo_img = cv2.imread(logo_path, cv2.IMREAD_UNCHANGED)
+        logo_img = self._load_logo(logo_path, frame.shape[1], size_pct)
         if logo_img is None: return frame
         
-        # Resize logo
-        width = frame.shape[1]
-        target_w = int(width * size_pct)
-        h, w = logo_img.shape[:2]
-        target_h = int(h * (target_w / w))
-        logo_img = cv2.resize(logo_img, (target_w, target_h), interpolation=cv2.INTER_AREA)
-        
         return self._overlay_logo(frame, logo_img, position, x_offset, y_offset)
     
+    def _load_logo(self, logo_path, frame_width, size_pct):
+        """Logo image (keeps its alpha channel) resized to size_pct of the frame width, or None."""
+        if not logo_path or not os.path.exists(logo_path): return None
+        logo_img = cv2.imread(logo_path, cv2.IMREAD_UNCHANGED)
+        if logo_img is None: return None
+        target_w = max(1, int(frame_width * size_pct))
+        h, w = logo_img.shape[:2]
+        target_h = max(1, int(h * (target_w / w)))
+        return cv2.resize(logo_img, (target_w, target_h), interpolation=cv2.INTER_AREA)
+
+    def _preview_setup(self, video_path, subtitles, subtitle_region, font_size, logo_path, logo_size,
+                       logo_x, logo_y, preview_height):
+        """Video properties and every render parameter scaled down to the preview resolution."""
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError("Cannot open video file")
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+        scale = min(1.0, preview_height / height)
+        pw, ph = int(width * scale) // 2 * 2, int(height * scale) // 2 * 2
+        ymin, ymax, xmin, xmax = subtitle_region or (0.75, 1.0, 0.0, 1.0)
+        # OCR boxes are in source pixels
+        scaled_subs = [dict(sub, bbox=[v * scale for v in sub['bbox']] if sub.get('bbox') else None)
+                       for sub in subtitles]
+        return {
+            'fps': fps, 'total_frames': total_frames, 'size': (pw, ph),
+            'region': (int(pw * xmin), int(ph * ymin), int(pw * xmax), int(ph * ymax)),
+            'index': SubtitleIndex(scaled_subs, fps, total_frames),
+            'font_size': max(8, int(round(font_size * scale))),
+            'logo_img': self._load_logo(logo_path, pw, logo_size),
+            'logo_x': int(logo_x * scale), 'logo_y': int(logo_y * scale)
+        }
+
+    def _proxy_frames(self, video_path, start_s, n_frames, size, cache_dir=None):
+        """
+        n_frames low-res source frames from start_s. ffmpeg seeks and scales them into a
+        small proxy clip, cached in cache_dir/previews, so previews of the same window
+        only redo the compositing. Without ffmpeg the source is seeked and resized directly.
+        """
+        import json
+        import hashlib
+        import tempfile
+        ffmpeg_exe = ffmpeg_runner.find_ffmpeg()
+        if not ffmpeg_exe:
+            cap = cv2.VideoCapture(video_path)
+            cap.set(cv2.CAP_PROP_POS_MSEC, start_s * 1000)
+            frames = []
+            while len(frames) < n_frames:
+                ret, frame = cap.read()
+                if not ret: break
+                frames.append(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+            cap.release()
+            return frames
+
+        if cache_dir:
+            st = os.stat(video_path)
+            key = hashlib.sha1(json.dumps([os.path.abspath(video_path), st.st_size, int(st.st_mtime),
+                                           round(start_s, 3), n_frames, list(size)]).encode("utf-8")).hexdigest()
+            proxy_dir = os.path.join(cache_dir, "previews")
+            os.makedirs(proxy_dir, exist_ok=True)
+            proxy_path = os.path.join(proxy_dir, key[:16] + ".mp4")
+        else:
+            proxy_dir, proxy_path = None, os.path.join(tempfile.gettempdir(), f"preview_{os.getpid()}.mp4")
+
+        if not (proxy_dir and os.path.exists(proxy_path)):
+            tmp_path = proxy_path[:-4] + ".tmp.mp4"
+            cmd = [ffmpeg_exe, "-y", "-loglevel", "error", "-ss", f"{start_s:.3f}", "-i", video_path,
+                   "-map", "0:v:0", "-frames:v", str(n_frames), "-vf", f"scale={size[0]}:{size[1]}:flags=area",
+                   "-c:v", "libx264", "-preset", "ultrafast", "-crf", "18", "-pix_fmt", "yuv420p", tmp_path]
+            ffmpeg_runner.run(cmd, label="preview proxy")
+            os.replace(tmp_path, proxy_path)
+            if proxy_dir:
+                proxies = sorted((os.path.getmtime(os.path.join(proxy_dir, f)), f) for f in os.listdir(proxy_dir))
+                for _, name in proxies[:-PREVIEW_CACHE_FILES]:
+                    try: os.remove(os.path.join(proxy_dir, name))
+                    except OSError: pass
+
+        cap = cv2.VideoCapture(proxy_path)
+        frames = []
+        while len(frames) < n_frames:
+            ret, frame = cap.read()
+            if not ret: break
+            frames.append(frame)
+        cap.release()
+        if not proxy_dir:
+            os.remove(proxy_path)
+        return frames
+
+    def render_preview_clip(self, video_path, subtitles, start, duration=3.0, subtitle_region=None, font_size=32,
+                            logo_path=None, logo_position="Top-Left", logo_size=0.15, logo_x=20, logo_y=20,
+                            cover="box", preview_height=360, cache_dir=None):
+        """
+        Renders [start, start + duration) seconds at preview_height through the same
+        compositing as the full render (subtitle boxes, font, logo) and returns the clip
+        as MP4 bytes, ready for st.video. No audio. Returns None without ffmpeg.
+        cache_dir: project folder where the low-res proxies are kept.
+        """
+        ffmpeg_exe = ffmpeg_runner.find_ffmpeg()
+        if not ffmpeg_exe:
+            return None
+        p = self._preview_setup(video_path, subtitles, subtitle_region, font_size, logo_path, logo_size,
+                                logo_x, logo_y, preview_height)
+        first = min(max(0, int(round(start * p['fps']))), max(0, p['total_frames'] - 1))
+        n_frames = max(1, min(int(round(duration * p['fps'])), p['total_frames'] - first))
+        source = self._proxy_frames(video_path, first / p['fps'], n_frames, p['size'], cache_dir)
+        frames = self._composite_frames(_FrameReader(source), p['index'], p['region'], p['font_size'],
+                                        p['logo_img'], logo_position, p['logo_x'], p['logo_y'],
+                                        p['total_frames'], None, first_frame=first, cover=cover)
+        raw = b"".join(np.ascontiguousarray(frame).tobytes() for frame in frames)
+
+        width, height = p['size']
+        cmd = [ffmpeg_exe, "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}",
+               "-r", str(p['fps']), "-i", "pipe:0"] + x264_args("draft") + [
+               # Fragmented MP4 can be written to a pipe
+               "-movflags", "frag_keyframe+empty_moov", "-f", "mp4", "pipe:1"]
+        return ffmpeg_runner.run(cmd, input=raw, capture_stdout=True, label="preview").stdout
+
+    def render_preview_strip(self, video_path, subtitles, samples=6, columns=3, subtitle_region=None, font_size=32,
+                             logo_path=None, logo_position="Top-Left", logo_size=0.15, logo_x=20, logo_y=20,
+                             cover="box", preview_height=240, cache_dir=None):
+        """
+        Composites the middle frame of `samples` subtitles spread over the video and tiles them
+        into one BGR image (columns per row, timestamp in the corner). None if there are no subtitles.
+        """
+        if not subtitles:
+            return None
+        p = self._preview_setup(video_path, subtitles, subtitle_region, font_size, logo_path, logo_size,
+                                logo_x, logo_y, preview_height)
+        picks = sorted(set(np.linspace(0, len(subtitles) - 1, min(samples, len(subtitles))).round().astype(int)))
+        tiles = []
+        for i in picks:
+            sub = subtitles[i]
+            t = (sub['start'] + sub['end']) / 2
+            frame_idx = min(int(round(t * p['fps'])), p['total_frames'] - 1)
+            source = self._proxy_frames(video_path, frame_idx / p['fps'], 1, p['size'], cache_dir)
+            for frame in self._composite_frames(_FrameReader(source), p['index'], p['region'], p['font_size'],
+                                                p['logo_img'], logo_position, p['logo_x'], p['logo_y'],
+                                                p['total_frames'], None, first_frame=frame_idx, cover=cover):
+                label = f"{int(t // 60):02d}:{t % 60:05.2f}"
+                cv2.putText(frame, label, (6, 18), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 3, cv2.LINE_AA)
+                cv2.putText(frame, label, (6, 18), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1, cv2.LINE_AA)
+                tiles.append(frame)
+        if not tiles:
+            return None
+
+        width, height = p['size']
+        columns = max(1, min(columns, len(tiles)))
+        while len(tiles) % columns:
+            tiles.append(np.zeros((height, width, 3), dtype=np.uint8))
+        rows = [np.hstack(tiles[r:r + columns]) for r in range(0, len(tiles), columns)]
+        return np.vstack(rows)
+
     def render_video_with_subtitles(
         self, 
         video_path, 
@@ -69,10 +307,43 @@ class VideoRenderer:
         logo_position="Top-Left",
         logo_size=0.15,
         logo_x=20,
-        logo_y=20
+        logo_y=20,
+        voiceover_clips=None,
+        ducking=True,
+        stream=True,
+        passthrough=False,
+        ffmpeg_logo=False,
+        workers=1,
+        backend="python",
+        cover="box",
+        encoding_profile=None,
+        two_pass=False
     ):
         """
         Render video with Vietnamese subtitles burned in and optional logo.
+        voiceover_clips: placed clips [{'path', 'start_ms'}, ...]. They are mixed in memory and
+        handed to ffmpeg as raw PCM, so no full voiceover track has to be rendered beforehand.
+        Takes precedence over voiceover_audio (a pre-mixed track file).
+        ducking: lower the original audio only while the voiceover speaks (sidechain compression).
+        stream: pipe raw frames straight into the ffmpeg encoder (one encode, no temp video,
+        compositing overlaps encoding) instead of writing an mp4v temp file and transcoding it.
+        passthrough: without a logo, re-encode only the keyframe-aligned segments that show a
+        subtitle and stream-copy the rest (H.264 sources, needs ffmpeg). Falls back to a full
+        render when that is not possible.
+        ffmpeg_logo: let ffmpeg's overlay filter draw the static logo during the encode
+        (streamed encode only), so Python never touches the logo pixels.
+        workers: split the video at keyframes into this many segments and composite/encode
+        them in parallel processes (0 = one per CPU core), then join them without re-encoding.
+        backend: "python" composites every frame in Python; "ass" writes the subtitles as an
+        ASS script and lets ffmpeg/libass burn them in (and overlay the logo) in the encoding
+        pass, with no Python frame loop. Needs ffmpeg built with libass.
+        cover: how the original hard subtitle is hidden. "box" draws the black rounded box;
+        "inpaint" fills the text pixels inside the OCR box from their surroundings (cached
+        while the shot is static) and draws the new text without a box. Python backend only.
+        encoding_profile: name in encoding_profiles.ENCODING_PROFILES (or a profile dict) for
+        the libx264 settings of the final encode; None = the default profile.
+        two_pass: render to a lossless intermediate first, then encode it in two passes to the
+        profile's average bitrate (predictable size, roughly twice the encode time).
         """
         cap = cv2.VideoCapture(video_path)
         if not cap.isOpened():
@@ -83,17 +354,10 @@ class VideoRenderer:
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        duration_ms = total_frames / fps * 1000
         
-        # Pre-load logo if exists
-        logo_img = None
-        if logo_path and os.path.exists(logo_path):
-            logo_img = cv2.imread(logo_path, cv2.IMREAD_UNCHANGED)
-            if logo_img is not None:
-                # Resize logo based on size percentage
-                target_w = int(width * logo_size)
-                h, w = logo_img.shape[:2]
-                target_h = int(h * (target_w / w))
-                logo_img = cv2.resize(logo_img, (target_w, target_h), interpolation=cv2.INTER_AREA)
+        # Pre-load logo if exists, resized based on size percentage
+        logo_img = self._load_logo(logo_path, width, logo_size)
 
         # Calculate subtitle region in pixels
         if subtitle_region:
@@ -105,79 +369,592 @@ class VideoRenderer:
         else:
             y1, y2, x1, x2 = int(height * 0.75), height, 0, width
         
-        # Setup temporary video writer
-        temp_output = output_path + ".temp.mp4"
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(temp_output, fourcc, fps, (width, height))
-        
         # Create subtitle time index
-        subtitle_index = self._create_subtitle_index(subtitles, fps, total_frames)
+        subtitle_index = SubtitleIndex(subtitles, fps, total_frames)
+        audio = (video_path, voiceover_audio, voiceover_clips, original_volume, ducking, duration_ms)
+
+        ffmpeg_exe = ffmpeg_runner.find_ffmpeg()
+        if not ffmpeg_exe:
+            print("ffmpeg not found (PATH, AUTOVISUB_FFMPEG or ffmpeg.exe in the working folder): "
+                  "the output is an mp4v file without the mixed audio")
+        if two_pass and ffmpeg_exe:
+            cap.release()
+            intermediate = output_path + ".lossless.mp4"
+
+            def first_pass_progress(p):
+                if progress_callback: progress_callback(p * 0.6)
+            try:
+                # No passthrough: lossless parts can never be joined with the source's lossy ones
+                self.render_video_with_subtitles(
+                    video_path, subtitles, intermediate, subtitle_region, font_size, first_pass_progress,
+                    voiceover_audio, original_volume, logo_path, logo_position, logo_size, logo_x, logo_y,
+                    voiceover_clips, ducking, stream, False, ffmpeg_logo, workers, backend, cover,
+                    encoding_profile=LOSSLESS)
+                self._encode_two_pass(ffmpeg_exe, intermediate, output_path, encoding_profile,
+                                      width, height, fps, duration_ms / 1000, progress_callback)
+            finally:
+                if os.path.exists(intermediate): os.remove(intermediate)
+            if progress_callback: progress_callback(1.0)
+            return output_path
+
+        if backend == "ass" and cover == "inpaint":
+            print("Inpainting needs the Python compositor, ignoring the ASS backend")
+        elif backend == "ass" and ffmpeg_exe:
+            cap.release()
+            self._render_ass(ffmpeg_exe, video_path, subtitle_index, (x1, y1, x2, y2), font_size, fps, width, height,
+                             logo_img, logo_position, logo_x, logo_y, output_path, audio, encoding_profile,
+                             progress_callback)
+            if progress_callback: progress_callback(1.0)
+            return output_path
+
+        workers = workers or os.cpu_count() or 1
+        logo_overlay = None
+        # The overlay filter would need a re-encode of the joined segments, so parallel parts draw the logo themselves
+        if ffmpeg_logo and workers <= 1 and logo_img is not None and stream and ffmpeg_exe:
+            logo_png = output_path + ".logo.png"
+            cv2.imwrite(logo_png, logo_img)
+            logo_overlay = (logo_png,) + self._logo_position(logo_img, width, logo_position, logo_x, logo_y)
+            logo_img = None
+
+        frames = self._composite_frames(cap, subtitle_index, (x1, y1, x2, y2), font_size,
+                                        logo_img, logo_position, logo_x, logo_y,
+                                        total_frames, progress_callback, cover=cover)
+
+        if passthrough and logo_img is None and logo_overlay is None and ffmpeg_exe:
+            cap.release()
+            done = self._render_passthrough(ffmpeg_exe, video_path, subtitle_index, (x1, y1, x2, y2),
+                                            font_size, fps, width, height, total_frames, output_path, audio,
+                                            progress_callback, cover, encoding_profile)
+            if done:
+                if progress_callback: progress_callback(1.0)
+                return output_path
+            print("Passthrough not possible for this video, rendering every frame")
+            cap = cv2.VideoCapture(video_path)
+            frames = self._composite_frames(cap, subtitle_index, (x1, y1, x2, y2), font_size,
+                                            logo_img, logo_position, logo_x, logo_y,
+                                            total_frames, progress_callback, cover=cover)
+        if workers > 1 and ffmpeg_exe:
+            cap.release()
+            done = self._render_parallel(ffmpeg_exe, video_path, subtitle_index, (x1, y1, x2, y2), font_size,
+                                         logo_img, logo_position, logo_x, logo_y, fps, width, height,
+                                         total_frames, output_path, audio, workers, progress_callback, cover,
+                                         encoding_profile)
+            if done:
+                if progress_callback: progress_callback(1.0)
+                return output_path
+            print("Cannot split this video at keyframes, rendering in one process")
+            cap = cv2.VideoCapture(video_path)
+            frames = self._composite_frames(cap, subtitle_index, (x1, y1, x2, y2), font_size,
+                                            logo_img, logo_position, logo_x, logo_y,
+                                            total_frames, progress_callback, cover=cover)
+        try:
+            if ffmpeg_exe and stream:
+                self._encode_piped(ffmpeg_exe, frames, fps, width, height, output_path, audio,
+                                   logo_overlay=logo_overlay, encoding=encoding_profile)
+            else:
+                self._encode_via_temp_file(ffmpeg_exe, frames, fps, width, height, output_path, audio,
+                                           encoding_profile)
+        finally:
+            cap.release()
+            if logo_overlay and os.path.exists(logo_overlay[0]):
+                os.remove(logo_overlay[0])
         
-        frame_idx = 0
+        if progress_callback: progress_callback(1.0)
+        return output_path
+
+    def _composite_frames(self, cap, subtitle_index, region, font_size, logo_img, logo_position, logo_x, logo_y,
+                          total_frames, progress_callback, first_frame=0, cover="box"):
+        """
+        Yields every frame of cap with the subtitles and logo drawn on it.
+        first_frame: index of cap's first frame in the full video (for segments).
+        """
+        cursor = subtitle_index.cursor(first_frame)
+        inpainter = SubtitleInpainter() if cover == "inpaint" else None
+        frame_idx = first_frame
+        logo_sprite = None
         while True:
             ret, frame = cap.read()
             if not ret: break
             
             # 1. Draw Subtitles
-            sub_data = subtitle_index.get(frame_idx)
-            if sub_data:
-                current_text = sub_data['text']
-                current_bbox = sub_data['bbox']
-                bx1, by1, bx2, by2 = x1, y1, x2, y2
-                if current_bbox:
-                    bx1 = int(x1 + current_bbox[0])
-                    by1 = int(y1 + current_bbox[1])
-                    bx2 = int(x1 + current_bbox[2])
-                    by2 = int(y1 + current_bbox[3])
-                
-                frame = self._draw_text_on_frame_v2(frame, current_text, (bx1, by1, bx2, by2), font_size)
+            active = cursor.advance(frame_idx)
+            if active:
+                frame = self._draw_subtitles(frame, active, region, font_size, inpainter)
             
             # 2. Overlay Logo
             if logo_img is not None:
-                frame = self._overlay_logo(frame, logo_img, logo_position, logo_x, logo_y)
+                if logo_sprite is None:
+                    logo_sprite = self._logo_sprite(logo_img, frame.shape[1], frame.shape[0],
+                                                    logo_position, logo_x, logo_y)
+                frame = self._blend_sprite(frame, logo_sprite)
             
-            out.write(frame)
+            yield frame
             frame_idx += 1
             if progress_callback and frame_idx % 30 == 0:
                 progress_callback(frame_idx / total_frames)
-        
-        cap.release()
+        if inpainter is not None and inpainter.stats['frames']:
+            print(inpainter.report())
+
+    def _keyframe_times(self, ffmpeg_exe, video_path):
+        """
+        Returns (keyframe times in seconds, video codec name, pixel format) by decoding only the keyframes.
+        Times count from the first frame (frame 0), as the segment muxer's cut times do: ffmpeg's
+        own timestamps start at the container's start_time, which may be before the video's.
+        """
+        import re
+        cmd = [ffmpeg_exe, "-hide_banner", "-skip_frame", "nokey", "-i", video_path,
+               "-map", "0:v:0", "-vf", "showinfo", "-f", "null", "-"]
+        result = ffmpeg_runner.run(cmd, label="keyframes", check=False)
+        stream = re.search(r"Video: (\w+).*?, (yuv\w+|nv12|gray\w*)", result.stderr)
+        times = sorted(float(t) for t in re.findall(r"pts_time:\s*([\d.]+)", result.stderr))
+        times = [t - times[0] for t in times]
+        if not stream:
+            return times, None, None
+        return times, stream.group(1), stream.group(2)
+
+    def _h264_headers(self, ffmpeg_exe, path):
+        """
+        The parameter sets (SPS/PPS) in the extradata of the first video stream, as traced by
+        ffmpeg's trace_headers bitstream filter: (lines, {syntax element: value}). Two streams can only be
+        joined by stream copy if these lines are equal. fields['dar'] is the display aspect ratio
+        ("16:9") if the stream signals one.
+        """
+        import re
+        cmd = [ffmpeg_exe, "-hide_banner", "-i", path, "-map", "0:v:0", "-c", "copy", "-bsf:v", "trace_headers",
+               "-frames:v", "1", "-f", "null", "-"]
+        result = ffmpeg_runner.run(cmd, label="headers", check=False)
+        lines = []
+        for line in result.stderr.splitlines():
+            match = re.match(r"\[trace_headers @ \w+\] (.*)", line)
+            if match:
+                if match.group(1).startswith("Packet:"):
+                    break
+                lines.append(match.group(1))
+        fields = {k: int(v) for k, v in re.findall(r"^\d+\s+(\w+)\s+[01]+ = (-?\d+)$", "\n".join(lines), re.M)}
+        dar = re.search(r"Video: .*?\[SAR \d+:\d+ DAR (\d+:\d+)\]", result.stderr)
+        if dar:
+            fields['dar'] = dar.group(1)
+        return lines, fields
+
+    def _h264_codec_args(self, fields):
+        """
+        libx264 arguments for the profile, level, reference frames and aspect ratio of a
+        source, or None if unsupported.
+        """
+        profile = H264_PROFILES.get(fields.get('profile_idc'))
+        refs = fields.get('num_ref_idx_l0_default_active_minus1')
+        if profile is None or 'level_idc' not in fields or refs is None:
+            return None
+        # x264's --ref is the default active list size (max_num_ref_frames also counts the B-pyramid)
+        args = ["-profile:v", profile, "-level", f"{fields['level_idc'] / 10:g}", "-refs", str(refs + 1)]
+        if 'dar' in fields:
+            args += ["-aspect", fields['dar']]
+        return args
+
+    def _parts_match_source(self, ffmpeg_exe, source_headers, codec_args, fps, width, height, pix_fmt,
+                            output_path, encoding):
+        """
+        Whether parts encoded with this profile would carry the source's SPS/PPS. x264 derives
+        them from its settings alone, so two blank frames tell before anything is split or rendered.
+        """
+        probe_path = output_path + ".probe.mp4"
+        blank = np.zeros((height, width, 3), np.uint8)
+        try:
+            self._encode_piped(ffmpeg_exe, [blank, blank], fps, width, height, probe_path, None, pix_fmt,
+                               encoding=encoding, codec_args=codec_args)
+            probe_headers = self._h264_headers(ffmpeg_exe, probe_path)[0]
+        except RuntimeError as e:
+            # e.g. x264 refusing the source's profile with these settings
+            print(f"Cannot encode parts like the source: {str(e).splitlines()[0]}")
+            return False
+        finally:
+            if os.path.exists(probe_path):
+                os.remove(probe_path)
+        if probe_headers != source_headers:
+            # Other encoder settings (e.g. a different CRF or preset) change the SPS/PPS
+            print("This encoding profile does not reproduce the source's H.264 parameter sets")
+            return False
+        return True
+
+    def _render_passthrough(self, ffmpeg_exe, video_path, subtitle_index, region, font_size,
+                            fps, width, height, total_frames, output_path, audio, progress_callback, cover="box",
+                            encoding=None):
+        """
+        Splits the source at keyframes (stream copy), re-encodes only the parts that show a
+        subtitle, joins all parts with the concat demuxer and mixes the audio in that same
+        final call. The parts are encoded with the source's profile, level and reference
+        frames; a probe encode checks first that their SPS/PPS come out identical to the
+        source's, and every part is checked again before the join.
+        Returns False (nothing written) if the source does not allow it.
+        """
+        import shutil
+        keyframes, codec, pix_fmt = self._keyframe_times(ffmpeg_exe, video_path)
+        if codec != "h264" or not keyframes:
+            # Re-encoded parts are libx264; other codecs cannot be joined with copied parts
+            return False
+        source_headers, fields = self._h264_headers(ffmpeg_exe, video_path)
+        codec_args = self._h264_codec_args(fields)
+        if codec_args is None or not self._parts_match_source(ffmpeg_exe, source_headers, codec_args, fps, width,
+                                                              height, pix_fmt, output_path, encoding):
+            return False
+
+        # Keyframe-aligned [start, end) time ranges around every subtitle span
+        dirty = []
+        for first, last in subtitle_index.spans():
+            t0, t1 = first / fps, (last + 1) / fps
+            start = max([k for k in keyframes if k <= t0 + 1e-6], default=0.0)
+            end = min([k for k in keyframes if k >= t1 - 1e-6], default=None)
+            if dirty and start <= dirty[-1][1]:
+                dirty[-1][1] = end if end is None or dirty[-1][1] is None else max(dirty[-1][1], end)
+            else:
+                dirty.append([start, end])
+            if end is None:
+                break
+
+        boundaries = sorted({t for span in dirty for t in span if t is not None and t > 0})
+        dirty_starts = {span[0] for span in dirty}
+        parts_dir = output_path + ".parts"
+        os.makedirs(parts_dir, exist_ok=True)
+        try:
+            # 1. Stream-copy split at the keyframes
+            parts = self._split_at_keyframes(ffmpeg_exe, video_path, boundaries, parts_dir)
+            if parts is None:
+                return False
+
+            # 2. Re-encode the parts that carry subtitles
+            starts = [0.0] + boundaries
+            dirty_frames = sum(last - first + 1 for first, last in subtitle_index.spans())
+            rendered = [0]
+
+            def on_frame(_):
+                rendered[0] += 30
+                if progress_callback:
+                    progress_callback(min(0.99, rendered[0] / max(1, dirty_frames)))
+
+            concat_list = []
+            for part_path, start in zip(parts, starts):
+                if start in dirty_starts:
+                    cap = cv2.VideoCapture(part_path)
+                    frames = self._composite_frames(cap, subtitle_index, region, font_size, None, None, 0, 0,
+                                                    total_frames, on_frame, first_frame=int(round(start * fps)),
+                                                    cover=cover)
+                    rendered_path = part_path[:-4] + ".r.mp4"
+                    try:
+                        # Same codec, pixel format, profile, level and refs as the copied parts
+                        self._encode_piped(ffmpeg_exe, frames, fps, width, height, rendered_path, None, pix_fmt,
+                                           encoding=encoding, codec_args=codec_args)
+                    except RuntimeError as e:
+                        # e.g. x264 refusing the source's profile with these settings
+                        print(f"Cannot encode a part like the source: {str(e).splitlines()[0]}")
+                        return False
+                    finally:
+                        cap.release()
+                    if self._h264_headers(ffmpeg_exe, rendered_path)[0] != source_headers:
+                        print("Re-encoded parts do not match the source's H.264 parameter sets")
+                        return False
+                    part_path = rendered_path
+                concat_list.append(part_path)
+
+            # 3. Join (video copied) and mix the audio in one call
+            self._concat_with_audio(ffmpeg_exe, concat_list, parts_dir, output_path, audio)
+            return True
+        finally:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+
+    def _render_parallel(self, ffmpeg_exe, video_path, subtitle_index, region, font_size, logo_img, logo_position,
+                         logo_x, logo_y, fps, width, height, total_frames, output_path, audio, workers,
+                         progress_callback, cover="box", encoding=None):
+        """
+        Splits the source at the keyframes closest to equal time slices (stream copy),
+        composites and encodes every part in its own process (own capture, own ffmpeg),
+        then joins the parts and mixes the audio in one final call. All parts come out of
+        the same libx264 settings, so any source codec can be joined by stream copy.
+        The encoder threads are shared out between the processes.
+        Returns False (nothing written) if the source cannot be split.
+        """
+        import shutil
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        keyframes, _, _ = self._keyframe_times(ffmpeg_exe, video_path)
+        duration = total_frames / fps
+        boundaries = sorted({min(keyframes, key=lambda k: abs(k - duration * i / workers))
+                             for i in range(1, workers)} - {0.0}) if keyframes else []
+        if not boundaries:
+            return False
+
+        parts_dir = output_path + ".parts"
+        os.makedirs(parts_dir, exist_ok=True)
+        try:
+            parts = self._split_at_keyframes(ffmpeg_exe, video_path, boundaries, parts_dir)
+            if parts is None:
+                return False
+            starts = [0] + [int(round(t * fps)) for t in boundaries]
+            lengths = [b - a for a, b in zip(starts, starts[1:] + [total_frames])]
+            jobs = [{
+                'font_path': self.font_path, 'ffmpeg_exe': ffmpeg_exe,
+                'part_path': part_path, 'output_path': part_path[:-4] + ".r.mp4", 'first_frame': first,
+                'subtitle_index': subtitle_index, 'region': region, 'font_size': font_size,
+                'logo_img': logo_img, 'logo_position': logo_position, 'logo_x': logo_x, 'logo_y': logo_y,
+                'fps': fps, 'width': width, 'height': height, 'total_frames': total_frames, 'cover': cover,
+                'encoding': get_profile(encoding), 'threads': max(1, (os.cpu_count() or 1) // workers)
+            } for part_path, first in zip(parts, starts)]
+
+            done_frames = 0
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                futures = {pool.submit(_render_segment, job): n for job, n in zip(jobs, lengths)}
+                for future in as_completed(futures):
+                    future.result()
+                    done_frames += futures[future]
+                    if progress_callback:
+                        progress_callback(min(0.99, done_frames / max(1, total_frames)))
+
+            self._concat_with_audio(ffmpeg_exe, [job['output_path'] for job in jobs], parts_dir, output_path, audio)
+            return True
+        finally:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+
+    def _ass_events(self, subtitle_index, region, font_size, fps):
+        """
+        ASS events with the same boxes, text positions and stacking as the Python compositor.
+        Placement only changes where a subtitle starts or ends, so the timeline is cut at
+        those frames and a subtitle keeps one event while its position stays the same.
+        """
+        cuts = sorted(set(subtitle_index.starts.tolist()) | set((subtitle_index.ends + 1).tolist()))
+        cursor = subtitle_index.cursor(cuts[0] if cuts else 0)
+        events, open_events = [], {}
+        for frame_a, frame_b in zip(cuts, cuts[1:]):
+            active = cursor.advance(frame_a)
+            layouts = [self._subtitle_layout(sub['text'], self._subtitle_target(sub, region), font_size) for sub in active]
+            ys = self._stack_boxes([(x, y, w, h) for x, y, w, h, _ in layouts])
+            still_open = {}
+            for sub, (x, _, w, h, lines), y in zip(active, layouts, ys):
+                ev = open_events.get(id(sub))
+                if ev is None or (ev['x'], ev['y']) != (x, y):
+                    # Half a frame of slack on both ends so centisecond rounding never drops a frame
+                    ev = {'start': (frame_a - 0.5) / fps, 'x': x, 'y': y, 'w': w, 'h': h, 'lines': lines}
+                    events.append(ev)
+                ev['end'] = (frame_b - 0.5) / fps
+                still_open[id(sub)] = ev
+            open_events = still_open
+        return events
+
+    def _render_ass(self, ffmpeg_exe, video_path, subtitle_index, region, font_size, fps, width, height,
+                    logo_img, logo_position, logo_x, logo_y, output_path, audio, encoding=None,
+                    progress_callback=None):
+        """
+        One ffmpeg call: decode, burn in the ASS subtitles (libass), overlay the logo, mix the
+        audio and encode. The script and a copy of the font go to a temp folder that is passed
+        as fontsdir, so libass loads just that font and filter paths need little escaping.
+        """
+        import shutil
+        import tempfile
+        work_dir = tempfile.mkdtemp(prefix="ass_")
+        try:
+            font = self.fonts.get(font_size)
+            font_name, ass_size = "Arial", font_size
+            if self.font_path and hasattr(font, "getname"):
+                shutil.copy(self.font_path, work_dir)
+                font_name = font.getname()[0]
+                # libass sizes a font by its line height (ascent + descent), PIL by its em size
+                ass_size = round(font_size * self.fonts.line_height_ratio(), 2)
+            events = self._ass_events(subtitle_index, region, font_size, fps)
+            script_path = os.path.join(work_dir, "subs.ass")
+            with open(script_path, "w", encoding="utf-8") as f:
+                f.write(build_ass_script(events, width, height, font_name, ass_size))
+
+            def filter_path(path):
+                return "'" + path.replace("\\", "/").replace(":", "\\:") + "'"
+
+            audio_inputs, maps, voice_pcm, temp_files = self._audio_args(audio, output_path, pcm_on_stdin=True)
+            inputs = ["-i", video_path] + audio_inputs
+            graph = f"[0:v]ass=filename={filter_path(script_path)}:fontsdir={filter_path(work_dir)}"
+            if logo_img is not None:
+                logo_png = os.path.join(work_dir, "logo.png")
+                cv2.imwrite(logo_png, logo_img)
+                x, y = self._logo_position(logo_img, width, logo_position, logo_x, logo_y)
+                graph += f"[s];[s][{inputs.count('-i')}:v]overlay={x}:{y}[v]"
+                inputs += ["-i", logo_png]
+            else:
+                graph += "[v]"
+            cmd = [ffmpeg_exe, "-y", "-loglevel", "error"] + inputs + self._video_filter_maps(maps, graph)
+            cmd += x264_args(encoding) + ["-c:a", "aac", "-shortest", output_path]
+            try:
+                # The whole render happens in this call, so its progress drives the bar
+                ffmpeg_runner.run(cmd, input=voice_pcm.tobytes() if voice_pcm is not None else None,
+                                  duration=audio[5] / 1000, progress_callback=progress_callback, label="ass render")
+            finally:
+                for path in temp_files:
+                    try: os.remove(path)
+                    except OSError: pass
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _encode_two_pass(self, ffmpeg_exe, input_path, output_path, encoding, width, height, fps, duration,
+                         progress_callback=None):
+        """Two-pass libx264 encode of a finished render to the profile's average bitrate; the audio is copied."""
+        import shutil
+        import tempfile
+        args = x264_args(encoding, bitrate=two_pass_bitrate(encoding, width, height, fps))
+
+        def scaled(lo, hi):
+            return lambda p: progress_callback(lo + (hi - lo) * p) if progress_callback else None
+
+        log_dir = tempfile.mkdtemp(prefix="x264_2pass_")
+        log = os.path.join(log_dir, "pass")
+        try:
+            base = [ffmpeg_exe, "-y", "-loglevel", "error", "-i", input_path]
+            ffmpeg_runner.run(base + ["-map", "0:v:0", "-an"] + args +
+                              ["-pass", "1", "-passlogfile", log, "-f", "null", os.devnull],
+                              duration=duration, progress_callback=scaled(0.6, 0.8), label="two-pass 1")
+            ffmpeg_runner.run(base + ["-map", "0:v:0", "-map", "0:a?"] + args +
+                              ["-pass", "2", "-passlogfile", log, "-c:a", "copy", output_path],
+                              duration=duration, progress_callback=scaled(0.8, 1.0), label="two-pass 2")
+        finally:
+            shutil.rmtree(log_dir, ignore_errors=True)
+
+    def _split_at_keyframes(self, ffmpeg_exe, video_path, boundaries, parts_dir):
+        """
+        Stream-copies the video track into parts starting at the given keyframe times.
+        Returns the part paths in order, or None if ffmpeg did not cut where expected.
+        """
+        # Cut times sit 1 ms before each keyframe so rounding never skips one
+        split_cmd = [ffmpeg_exe, "-y", "-loglevel", "error", "-i", video_path, "-map", "0:v:0", "-c", "copy",
+                     "-f", "segment", "-reset_timestamps", "1"]
+        if boundaries:
+            split_cmd += ["-segment_times", ",".join(f"{max(0.0, t - 0.001):.3f}" for t in boundaries)]
+        split_cmd.append(os.path.join(parts_dir, "part_%05d.mp4"))
+        ffmpeg_runner.run(split_cmd, label="split")
+        parts = sorted(f for f in os.listdir(parts_dir) if f.startswith("part_"))
+        if len(parts) != len(boundaries) + 1:
+            return None
+        return [os.path.join(parts_dir, f) for f in parts]
+
+    def _concat_with_audio(self, ffmpeg_exe, part_paths, parts_dir, output_path, audio):
+        """Joins video parts with the concat demuxer (no re-encode) and mixes/muxes the audio in the same call."""
+        list_path = os.path.join(parts_dir, "concat.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            for path in part_paths:
+                f.write("file '{}'\n".format(os.path.abspath(path).replace("'", "'\\''")))
+
+        audio_inputs, maps, voice_pcm, temp_files = self._audio_args(audio, output_path, pcm_on_stdin=True)
+        cmd = [ffmpeg_exe, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path]
+        cmd += audio_inputs + maps + ["-c:v", "copy", "-c:a", "aac", "-shortest", output_path]
+        try:
+            ffmpeg_runner.run(cmd, input=voice_pcm.tobytes() if voice_pcm is not None else None, label="concat")
+        finally:
+            for path in temp_files:
+                try: os.remove(path)
+                except OSError: pass
+
+    def _audio_args(self, audio, output_path, pcm_on_stdin):
+        """
+        ffmpeg arguments for the audio inputs (1 = original video, 2 = voiceover) and the
+        audio mapping. Returns (input_args, map_args, stdin_pcm, temp_files).
+        pcm_on_stdin: feed mixed voiceover clips through stdin; otherwise (stdin carries the
+        video frames) they are written to a temporary WAV, which is a copy, not an encode.
+        """
+        video_path, voiceover_audio, voiceover_clips, original_volume, ducking, duration_ms = audio
+        inputs, stdin_pcm, temp_files = ["-i", video_path], None, []
+
+        if voiceover_clips:
+            pcm = self._mix_voiceover_clips(voiceover_clips, duration_ms)
+            if pcm_on_stdin:
+                inputs += ["-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", "1", "-i", "pipe:0"]
+                stdin_pcm = pcm
+            else:
+                voice_wav = output_path + ".voice.wav"
+                write_wav(voice_wav, pcm)
+                inputs += ["-i", voice_wav]
+                temp_files.append(voice_wav)
+        elif voiceover_audio and os.path.exists(voiceover_audio):
+            inputs += ["-i", voiceover_audio]
+        else:
+            # Just take original audio, apply volume if not 1.0
+            if original_volume != 1.0:
+                return inputs, ["-filter_complex", f"[1:a]volume={original_volume}[a]", "-map", "0:v:0", "-map", "[a]"], None, []
+            return inputs, ["-map", "0:v:0", "-map", "1:a:0?"], None, []
+
+        # MIX: Original background (ducked) + VoiceOver
+        maps = ["-filter_complex", self._audio_mix_graph(original_volume, ducking), "-map", "0:v:0", "-map", "[a]"]
+        return inputs, maps, stdin_pcm, temp_files
+
+    def _encode_piped(self, ffmpeg_exe, frames, fps, width, height, output_path, audio, pix_fmt="yuv420p",
+                      logo_overlay=None, encoding=None, threads=None, codec_args=None):
+        """
+        Single encode: raw BGR frames on stdin -> libx264, audio mixed and muxed in the same process.
+        logo_overlay: (image_path, x, y) drawn by ffmpeg's overlay filter on every frame.
+        encoding: encoding profile (name or dict); threads overrides its encoder thread count.
+        codec_args: extra libx264 arguments (e.g. profile and level to match a source).
+        """
+        if audio is None:
+            # Video only (a segment that gets its audio at the final mux)
+            audio_inputs, maps, temp_files = [], ["-map", "0:v:0"], []
+        else:
+            audio_inputs, maps, _, temp_files = self._audio_args(audio, output_path, pcm_on_stdin=False)
+        if logo_overlay:
+            logo_path, x, y = logo_overlay
+            maps = self._overlay_maps(maps, 1 + audio_inputs.count("-i"), x, y)
+            audio_inputs = audio_inputs + ["-i", logo_path]
+        cmd = [ffmpeg_exe, "-y", "-loglevel", "error",
+               "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "pipe:0"]
+        cmd += audio_inputs + maps + x264_args(encoding, pix_fmt, threads) + (codec_args or [])
+        if audio is not None:
+            cmd += ["-c:a", "aac", "-shortest"]
+        cmd.append(output_path)
+
+        # stderr is drained on the side, so a chatty ffmpeg can never block the frame pipe
+        process = ffmpeg_runner.FFmpegProcess(cmd, stdin=True, label="encode")
+        try:
+            for frame in frames:
+                if not process.write(np.ascontiguousarray(frame).tobytes()):
+                    break  # ffmpeg exited early; its error output is reported below
+        finally:
+            result = process.wait(check=False)
+            for path in temp_files:
+                try: os.remove(path)
+                except OSError: pass
+        if result.returncode != 0:
+            raise RuntimeError(f"FFMPEG Error: {result.stderr.strip()}")
+
+    def _overlay_maps(self, maps, logo_input, x, y):
+        """Puts the logo overlay in front of the (audio) filter graph and maps its output as the video."""
+        return self._video_filter_maps(maps, f"[0:v][{logo_input}:v]overlay={x}:{y}[v]")
+
+    def _video_filter_maps(self, maps, graph):
+        """Adds a video filter graph ending in [v] to the (audio) filter graph and maps [v] as the video."""
+        maps = list(maps)
+        if "-filter_complex" in maps:
+            i = maps.index("-filter_complex") + 1
+            maps[i] = graph + ";" + maps[i]
+        else:
+            maps = ["-filter_complex", graph] + maps
+        maps[maps.index("0:v:0")] = "[v]"
+        return maps
+
+    def _encode_via_temp_file(self, ffmpeg_exe, frames, fps, width, height, output_path, audio, encoding=None):
+        """Writes an mp4v temp file with OpenCV, then converts it to H.264 and mixes the audio with ffmpeg (if present)."""
+        # Setup temporary video writer
+        temp_output = output_path + ".temp.mp4"
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        out = cv2.VideoWriter(temp_output, fourcc, fps, (width, height))
+        for frame in frames:
+            out.write(frame)
         out.release()
 
         # Step 2: Convert to H.264 and MIX AUDIO using ffmpeg
-        ffmpeg_exe = os.path.join(os.getcwd(), "ffmpeg.exe")
-        if os.path.exists(ffmpeg_exe):
-            import subprocess
+        if ffmpeg_exe:
             if os.path.exists(output_path): os.remove(output_path)
             
-            # Base command
-            cmd = [ffmpeg_exe, "-y", "-i", temp_output]
-            
-            if voiceover_audio and os.path.exists(voiceover_audio):
-                # MIX: Original background (ducked) + VoiceOver
-                # Input 1: Video (temp), Input 2: Original Video (for background audio), Input 3: VoiceOver
-                cmd.extend(["-i", video_path, "-i", voiceover_audio])
-                # Filter to mix audio: original audio at user-defined volume, voiceover at 1.0
-                cmd.extend([
-                    "-filter_complex", 
-                    f"[1:a]volume={original_volume}[bg];[2:a]volume=1.0[vo];[bg][vo]amix=inputs=2:duration=first[a]",
-                    "-map", "0:v:0", "-map", "[a]"
-                ])
-            else:
-                # Just take original audio, apply volume if not 1.0
-                if original_volume != 1.0:
-                    cmd.extend(["-i", video_path, "-filter_complex", f"[1:a]volume={original_volume}[a]", "-map", "0:v:0", "-map", "[a]"])
-                else:
-                    cmd.extend(["-i", video_path, "-map", "0:v:0", "-map", "1:a:0?"])
-
-            cmd.extend([
-                "-c:v", "libx264", "-pix_fmt", "yuv420p", "-preset", "ultrafast",
+            # Input 0: Video (temp), Input 1: Original Video (for background audio), Input 2: VoiceOver
+            audio_inputs, maps, voice_pcm, temp_files = self._audio_args(audio, output_path, pcm_on_stdin=True)
+            cmd = [ffmpeg_exe, "-y", "-i", temp_output] + audio_inputs + maps
+            cmd.extend(x264_args(encoding) + [
                 "-c:a", "aac", "-shortest",
                 output_path
             ])
 
             try:
-                subprocess.run(cmd, check=True, capture_output=True)
+                ffmpeg_runner.run(cmd, input=voice_pcm.tobytes() if voice_pcm is not None else None,
+                                  label="transcode")
                 if os.path.exists(temp_output): os.remove(temp_output)
             except Exception as e:
                 print(f"FFMPEG Error: {e}")
@@ -185,106 +962,137 @@ class VideoRenderer:
         else:
             if os.path.exists(output_path): os.remove(output_path)
             os.rename(temp_output, output_path)
-        
-        if progress_callback: progress_callback(1.0)
-        return output_path
+
+    def _mix_voiceover_clips(self, clips, duration_ms):
+        """Mixes placed clips into one int16 PCM array (already fitted, so no stretching here)."""
+        return mix_clips([(clip['start_ms'], load_pcm(clip['path'])) for clip in clips], duration_ms)
+
+    def _audio_mix_graph(self, original_volume, ducking):
+        """
+        filter_complex mixing input 1 (original audio) with input 2 (voiceover) into [a].
+        Both are brought to 48 kHz stereo first so the sidechain and the mix line up.
+        """
+        fmt = "aresample=48000,aformat=sample_fmts=fltp:channel_layouts=stereo"
+        graph = f"[1:a]{fmt},volume={original_volume}[bg];"
+        if ducking:
+            graph += f"[2:a]{fmt},asplit=2[vo][sc];[bg][sc]{DUCKING_FILTER}[duck];"
+            bg = "[duck]"
+        else:
+            graph += f"[2:a]{fmt}[vo];"
+            bg = "[bg]"
+        # normalize=0 keeps both at their own level; the limiter catches the rare peaks that add up
+        return graph + f"{bg}[vo]amix=inputs=2:duration=first:normalize=0,alimiter=limit=0.95[a]"
 
     def _overlay_logo(self, frame, logo, position, offset_x, offset_y):
         """Overlay logo on frame with transparency support if available"""
         fh, fw = frame.shape[:2]
-        lh, lw = logo.shape[:2]
-        
-        # Determine top-left corner of logo
+        return self._blend_sprite(frame, self._logo_sprite(logo, fw, fh, position, offset_x, offset_y))
+
+    def _logo_position(self, logo, frame_w, position, offset_x, offset_y):
+        """Top-left corner of the logo, kept inside the frame on the left/top."""
+        lw = logo.shape[1]
         if position == "Top-Left":
             x, y = offset_x, offset_y
         else: # Top-Right
-            x, y = fw - lw - offset_x, offset_y
-            
-        # Bounds check
-        if x < 0: x = 0
-        if y < 0: y = 0
-        if x + lw > fw: lw = fw - x
-        if y + lh > fh: lh = fh - y
-        
-        if lw <= 0 or lh <= 0: return frame
-        
-        logo_part = logo[:lh, :lw]
-        
-        # Handle transparency (Alpha channel)
-        if logo_part.shape[2] == 4:
-            alpha = logo_part[:, :, 3] / 255.0
-            alpha = np.expand_dims(alpha, axis=2)
-            for c in range(0, 3):
-                frame[y:y+lh, x:x+lw, c] = (1.0 - alpha[:, :, 0]) * frame[y:y+lh, x:x+lw, c] + alpha[:, :, 0] * logo_part[:, :, c]
+            x, y = frame_w - lw - offset_x, offset_y
+        return max(x, 0), max(y, 0)
+
+    def _logo_sprite(self, logo, frame_w, frame_h, position, offset_x, offset_y):
+        """
+        Precomputes the logo's blend planes once per render, in the same fixed-point form
+        as the subtitle sprites, so every frame is one in-place integer blend of its ROI.
+        A logo without alpha is opaque (inv_alpha = 0).
+        """
+        x, y = self._logo_position(logo, frame_w, position, offset_x, offset_y)
+        if logo.ndim == 2:
+            logo = cv2.cvtColor(logo, cv2.COLOR_GRAY2BGR)
+        color = logo[:, :, :3].astype(np.uint16)
+        if logo.shape[2] == 4:
+            alpha = logo[:, :, 3:4].astype(np.uint16)
+            premult = (color * alpha + 127) // 255
+            inv_alpha = 255 - alpha
         else:
-            frame[y:y+lh, x:x+lw] = logo_part[:, :, :3]
-            
-        return frame
-    
-    def _create_subtitle_index(self, subtitles, fps, total_frames):
+            premult = color
+            inv_alpha = np.zeros(logo.shape[:2] + (1,), dtype=np.uint16)
+        return x, y, premult, inv_alpha
+
+    def _subtitle_target(self, sub, region):
+        """Box a subtitle replaces: its OCR bbox (relative to the region) or the whole region."""
+        x1, y1, x2, y2 = region
+        bbox = sub['bbox']
+        if not bbox:
+            return x1, y1, x2, y2
+        return int(x1 + bbox[0]), int(y1 + bbox[1]), int(x1 + bbox[2]), int(y1 + bbox[3])
+
+    def _draw_subtitles(self, frame, subs, region, font_size, inpainter=None):
         """
-        Create a frame-to-subtitle mapping for fast lookup.
-        Now includes bbox if available.
+        Draws all subtitles active on this frame, oldest first. A subtitle whose box would
+        cover one already drawn is moved up above it, so simultaneous lines stack instead of
+        hiding each other.
+        inpainter: remove the original text by inpainting and draw the new text without a box.
         """
-        index = {}
-        
-        for sub in subtitles:
-            # Simple constant 2-frame buffer to prevent flicker
-            start_frame = max(0, int(round(sub['start'] * fps)) - 2)
-            end_frame = int(round(sub['end'] * fps)) + 2
-            
-            data = {
-                'text': sub['text'],
-                'bbox': sub.get('bbox')
-            }
-            
-            for f in range(start_frame, end_frame + 1):
-                if 0 <= f < total_frames:
-                    index[f] = data
-        
-        return index
-    
+        if inpainter is not None:
+            inpainter.remove(frame, {id(sub): self._subtitle_target(sub, region) for sub in subs})
+        boxed = inpainter is None
+        sprites = [self._subtitle_sprite(sub['text'], self._subtitle_target(sub, region), font_size, boxed)
+                   for sub in subs]
+        ys = self._stack_boxes([(x, y, premult.shape[1], premult.shape[0]) for x, y, premult, _ in sprites])
+        for (x, _, premult, inv_alpha), y in zip(sprites, ys):
+            frame = self._blend_sprite(frame, (x, y, premult, inv_alpha))
+        return frame
+
+    def _stack_boxes(self, boxes):
+        """Top y of every (x, y, w, h) box, oldest first, after moving each one up above the boxes it would cover."""
+        placed = []
+        for x, y, w, h in boxes:
+            moved = True
+            while moved:
+                moved = False
+                for px1, py1, px2, py2 in placed:
+                    if x < px2 and px1 < x + w and y < py2 and py1 < y + h:
+                        y = py1 - STACK_GAP - h
+                        moved = True
+            placed.append((x, y, x + w, y + h))
+        return [box[1] for box in placed]
+
     def _draw_text_on_frame_v2(self, frame, text, target_bbox, font_size):
         """
         Draws text centered within a black box. 
         The box covers the target_bbox but expands horizontally if 'text' is wider.
+        The overlay is rasterized once per (text, box, size) and then only alpha blended.
+        """
+        return self._blend_sprite(frame, self._subtitle_sprite(text, tuple(target_bbox), font_size))
+
+    def _subtitle_sprite(self, text, target_bbox, font_size, boxed=True):
+        """Cached premultiplied sprite of one subtitle: (x, y, premultiplied BGR, 255 - alpha)."""
+        key = (text, target_bbox, font_size, boxed)
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            sprite = self._rasterize_subtitle(text, target_bbox, font_size, boxed)
+            self._sprites[key] = sprite
+            # Subtitles come in time order, so only the last few are ever needed again
+            while len(self._sprites) > SPRITE_CACHE_SIZE:
+                self._sprites.popitem(last=False)
+        else:
+            self._sprites.move_to_end(key)
+        return sprite
+
+    def _subtitle_layout(self, text, target_bbox, font_size):
+        """
+        Geometry of one subtitle overlay: (box_x1, box_y1, box_w, box_h, [(line, x, y), ...]),
+        line positions relative to the box. Shared by the sprite and the ASS backends.
         """
-        import textwrap
         tx1, ty1, tx2, ty2 = target_bbox
         target_w = tx2 - tx1
         target_h = ty2 - ty1
-        
-        # Convert BGR to RGB
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        pil_img = Image.fromarray(frame_rgb)
-        draw = ImageDraw.Draw(pil_img)
-        
-        # Load font
-        try:
-            if self.font_path:
-                font = ImageFont.truetype(self.font_path, font_size)
-            else:
-                font = ImageFont.load_default()
-        except:
-            font = ImageFont.load_default()
             
         # Wrapping logic: prefer wrapping if text is extremely long, 
         # but the primary goal is to center relative to original area
         # For video subs, we typically want 1-2 lines.
         # We increase chars_per_line to allow horizontal expansion as requested.
         chars_per_line = 60 # Allow more width before wrapping
-        lines = textwrap.wrap(text, width=chars_per_line)
-        
-        line_heights = []
-        line_widths = []
-        for line in lines:
-            try:
-                bbox = draw.textbbox((0, 0), line, font=font)
-                line_widths.append(bbox[2] - bbox[0])
-                line_heights.append(bbox[3] - bbox[1])
-            except:
-                line_widths.append(draw.textsize(line, font=font)[0])
-                line_heights.append(draw.textsize(line, font=font)[1])
+        # Font objects and line measurements are cached by the font manager
+        lines, line_widths, line_heights = self.fonts.layout(text, font_size, chars_per_line)
         
         total_text_height = sum(line_heights) + (len(lines) - 1) * 8
         max_text_width = max(line_widths) if line_widths else 0
@@ -302,30 +1110,87 @@ class VideoRenderer:
         
         box_x1 = center_x - int(final_w // 2)
         box_y1 = center_y - int(final_h // 2)
-        box_x2 = box_x1 + int(final_w)
-        box_y2 = box_y1 + int(final_h)
+        box_w = int(final_w) + 1
+        box_h = int(final_h) + 1
+
+        # Text lines centered in the box
+        # Correctly center text block vertically within the rounded box
+        placed_lines = []
+        current_y = (final_h - total_text_height) // 2
+        for i, line in enumerate(lines):
+            line_x = (final_w - line_widths[i]) // 2
+            placed_lines.append((line, line_x, current_y))
+            current_y += line_heights[i] + 8
+        return box_x1, box_y1, box_w, box_h, placed_lines
+
+    def _rasterize_subtitle(self, text, target_bbox, font_size, boxed=True):
+        font = self.fonts.get(font_size)
+        box_x1, box_y1, box_w, box_h, lines = self._subtitle_layout(text, target_bbox, font_size)
+
+        # Sprite canvas = the box, drawn in sprite coordinates (origin at box_x1, box_y1)
+        sprite = Image.new("RGBA", (box_w, box_h), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(sprite)
         
         # Draw the unified black mask with ROUNDED CORNERS (Premium look)
-        radius = 15 # Corner radius
-        draw.rounded_rectangle([box_x1, box_y1, box_x2, box_y2], radius=radius, fill=(0, 0, 0))
+        if boxed:
+            radius = 15 # Corner radius
+            draw.rounded_rectangle([0, 0, box_w - 1, box_h - 1], radius=radius, fill=(0, 0, 0, 255))
 
         # Draw text lines centered in the box
-        # Correctly center text block vertically within the rounded box
-        current_y = box_y1 + (final_h - total_text_height) // 2
-        for i, line in enumerate(lines):
-            line_w = line_widths[i]
-            line_x = box_x1 + (final_w - line_w) // 2
-            
+        for line, line_x, line_y in lines:
+            if not boxed:
+                # No box behind the text: a full stroke keeps it readable on any background
+                draw.text((line_x, line_y), line, font=font, fill=(255, 255, 255, 255),
+                          stroke_width=2, stroke_fill=(0, 0, 0, 255))
+                continue
             # Subtle outline
             for adj in [-1, 1]:
-                draw.text((line_x + adj, current_y), line, font=font, fill=(0,0,0, 180))
-                draw.text((line_x, current_y + adj), line, font=font, fill=(0,0,0, 180))
+                draw.text((line_x + adj, line_y), line, font=font, fill=(0, 0, 0, 255))
+                draw.text((line_x, line_y + adj), line, font=font, fill=(0, 0, 0, 255))
                 
-            draw.text((line_x, current_y), line, font=font, fill=(255, 255, 255))
-            current_y += line_heights[i] + 8
+            draw.text((line_x, line_y), line, font=font, fill=(255, 255, 255, 255))
 
-        # Convert back to BGR
-        return cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
+        rgba = np.asarray(sprite, dtype=np.uint16)
+        alpha = rgba[:, :, 3:4]
+        # Premultiplied color in BGR order, so a frame pixel only needs one multiply-add
+        premult = ((rgba[:, :, 2::-1] * alpha + 127) // 255).astype(np.uint16)
+        return box_x1, box_y1, premult, 255 - alpha
+
+    def _blend_sprite(self, frame, sprite):
+        """out = sprite + frame * (1 - alpha), on the sprite's ROI only (clipped to the frame)."""
+        x, y, premult, inv_alpha = sprite
+        fh, fw = frame.shape[:2]
+        sh, sw = premult.shape[:2]
+        fx1, fy1 = max(x, 0), max(y, 0)
+        fx2, fy2 = min(x + sw, fw), min(y + sh, fh)
+        if fx1 >= fx2 or fy1 >= fy2:
+            return frame
+        sx1, sy1 = fx1 - x, fy1 - y
+        sx2, sy2 = sx1 + (fx2 - fx1), sy1 + (fy2 - fy1)
+
+        roi = frame[fy1:fy2, fx1:fx2]
+        blended = roi * inv_alpha[sy1:sy2, sx1:sx2]
+        blended += 127
+        blended //= 255
+        blended += premult[sy1:sy2, sx1:sx2]
+        roi[:] = blended
+        return frame
+
+
+def _render_segment(job):
+    """Worker process: composites and encodes one keyframe-aligned part (video only)."""
+    renderer = VideoRenderer(job['font_path'])
+    cap = cv2.VideoCapture(job['part_path'])
+    try:
+        frames = renderer._composite_frames(cap, job['subtitle_index'], job['region'], job['font_size'],
+                                            job['logo_img'], job['logo_position'], job['logo_x'], job['logo_y'],
+                                            job['total_frames'], None, first_frame=job['first_frame'],
+                                            cover=job['cover'])
+        renderer._encode_piped(job['ffmpeg_exe'], frames, job['fps'], job['width'], job['height'],
+                               job['output_path'], None, encoding=job['encoding'], threads=job['threads'])
+    finally:
+        cap.release()
+    return job['output_path']
 
 
 def render_video_with_vietnamese_subs(
@@ -341,12 +1206,23 @@ def render_video_with_vietnamese_subs(
     logo_position="Top-Left",
     logo_size=0.15,
     logo_x=20,
-    logo_y=20
+    logo_y=20,
+    voiceover_clips=None,
+    ducking=True,
+    stream=True,
+    passthrough=False,
+    font_path=None,
+    ffmpeg_logo=False,
+    workers=1,
+    backend="python",
+    cover="box",
+    encoding_profile=None,
+    two_pass=False
 ):
     """
     Convenience function to render video with Vietnamese subtitles and optional voiceover/logo.
     """
-    renderer = VideoRenderer()
+    renderer = VideoRenderer(font_path)
     return renderer.render_video_with_subtitles(
         video_path,
         subtitles,
@@ -360,5 +1236,15 @@ def render_video_with_vietnamese_subs(
         logo_position,
         logo_size,
         logo_x,
-        logo_y
+        logo_y,
+        voiceover_clips,
+        ducking,
+        stream,
+        passthrough,
+        ffmpeg_logo,
+        workers,
+        backend,
+        cover,
+        encoding_profile,
+        two_pass
     )
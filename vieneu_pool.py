@@ -0,0 +1,72 @@
+"""
+Process pool for VieNeu synthesis.
+
+Each worker process loads the VieNeu model once at startup and then takes
+(text, output_path) jobs from the pool's queue, writing the audio file straight
+into the voiceovers folder. CPU-only VieNeu is slow, so spreading lines over
+several cores is what keeps TTS from dominating the pipeline.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Rough resident memory of one worker with the default (0.3B) model loaded
+VIENEU_WORKER_RAM_MB = 2000
+
+# Per-process state, set by the initializer
+_model = None
+_infer_kwargs = None
+
+
+def default_worker_count(ram_per_worker_mb=VIENEU_WORKER_RAM_MB):
+    """As many workers as fit in half the cores and in 75% of physical RAM (at least 1)."""
+    cores = os.cpu_count() or 1
+    workers = max(1, cores // 2)
+    try:
+        total_mb = os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+        workers = min(workers, int(total_mb * 0.75 / ram_per_worker_mb))
+    except (ValueError, OSError, AttributeError):
+        pass  # sysconf is not available on Windows
+    return max(1, workers)
+
+
+def _init_worker(ref_audio, ref_text, temperature, top_k, torch_threads):
+    global _model, _infer_kwargs
+    if torch_threads:
+        try:
+            import torch
+            # Avoid N workers each spawning a thread per core
+            torch.set_num_threads(torch_threads)
+        except ImportError:
+            pass
+    from vieneu import Vieneu
+    _model = Vieneu()
+    _infer_kwargs = {
+        'ref_audio': ref_audio,
+        'ref_text': ref_text,
+        'temperature': temperature,
+        'top_k': top_k
+    }
+
+
+def _synthesize(text, output_path):
+    audio_data = _model.infer(text, **_infer_kwargs)
+    _model.save(audio_data, output_path)
+    return output_path
+
+
+class VieNeuWorkerPool:
+    def __init__(self, num_workers=None, ref_audio=None, ref_text=None, temperature=0.7, top_k=50):
+        self.num_workers = num_workers or default_worker_count()
+        torch_threads = max(1, (os.cpu_count() or 1) // self.num_workers)
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            initializer=_init_worker,
+            initargs=(ref_audio, ref_text, temperature, top_k, torch_threads)
+        )
+
+    def submit(self, text, output_path):
+        """Returns a concurrent.futures.Future resolving to output_path."""
+        return self.executor.submit(_synthesize, text, output_path)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
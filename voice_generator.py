@@ -3,10 +3,43 @@ import asyncio
 import edge_tts
 from pydub import AudioSegment
 import json
+from speech_duration import SpeechDurationModel, parse_rate, format_rate
+from clip_cache import ClipCache
+from audio_utils import SAMPLE_RATE, normalize_segment, segment_to_pcm, pcm_to_segment, load_pcm, pcm_duration_ms, write_wav, mix_clips
+from time_stretch import wsola_batch
+from timeline import plan_timeline, summarize_plan
+
+# Display name -> edge-tts voice id (shared by the Streamlit UI and the headless pipeline)
+VOICE_OPTIONS = {
+    "Hoài My (Female)": "vi-VN-HoaiMyNeural",
+    "Nam Minh (Male)": "vi-VN-NamMinhNeural"
+}
+
+STYLE_PRESETS = {
+    "Young Girl (Cute/High Pitch)": {"pitch": "+30Hz", "rate": "+5%"},
+    "Standard (Normal)": {"pitch": "+0Hz", "rate": "+0%"},
+    "Dramatic Movie Review": {"pitch": "-4Hz", "rate": "+15%"},
+    "Storytelling (Soft)": {"pitch": "+0Hz", "rate": "-5%"}
+}
 
 class VoiceOverGenerator:
     def __init__(self, method="edge-tts", voice="vi-VN-NamMinhNeural", pitch="+0Hz", rate="+0%", 
-                 ref_audio=None, ref_text=None, temperature=0.7, top_k=50, max_speed_limit=0.25):
+                 ref_audio=None, ref_text=None, temperature=0.7, top_k=50, max_speed_limit=0.25,
+                 vieneu_workers=1, duration_model_path="tts_duration_model.json", speed_fit_tolerance=0.05,
+                 clip_cache_dir="tts_cache", clip_cache_max_mb=2048, stretch_engine="wsola",
+                 timeline_lead_ms=250, timeline_lag_ms=600):
+        """
+        vieneu_workers: with method="vieneu", number of worker processes that each load the
+        model once and synthesize lines in parallel (None = fit to cores and RAM, 1 = in-process).
+        duration_model_path: where the edge-tts speech duration model is kept (None = memory only).
+        speed_fit_tolerance: an edge-tts clip is re-synthesized only if it overflows its slot by more than this.
+        clip_cache_dir: shared clip cache reused across runs and projects (None = disabled),
+        trimmed to clip_cache_max_mb by least recent use.
+        stretch_engine: how VieNeu/gTTS clips that overflow their slot are sped up:
+        "wsola" (NumPy, batched over all overflowing clips) or "pydub" (AudioSegment.speedup).
+        timeline_lead_ms / timeline_lag_ms: how far before / after its subtitle a clip may be
+        moved when the whole timeline is planned (see timeline.py).
+        """
         self.method = method
         self.voice = voice
         self.pitch = pitch
@@ -17,6 +50,18 @@ class VoiceOverGenerator:
         self.top_k = top_k
         self.max_speed_limit = max_speed_limit # e.g., 0.25 for +25%
         self.vieneu_model = None
+        self.vieneu_workers = vieneu_workers
+        self.vieneu_pool = None
+        self.duration_model = SpeechDurationModel(duration_model_path)
+        self.speed_fit_tolerance = speed_fit_tolerance
+        self.stretch_engine = stretch_engine
+        self.timeline_lead_ms = timeline_lead_ms
+        self.timeline_lag_ms = timeline_lag_ms
+        self.last_stats = {}
+        self.clip_cache = ClipCache(clip_cache_dir, clip_cache_max_mb) if clip_cache_dir else None
+        # Decoded clips (path -> int16 PCM) kept in memory between generation and mixing
+        self.sample_rate = SAMPLE_RATE
+        self.clip_pcm = {}
 
     def _get_vieneu(self):
         if self.vieneu_model is None:
@@ -25,8 +70,8 @@ class VoiceOverGenerator:
             self.vieneu_model = Vieneu()
         return self.vieneu_model
 
-    async def _generate_single_audio(self, text, output_path, custom_rate=None):
-        """Generates a single audio file based on chosen method."""
+    def _generate_single_audio_blocking(self, text, output_path):
+        """VieNeu / gTTS synthesis. Both are blocking, so they run in a worker thread."""
         if self.method == "vieneu":
             try:
                 model = self._get_vieneu()
@@ -41,11 +86,18 @@ class VoiceOverGenerator:
             except Exception as e:
                 print(f"VieNeu Error: {e}")
                 raise e
-        elif self.method == "gtts":
+        else:
             # gTTS method (Google Text-to-Speech)
             from gtts import gTTS
             tts = gTTS(text=text, lang='vi')
             tts.save(output_path)
+
+    async def _generate_single_audio(self, text, output_path, custom_rate=None):
+        """Generates a single audio file based on chosen method."""
+        if self.vieneu_pool is not None:
+            await asyncio.wrap_future(self.vieneu_pool.submit(text, output_path))
+        elif self.method in ("vieneu", "gtts"):
+            await asyncio.to_thread(self._generate_single_audio_blocking, text, output_path)
         else:
             # edge-tts method
             import edge_tts
@@ -53,60 +105,205 @@ class VoiceOverGenerator:
             communicate = edge_tts.Communicate(text, self.voice, rate=final_rate, pitch=self.pitch)
             await communicate.save(output_path)
 
-    def generate_voiceovers(self, subtitles, output_dir, video_duration_ms, progress_callback=None):
+    def _settings_signature(self):
+        """Settings that affect the generated audio; a resume is only valid if they match."""
+        return {
+            'method': self.method,
+            'voice': self.voice,
+            'pitch': self.pitch,
+            'rate': self.rate,
+            'ref_audio': self.ref_audio,
+            'ref_text': self.ref_text,
+            'temperature': self.temperature,
+            'top_k': self.top_k,
+            'max_speed_limit': self.max_speed_limit,
+            'stretch_engine': self.stretch_engine
+        }
+
+    def _cache_key(self, text):
+        params = self._settings_signature()
+        # Only matter for clips fitted to a slot, which are checked against the meta instead
+        del params['max_speed_limit']
+        del params['stretch_engine']
+        return ClipCache.make_key(text, params)
+
+    def _cache_meta_valid(self, meta, allowed_duration):
+        if meta.get('fitted'):
+            # Sped-up clips are only valid for the exact slot and limit they were fitted to
+            if self.method != "edge-tts" and meta.get('stretch_engine') != self.stretch_engine:
+                return False
+            return meta.get('allowed_ms') == allowed_duration and meta.get('max_speed_limit') == self.max_speed_limit
+        return allowed_duration <= 0 or meta['duration_ms'] <= allowed_duration * (1 + self.speed_fit_tolerance)
+
+    def _cache_fetch(self, text, path, allowed_duration):
+        """Copies a valid cached clip next to path (keeping its format). Returns (duration_ms, path, speed) or None."""
+        hit = self.clip_cache.get(self._cache_key(text))
+        if hit is None or not self._cache_meta_valid(hit[1], allowed_duration):
+            return None
+        import shutil
+        path = os.path.splitext(path)[0] + hit[1].get('ext', ".mp3")
+        shutil.copyfile(hit[0], path)
+        return hit[1]['duration_ms'], path, hit[1].get('speed', 1.0)
+
+    def _cache_store(self, text, path, duration_ms, allowed_duration, fitted, speed=1.0):
+        self.clip_cache.put(self._cache_key(text), path, {
+            'duration_ms': duration_ms,
+            'allowed_ms': allowed_duration,
+            'fitted': fitted,
+            'max_speed_limit': self.max_speed_limit,
+            'stretch_engine': self.stretch_engine,
+            'speed': speed,
+            'ext': os.path.splitext(path)[1]
+        })
+
+    def _load_progress(self, progress_path):
+        if not os.path.exists(progress_path):
+            return None
+        try:
+            with open(progress_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except Exception as e:
+            print(f"Cannot read voiceover progress: {e}")
+            return None
+        if saved.get('settings') != self._settings_signature():
+            return None
+        return saved.get('items', {})
+
+    def _save_progress(self, progress_path, items):
+        tmp_path = progress_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({'settings': self._settings_signature(), 'items': items}, f, ensure_ascii=False)
+        os.replace(tmp_path, progress_path)
+
+    def generate_voiceovers(self, subtitles, output_dir, video_duration_ms, progress_callback=None, resume=False, concurrency=8):
         """
         Generates audio files. 
         For edge-tts: uses native rate control.
-        For vieneu: uses post-processing speedup if it overflows.
+        For vieneu/gtts: time-stretches overflowing clips afterwards (see stretch_engine).
+        resume: reuse clips listed in output_dir/progress.json (same settings, same text
+        and time slot) instead of wiping the folder and generating everything again.
+        concurrency: max number of lines synthesized at the same time.
         """
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            return loop.run_until_complete(self.generate_voiceovers_async(
+                subtitles, output_dir, video_duration_ms, progress_callback, resume, concurrency))
+        finally:
+            loop.close()
+
+    async def generate_voiceovers_async(self, subtitles, output_dir, video_duration_ms, progress_callback=None, resume=False, concurrency=8):
+        """
+        Asyncio-native version of generate_voiceovers. Lines are synthesized concurrently
+        under a semaphore; an edge-tts speed-fit second pass is scheduled as a follow-up
+        task so it does not hold a slot while its clip is being measured.
+        The returned list is ordered by subtitle index regardless of completion order.
+        """
+        progress_path = os.path.join(output_dir, "progress.json")
+        done_items = self._load_progress(progress_path) if resume else None
+
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
-        else:
+        elif done_items is None:
             # Clean old files to prevent mix of mp3/wav
             for f in os.listdir(output_dir):
-                if f.endswith((".mp3", ".wav")):
+                if f.endswith((".mp3", ".wav")) or f == "progress.json":
                     try: os.remove(os.path.join(output_dir, f))
                     except: pass
+        if done_items is None:
+            done_items = {}
 
-        audio_files = []
         total = len(subtitles)
+        self.clip_pcm = {}
+        if self.method == "vieneu" and self.vieneu_workers != 1:
+            from vieneu_pool import VieNeuWorkerPool
+            self.vieneu_pool = VieNeuWorkerPool(self.vieneu_workers, self.ref_audio, self.ref_text,
+                                                self.temperature, self.top_k)
+            # One in-flight line per worker process
+            slots = self.vieneu_pool.num_workers
+        elif self.method == "vieneu":
+            # The in-process VieNeu model is not thread-safe
+            slots = 1
+        else:
+            slots = max(1, concurrency)
+        semaphore = asyncio.Semaphore(slots)
+        base_rate = parse_rate(self.rate)
+        max_rate = max(base_rate, self.max_speed_limit)
+        stats = {'synthesized': 0, 'predicted': 0, 'resynthesized': 0, 'cached': 0}
 
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        async def store(text, path, duration_ms, allowed_duration, fitted, speed=1.0):
+            if self.clip_cache is not None:
+                await asyncio.to_thread(self._cache_store, text, path, duration_ms, allowed_duration, fitted, speed)
+        results = {}
+        followups = []
+        # VieNeu/gTTS clips to speed up once synthesis is done: (i, sub, text, path, allowed_ms, speed)
+        stretch_jobs = []
+        completed = 0
 
-        for i, sub in enumerate(subtitles):
-            filename = f"sub_{i}.mp3"
-            path = os.path.join(output_dir, filename)
-            clean_text = sub['text'].strip()
-            if not clean_text: continue
+        def finish(i, text, allowed_duration, entry):
+            nonlocal completed
+            if entry:
+                results[i] = entry
+                if text is not None:
+                    done_items[str(i)] = {'text': text, 'allowed_ms': allowed_duration, 'entry': entry}
+                    self._save_progress(progress_path, done_items)
+            completed += 1
+            if progress_callback:
+                progress_callback(completed / total)
 
+        async def second_pass(i, sub, text, path, allowed_duration, rate):
             try:
+                stats['resynthesized'] += 1
+                async with semaphore:
+                    await self._generate_single_audio(text, path, custom_rate=format_rate(rate))
+                audio = await asyncio.to_thread(self._decode_clip, path)
+                self.duration_model.add_sample(self.voice, self.pitch, text, rate, len(audio))
+                speed = (1 + rate) / (1 + base_rate)
+                await store(text, path, len(audio), allowed_duration, True, speed)
+                finish(i, text, allowed_duration, self._clip_entry(i, path, len(audio), sub, speed))
+            except Exception as e:
+                print(f"Error voice {i}: {e}")
+                finish(i, None, None, None)
+
+        async def first_pass(i, sub, text, path, allowed_duration):
+            try:
+                # Unchanged lines come straight from the shared clip cache
+                if self.clip_cache is not None:
+                    cached = await asyncio.to_thread(self._cache_fetch, text, path, allowed_duration)
+                    if cached is not None:
+                        stats['cached'] += 1
+                        finish(i, text, allowed_duration, self._clip_entry(i, cached[1], cached[0], sub, cached[2]))
+                        return
+
                 # Pass 1: Generate
-                loop.run_until_complete(self._generate_single_audio(clean_text, path))
+                stats['synthesized'] += 1
+                async with semaphore:
+                    # Predict the needed edge-tts rate up front from the clips generated so far
+                    rate = base_rate
+                    if self.method == "edge-tts" and allowed_duration > 0:
+                        predicted = self.duration_model.rate_for(self.voice, self.pitch, text, allowed_duration, base_rate, max_rate)
+                        if predicted is not None and predicted > base_rate + 0.05:
+                            rate = predicted
+                            stats['predicted'] += 1
+                    await self._generate_single_audio(text, path, custom_rate=format_rate(rate) if rate != base_rate else None)
                 
-                audio = AudioSegment.from_file(path)
+                audio = await asyncio.to_thread(self._decode_clip, path)
                 actual_duration = len(audio)
-                
-                start_ms = int(sub['start'] * 1000)
-                if i < len(subtitles) - 1:
-                    deadline_ms = int(subtitles[i+1]['start'] * 1000)
-                else:
-                    deadline_ms = video_duration_ms
-                
-                allowed_duration = deadline_ms - start_ms
+                fitted = rate != base_rate
 
                 # Handle speed-up
                 if self.method == "edge-tts":
-                    # Pass 2 for edge-tts (native)
-                    if actual_duration > allowed_duration and allowed_duration > 0:
-                        speed_factor = (actual_duration / allowed_duration) - 1.0
-                        # Use dynamic limit
-                        rate_pct = int(min(speed_factor, self.max_speed_limit) * 100)
-                        if rate_pct > 5:
-                            loop.run_until_complete(self._generate_single_audio(clean_text, path, custom_rate=f"+{rate_pct}%"))
-                            audio = AudioSegment.from_file(path)
+                    self.duration_model.add_sample(self.voice, self.pitch, text, rate, actual_duration)
+                    # Pass 2 for edge-tts (native), only if the first pass missed by more than the tolerance
+                    if actual_duration > allowed_duration * (1 + self.speed_fit_tolerance) and allowed_duration > 0:
+                        # Duration scales with 1 / (1 + rate)
+                        new_rate = min((1 + rate) * actual_duration / allowed_duration - 1, max_rate)
+                        if new_rate > rate + 0.05:
+                            followups.append(asyncio.ensure_future(
+                                second_pass(i, sub, text, path, allowed_duration, new_rate)))
+                            return
                 else:
-                    # method == vieneu or gtts: use pydub speedup if it overflows
+                    # method == vieneu or gtts: time-stretch if it overflows
                     if actual_duration > allowed_duration and allowed_duration > 0:
                         speed_factor = actual_duration / allowed_duration
                         # Only speed up if it's more than 5% longer
@@ -114,44 +311,193 @@ class VoiceOverGenerator:
                             # Use dynamic limit (1.0 + limit)
                             max_playback = 1.0 + self.max_speed_limit
                             speed_factor = min(speed_factor, max_playback)
-                            audio = audio.speedup(playback_speed=speed_factor, chunk_size=150, crossfade=25)
-                            audio.export(path, format="mp3")
-
-                audio_files.append({
-                    'index': i,
-                    'path': path,
-                    'duration_ms': len(audio),
-                    'start_original': sub['start'],
-                    'end_original': sub['end']
-                })
+                            # Stretched in one batch after all lines are synthesized
+                            stretch_jobs.append((i, sub, text, path, allowed_duration, speed_factor))
+                            return
+
+                speed = (1 + rate) / (1 + base_rate)
+                await store(text, path, len(audio), allowed_duration, fitted, speed)
+                finish(i, text, allowed_duration, self._clip_entry(i, path, len(audio), sub, speed))
             except Exception as e:
                 print(f"Error voice {i}: {e}")
+                finish(i, None, None, None)
 
-            if progress_callback:
-                progress_callback((i + 1) / total)
+        tasks = []
+        for i, sub in enumerate(subtitles):
+            filename = f"sub_{i}.mp3"
+            path = os.path.join(output_dir, filename)
+            clean_text = sub['text'].strip()
+            if not clean_text:
+                finish(i, None, None, None)
+                continue
+
+            start_ms = int(sub['start'] * 1000)
+            if i < len(subtitles) - 1:
+                deadline_ms = int(subtitles[i+1]['start'] * 1000)
+            else:
+                deadline_ms = video_duration_ms
+            
+            allowed_duration = deadline_ms - start_ms
+
+            # Resume: clip already generated for the same text and slot
+            prev = done_items.get(str(i))
+            if prev and prev['text'] == clean_text and prev['allowed_ms'] == allowed_duration and os.path.exists(prev['entry']['path']):
+                finish(i, None, None, prev['entry'])
+                continue
+
+            tasks.append(first_pass(i, sub, clean_text, path, allowed_duration))
+
+        try:
+            await asyncio.gather(*tasks)
+            # All first passes are done, so every follow-up has been scheduled by now
+            await asyncio.gather(*followups)
+            if stretch_jobs:
+                await self._finish_stretch_jobs(stretch_jobs, store, finish)
+        finally:
+            if self.vieneu_pool is not None:
+                self.vieneu_pool.shutdown()
+                self.vieneu_pool = None
+
+        if self.method == "edge-tts" and stats['synthesized']:
+            self.duration_model.save()
+            print(f"Speed-fit: {stats['resynthesized']}/{stats['synthesized']} lines re-synthesized "
+                  f"({100 * stats['resynthesized'] / stats['synthesized']:.1f}%), "
+                  f"{stats['predicted']} rates predicted up front")
+        if self.clip_cache is not None:
+            if stats['cached']:
+                print(f"Clip cache: {stats['cached']} lines reused, {stats['synthesized']} synthesized")
+            await asyncio.to_thread(self.clip_cache.trim)
+        self.last_stats = stats
+
+        return [results[i] for i in sorted(results)]
+
+    def _clip_entry(self, i, path, duration_ms, sub, speed=1.0):
+        return {
+            'index': i,
+            'path': path,
+            'duration_ms': duration_ms,
+            'speed': speed,
+            'start_original': sub['start'],
+            'end_original': sub['end']
+        }
 
-        return audio_files
+    def _decode_clip(self, path):
+        """Decodes a synthesized clip once and keeps its PCM for mixing."""
+        audio = normalize_segment(AudioSegment.from_file(path), self.sample_rate)
+        self.clip_pcm[path] = segment_to_pcm(audio, self.sample_rate)
+        return audio
 
-    def create_full_audio_track(self, audio_data, video_duration_ms, output_path):
+    async def _finish_stretch_jobs(self, jobs, store, finish):
+        fitted = True
+        try:
+            stretched = await asyncio.to_thread(self._stretch_clips, [(job[3], job[5]) for job in jobs])
+        except Exception as e:
+            print(f"Error time-stretching {len(jobs)} clips: {e}")
+            # Keep the clips at natural speed; they will overlap the next line
+            stretched = [(job[3], self.get_clip_pcm(job[3])) for job in jobs]
+            fitted = False
+        for (i, sub, text, _, allowed_duration, speed), (path, pcm) in zip(jobs, stretched):
+            duration_ms = pcm_duration_ms(pcm, self.sample_rate)
+            speed = speed if fitted else 1.0
+            await store(text, path, duration_ms, allowed_duration, fitted, speed)
+            finish(i, text, allowed_duration, self._clip_entry(i, path, duration_ms, sub, speed))
+
+    def _stretch_clips(self, jobs):
         """
-        Combines individual audio files. 
-        Allowed to overlap slightly ('đè') to maintain natural speech speed.
+        Speeds up [(path, speed_factor), ...] and saves each as lossless WAV (no mp3 re-encode).
+        Returns [(new_path, pcm), ...] in the same order.
         """
-        full_audio = AudioSegment.silent(duration=video_duration_ms)
+        stretched = self._stretch_pcm([self.get_clip_pcm(path) for path, _ in jobs], [speed for _, speed in jobs])
 
-        for i, item in enumerate(audio_data):
-            segment = AudioSegment.from_file(item['path'])
-            start_ms = int(item['start_original'] * 1000)
-            
-            # For the last clip, don't exceed video duration
-            if i == len(audio_data) - 1:
-                if start_ms + len(segment) > video_duration_ms:
-                    fade_len = min(50, len(segment))
-                    segment = segment.fade_out(fade_len)[:video_duration_ms - start_ms]
-            
-            # Simply overlay without strict truncation for intermediate segments
-            # self.full_audio.overlay will mix the sounds if they overlap
-            full_audio = full_audio.overlay(segment, position=start_ms)
+        results = []
+        for (path, _), pcm in zip(jobs, stretched):
+            wav_path = os.path.splitext(path)[0] + ".wav"
+            write_wav(wav_path, pcm, self.sample_rate)
+            self.clip_pcm.pop(path, None)
+            self.clip_pcm[wav_path] = pcm
+            if wav_path != path and os.path.exists(path):
+                os.remove(path)
+            results.append((wav_path, pcm))
+        return results
+
+    def _stretch_pcm(self, clips, speeds):
+        if self.stretch_engine == "pydub":
+            return [segment_to_pcm(pcm_to_segment(pcm, self.sample_rate).speedup(
+                playback_speed=speed, chunk_size=150, crossfade=25), self.sample_rate)
+                for pcm, speed in zip(clips, speeds)]
+        return wsola_batch(clips, speeds, self.sample_rate)
+
+    def get_clip_pcm(self, path):
+        """PCM of a clip: from memory if generated in this run, else decoded from disk once."""
+        pcm = self.clip_pcm.get(path)
+        if pcm is None:
+            pcm = load_pcm(path, self.sample_rate)
+            self.clip_pcm[path] = pcm
+        return pcm
+
+    def plan_timeline(self, audio_data, video_duration_ms):
+        """
+        Places all clips on the timeline at once (shift into silence, then spread extra
+        speed-up over congested runs, overlap only as a last resort). Returns one
+        placement per audio_data item: {'index', 'start_ms', 'speed', 'duration_ms', 'shift_ms', 'overlap'}.
+        """
+        if self.method == "edge-tts":
+            base_rate = parse_rate(self.rate)
+            limit = (1 + max(base_rate, self.max_speed_limit)) / (1 + base_rate)
+        else:
+            limit = 1 + self.max_speed_limit
+        items = [{
+            'start_ms': item['start_original'] * 1000,
+            'duration_ms': item['duration_ms'],
+            # Speed already applied at synthesis counts against the limit
+            'max_speed': limit / item.get('speed', 1.0)
+        } for item in audio_data]
+        plan = plan_timeline(items, video_duration_ms, self.timeline_lead_ms, self.timeline_lag_ms)
+        for item, placement in zip(audio_data, plan):
+            placement['index'] = item['index']
+        print(summarize_plan(plan))
+        return plan
 
-        full_audio.export(output_path, format="mp3")
+    def export_placed_clips(self, audio_data, plan):
+        """
+        Applies the plan's extra speed-up and returns the clips ready to mix:
+        [{'index', 'path', 'start_ms'}, ...]. Sped-up clips are written next to the
+        originals as *_placed.wav, so the list can be mixed later in another process.
+        """
+        placed = [{'index': p['index'], 'path': item['path'], 'start_ms': p['start_ms']}
+                  for item, p in zip(audio_data, plan)]
+        to_stretch = [k for k, p in enumerate(plan) if p['speed'] > 1.001]
+        if to_stretch:
+            stretched = self._stretch_pcm([self.get_clip_pcm(audio_data[k]['path']) for k in to_stretch],
+                                          [plan[k]['speed'] for k in to_stretch])
+            for k, pcm in zip(to_stretch, stretched):
+                path = os.path.splitext(audio_data[k]['path'])[0] + "_placed.wav"
+                write_wav(path, pcm, self.sample_rate)
+                self.clip_pcm[path] = pcm
+                placed[k]['path'] = path
+        return placed
+
+    def mix_placed_clips(self, placed, video_duration_ms, output_path=None):
+        """
+        Mixes export_placed_clips() output into one track. Without output_path the int16
+        PCM is returned (nothing written); a .wav output_path keeps it lossless.
+        """
+        track = mix_clips([(clip['start_ms'], self.get_clip_pcm(clip['path'])) for clip in placed],
+                          video_duration_ms, self.sample_rate)
+        if output_path is None:
+            return track
+        if output_path.lower().endswith(".wav"):
+            write_wav(output_path, track, self.sample_rate)
+        else:
+            pcm_to_segment(track, self.sample_rate).export(output_path, format="mp3")
         return output_path
+
+    def create_full_audio_track(self, audio_data, video_duration_ms, output_path, plan=None):
+        """
+        Mixes the clips at the positions of the timeline plan (computed if not given),
+        applying the extra speed-up the plan assigns. Clips only overlap where the plan
+        could not avoid it.
+        """
+        if plan is None:
+            plan = self.plan_timeline(audio_data, video_duration_ms)
+        return self.mix_placed_clips(self.export_placed_clips(audio_data, plan), video_duration_ms, output_path)